@@ -0,0 +1,171 @@
+import os
+from dotenv import load_dotenv
+
+# ✅ Load environment variables (same .env as main.py)
+load_dotenv()
+
+
+def env_str(name, default=None):
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    try:
+        return int(value) if value not in (None, "") else default
+    except ValueError:
+        print(f"⚠️ Invalid integer for {name}={value!r}, using {default}")
+        return default
+
+
+def env_float(name, default):
+    value = os.getenv(name)
+    try:
+        return float(value) if value not in (None, "") else default
+    except ValueError:
+        print(f"⚠️ Invalid number for {name}={value!r}, using {default}")
+        return default
+
+
+def env_int_list(name, default):
+    """Comma-separated integers, e.g. LENGTH_BUCKET_EDGES=16,32,64,128."""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return list(default)
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        print(f"⚠️ Invalid integer list for {name}={value!r}, using {','.join(map(str, default))}")
+        return list(default)
+
+
+def env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def model_setting(model_key, name, default, cast=env_float):
+    """Per-model override first (e.g. ENGLISH_SENTIMENT_MICROBATCH_MAX_SIZE), then the global setting."""
+    override = f"{model_key.upper()}_{name}"
+    if os.getenv(override) not in (None, ""):
+        return cast(override, default)
+    return cast(name, default)
+
+
+# ✅ Micro-batching for the single-item sentiment endpoints
+MICROBATCH_ENABLED = env_bool("MICROBATCH_ENABLED", True)
+MICROBATCH_MAX_WAIT_MS = env_float("MICROBATCH_MAX_WAIT_MS", 5.0)
+MICROBATCH_MAX_SIZE = env_int("MICROBATCH_MAX_SIZE", 32)
+
+# ✅ Batch inference (per-model override e.g. SINHALA_SENTIMENT_INFERENCE_BATCH_SIZE)
+INFERENCE_BATCH_SIZE = env_int("INFERENCE_BATCH_SIZE", 32)
+
+# ✅ Paths (backend-python/ and its data/ + models/ folders)
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+MODELS_DIR = env_str("MODELS_DIR", os.path.join(BASE_DIR, "models"))
+EXPORT_DIR = os.path.join(MODELS_DIR, "exported")
+
+# ✅ Inference backend: eager | torchscript | onnx (per-model e.g. ENGLISH_ASPECT_MODEL_BACKEND=onnx)
+MODEL_BACKEND = env_str("MODEL_BACKEND", "eager")
+
+# ✅ Inference precision: fp32 | int8 | bf16 (per-model e.g. SINHALA_ASPECT_MODEL_PRECISION=int8)
+MODEL_PRECISION = env_str("MODEL_PRECISION", "fp32")
+PRECISION_GATE_FILE = os.path.join(MODELS_DIR, "precision_gate.json")
+PRECISION_GATE_ENFORCED = env_bool("PRECISION_GATE_ENFORCED", True)
+PRECISION_MAX_ACCURACY_DROP = env_float("PRECISION_MAX_ACCURACY_DROP", 0.01)
+
+# ✅ Batch autotuner (python -m app.services.batch_autotune tune): per-host batch sizes per length bucket
+BATCH_TUNING_FILE = os.path.join(MODELS_DIR, "batch_tuning.json")
+AUTOTUNED_BATCHING = env_bool("AUTOTUNED_BATCHING", True)
+AUTOTUNE_ON_STARTUP = env_bool("AUTOTUNE_ON_STARTUP", False)
+AUTOTUNE_LATENCY_SLO_MS = env_float("AUTOTUNE_LATENCY_SLO_MS", 200.0)
+AUTOTUNE_KNEE = env_float("AUTOTUNE_KNEE", 0.9)
+
+# ✅ Length bucketing for bulk scoring (token-length bucket upper edges)
+LENGTH_BUCKETING = env_bool("LENGTH_BUCKETING", True)
+LENGTH_BUCKET_EDGES = sorted(env_int_list("LENGTH_BUCKET_EDGES", (16, 32, 64, 128)))
+
+# ✅ Out-of-process model server (empty address = models run inside the web worker).
+#    Requests are pickled, so the server and its clients need a shared secret MODEL_SERVER_AUTHKEY.
+MODEL_SERVER_ADDRESS = env_str("MODEL_SERVER_ADDRESS", "")
+MODEL_SERVER_WORKERS = env_int("MODEL_SERVER_WORKERS", 2)
+MODEL_SERVER_AUTHKEY = env_str("MODEL_SERVER_AUTHKEY", "").encode()
+
+# ✅ CPU governor: concurrent forward passes per model + intra-op threads per pass. By default
+#    the cores are split over every forward slot (TORCH_PARALLEL_MODELS x MODEL_MAX_CONCURRENCY)
+#    so the six classifiers running at once don't oversubscribe the CPU.
+MODEL_MAX_CONCURRENCY = env_int("MODEL_MAX_CONCURRENCY", 1)
+TORCH_PARALLEL_MODELS = env_int("TORCH_PARALLEL_MODELS", 6)
+TORCH_NUM_THREADS = env_int(
+    "TORCH_NUM_THREADS",
+    max((os.cpu_count() or 1) // max(TORCH_PARALLEL_MODELS * MODEL_MAX_CONCURRENCY, 1), 1)
+)
+TORCH_INTEROP_THREADS = env_int("TORCH_INTEROP_THREADS", 1)
+
+# ✅ Priority classes: interactive forward passes go first; while interactive callers are queued,
+#    bulk jobs (CSV, scraping) run in chunks of at most BULK_MAX_BATCH_SIZE rows
+#    (per model e.g. ENGLISH_SENTIMENT_BULK_MAX_BATCH_SIZE)
+BULK_MAX_BATCH_SIZE = env_int("BULK_MAX_BATCH_SIZE", 8)
+PRIORITY_INTERACTIVE_BURST = env_int("PRIORITY_INTERACTIVE_BURST", 8)
+
+# ✅ Admission control: shed (429) requests once a model has MAX_QUEUE_ROWS rows pending
+#    (0 = unlimited; per model e.g. ENGLISH_SENTIMENT_MAX_QUEUE_ROWS); X-Deadline-Ms expiries answer 503
+MAX_QUEUE_ROWS = env_int("MAX_QUEUE_ROWS", 2000)
+ADMISSION_RETRY_AFTER_SECONDS = env_float("ADMISSION_RETRY_AFTER_SECONDS", 2.0)
+
+# ✅ Lazy model registry: models load on first use; PRELOAD_MODELS (comma list or "all") load at startup
+PRELOAD_MODELS = [name.strip() for name in env_str("PRELOAD_MODELS", "").split(",") if name.strip()]
+
+# ✅ Preforked launcher (python -m app.prefork): models load once in the parent, workers share them
+PREFORK_HOST = env_str("PREFORK_HOST", "0.0.0.0")
+PREFORK_WORKERS = env_int("PREFORK_WORKERS", 2)
+PREFORK_MEMORY_REPORT_SECONDS = env_float("PREFORK_MEMORY_REPORT_SECONDS", 0.0)
+
+# ✅ In-memory prediction cache (LRU + TTL, per cache e.g. ENGLISH_SENTIMENT_PREDICTION_CACHE_TTL_SECONDS)
+PREDICTION_CACHE_ENABLED = env_bool("PREDICTION_CACHE_ENABLED", True)
+PREDICTION_CACHE_MAX_ENTRIES = env_int("PREDICTION_CACHE_MAX_ENTRIES", 10000)
+PREDICTION_CACHE_TTL_SECONDS = env_float("PREDICTION_CACHE_TTL_SECONDS", 3600.0)
+
+# ✅ Persistent inference store (SQLite under data/, shared by all workers and runs)
+INFERENCE_STORE_ENABLED = env_bool("INFERENCE_STORE_ENABLED", True)
+INFERENCE_STORE_PATH = env_str("INFERENCE_STORE_PATH", os.path.join(DATA_DIR, "inference_store.sqlite3"))
+INFERENCE_STORE_TTL_DAYS = env_float("INFERENCE_STORE_TTL_DAYS", 90.0)
+INFERENCE_STORE_MAX_ROWS = env_int("INFERENCE_STORE_MAX_ROWS", 1000000)
+INFERENCE_STORE_COMPACT_HOURS = env_float("INFERENCE_STORE_COMPACT_HOURS", 24.0)
+
+# ✅ Tokenization: Rust fast tokenizers + shared encoding cache (keyed by tokenizer fingerprint)
+FAST_TOKENIZERS = env_bool("FAST_TOKENIZERS", True)
+TOKENIZER_CACHE_ENABLED = env_bool("TOKENIZER_CACHE_ENABLED", True)
+TOKENIZER_CACHE_MAX_ENTRIES = env_int("TOKENIZER_CACHE_MAX_ENTRIES", 20000)
+
+# ✅ Warmup after every (re)load: synthetic batches at each LENGTH_BUCKET_EDGES length
+WARMUP_ENABLED = env_bool("WARMUP_ENABLED", True)
+WARMUP_ROUNDS = env_int("WARMUP_ROUNDS", 2)
+WARMUP_MAX_BATCH_SIZE = env_int("WARMUP_MAX_BATCH_SIZE", 32)
+
+# ✅ Model residency: evict idle evictable models (keyword models by default, per-model
+#    e.g. ENGLISH_ASPECT_MODEL_EVICTABLE=true) while the loaded models exceed the budget
+MODEL_MEMORY_BUDGET_MB = env_float("MODEL_MEMORY_BUDGET_MB", 0.0)
+MODEL_IDLE_SECONDS = env_float("MODEL_IDLE_SECONDS", 300.0)
+MODEL_RESIDENCY_CHECK_SECONDS = env_float("MODEL_RESIDENCY_CHECK_SECONDS", 60.0)
+
+# ✅ Local model store (python -m app.services.model_store pull): pinned safetensors, no hub access
+LOCAL_MODEL_STORE = env_bool("LOCAL_MODEL_STORE", True)
+MODEL_STORE_DIR = os.path.join(MODELS_DIR, "store")
+
+# ✅ Hot model swap (POST /api/inference/models/{name}/swap, disabled until ADMIN_TOKEN is set):
+#    successfully swapped revisions, shared by all workers
+MODEL_SWAP_FILE = os.path.join(MODELS_DIR, "active_revisions.json")
+MODEL_SWAP_POLL_SECONDS = env_float("MODEL_SWAP_POLL_SECONDS", 5.0)
+ADMIN_TOKEN = env_str("ADMIN_TOKEN", "")
+
+# ✅ Garbage cascade (python -m app.services.garbage_cascade train): the n-gram model decides
+#    P(garbage) >= GARBAGE or <= VALID threshold, the transformer sees the rest
+#    (per model e.g. SINHALA_GARBAGE_CASCADE_GARBAGE_THRESHOLD=0.99)
+CASCADE_ENABLED = env_bool("CASCADE_ENABLED", True)
+CASCADE_GARBAGE_THRESHOLD = env_float("CASCADE_GARBAGE_THRESHOLD", 0.97)
+CASCADE_VALID_THRESHOLD = env_float("CASCADE_VALID_THRESHOLD", 0.03)
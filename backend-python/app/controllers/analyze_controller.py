@@ -0,0 +1,95 @@
+from app.controllers.english_aspect_predict_controller import GARBAGE_ASPECT_MODELS as ENGLISH_ASPECT_MODELS, garbage_then_aspect_batch
+from app.controllers.sinhala_aspect_predict_controller import GARBAGE_ASPECT_MODELS as SINHALA_ASPECT_MODELS, classify_sinhala_batch
+from app.services.sentiment_service import predict_sentiment_batch
+from app.services.sentiment_sinhala_service import predict_sentiment_sinhala_bulk
+from app.utils.cache_handler import normalize_text
+from app.utils.language_identifier import detect_language
+
+# ==============================
+# 🔹 Unified analysis: garbage → aspect → sentiment for mixed-language comments
+# ==============================
+# Each comment is normalized once; equal normalized comments are analysed once
+# and language detection runs once per unique comment. Every language group
+# then goes through its own batched stages (which reuse the normalized form for
+# their cache and store keys), and each stage only sees the comments the
+# previous one kept.
+
+SUPPORTED_LANGUAGES = ("en", "si")
+
+# Models each language group touches (admission control in the route)
+LANGUAGE_MODELS = {
+    "en": [model for model in ENGLISH_ASPECT_MODELS if not model.endswith("_cascade")] + ["english_sentiment"],
+    "si": [model for model in SINHALA_ASPECT_MODELS if not model.endswith("_cascade")] + ["sinhala_sentiment"],
+}
+
+def plan_analysis(comments) -> dict:
+    """Normalizes and deduplicates ``comments``, then detects each unique comment's language."""
+    comments = list(comments)
+    unique = {}
+    positions = []
+    for comment in comments:
+        normalized = normalize_text(comment)
+        if normalized not in unique:
+            # The first spelling is what the models see, as on the per-language endpoints
+            unique[normalized] = {"text": str(comment).strip(), "language": detect_language(normalized) if normalized else "other"}
+        positions.append(normalized)
+
+    groups = {}
+    for normalized, entry in unique.items():
+        groups.setdefault(entry["language"], []).append(normalized)
+    return {"comments": comments, "positions": positions, "unique": unique, "groups": groups}
+
+def models_for(plan) -> list:
+    return [model for language in plan["groups"] if language in LANGUAGE_MODELS for model in LANGUAGE_MODELS[language]]
+
+def _analyze_english(texts, normalized) -> list:
+    classified = garbage_then_aspect_batch(texts, normalized=normalized)
+    valid = [i for i, result in enumerate(classified) if result["label"] == "valid"]
+    sentiments = predict_sentiment_batch(
+        [(texts[i], classified[i]["aspect"]) for i in valid], normalized=[normalized[i] for i in valid]
+    )
+    results = [{"label": result["label"], "aspect": result["aspect"], "sentiment": None, "score": None} for result in classified]
+    for i, (sentiment, score) in zip(valid, sentiments):
+        results[i].update(sentiment=sentiment, score=score)
+    return results
+
+def _analyze_sinhala(texts, normalized) -> list:
+    classified = classify_sinhala_batch(texts, lexicon_mode="override", normalized=normalized)
+    valid = [i for i, result in enumerate(classified) if result["label"] == "valid"]
+    sentiments, _ = predict_sentiment_sinhala_bulk(
+        [(texts[i], classified[i]["aspect"]) for i in valid], normalized=[normalized[i] for i in valid]
+    )
+    results = [{"label": result["label"], "aspect": result["aspect"], "sentiment": None, "score": None} for result in classified]
+    for i, (sentiment, score) in zip(valid, sentiments):
+        results[i].update(sentiment=sentiment, score=score)
+    return results
+
+ANALYZERS = {"en": _analyze_english, "si": _analyze_sinhala}
+
+def analyze_planned(plan) -> dict:
+    """Runs each language group through its stages and merges one result per input comment."""
+    unique = plan["unique"]
+    analysed = {}
+    for language, keys in plan["groups"].items():
+        analyzer = ANALYZERS.get(language)
+        if analyzer is None:
+            for key in keys:
+                analysed[key] = {"label": "skip", "aspect": None, "sentiment": None, "score": None}
+            continue
+        # The group keys are the normalized comments: the stages key their caches on them as-is
+        for key, result in zip(keys, analyzer([unique[key]["text"] for key in keys], keys)):
+            analysed[key] = result
+
+    data = [
+        {"comment": comment, "language": unique[key]["language"], **analysed[key]}
+        for comment, key in zip(plan["comments"], plan["positions"])
+    ]
+    return {
+        "comments": len(data),
+        "unique_comments": len(unique),
+        "languages": {language: len(keys) for language, keys in plan["groups"].items()},
+        "data": data,
+    }
+
+def analyze_comments(comments) -> dict:
+    return analyze_planned(plan_analysis(comments))
@@ -1,33 +1,36 @@
-from transformers import BertTokenizer, BertForSequenceClassification
-import torch
+import numpy as np
+from app.services.batch_inference import batch_size_for, predict_logits
+from app.services.model_backends import MODEL_SPECS
+from app.services.model_registry import get_model, model_fingerprint
+from app.services.inference_store import inference_store, namespace_revision
+from app.services.garbage_cascade import cascade_garbage_mask
+from app.utils.cache_handler import normalize_text, prediction_cache
 
 # ==============================
 # 🔹 Garbage Classification Model
 # ==============================
 
-GARBAGE_MODEL_PATH = "Navojith012/english-garbage-classifier"
+GARBAGE_MODEL_PATH = MODEL_SPECS["english_garbage"]["path"]
 
-garbage_tokenizer = BertTokenizer.from_pretrained(GARBAGE_MODEL_PATH)
-garbage_model = BertForSequenceClassification.from_pretrained(GARBAGE_MODEL_PATH)
-garbage_model.eval()
+def _transformer_garbage_mask(texts) -> np.ndarray:
+    garbage_tokenizer, garbage_model = get_model("english_garbage")
+    logits = predict_logits(garbage_tokenizer, garbage_model, texts, batch_size=batch_size_for("english_garbage"))
+    return np.argmax(logits, axis=1) == 0  # ✅ correct logic
+
+def garbage_mask(texts) -> np.ndarray:
+    """True where the comment is garbage: the n-gram cascade settles the confident
+    comments, one batched garbage-model pass handles the rest."""
+    return cascade_garbage_mask("English", texts, _transformer_garbage_mask)
 
 def is_garbage_comment(text: str) -> bool:
-    inputs = garbage_tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
-    with torch.no_grad():
-        outputs = garbage_model(**inputs)
-        predicted_label = torch.argmax(outputs.logits, dim=1).item()
-    return predicted_label == 0  # ✅ correct logic
+    return bool(garbage_mask([text])[0])
 
 
 # ==============================
 # 🔹 Aspect Classification Model
 # ==============================
 
-ASPECT_MODEL_PATH = "Navojith012/english-aspect-classifier"
-
-aspect_tokenizer = BertTokenizer.from_pretrained(ASPECT_MODEL_PATH)
-aspect_model = BertForSequenceClassification.from_pretrained(ASPECT_MODEL_PATH)
-aspect_model.eval()
+ASPECT_MODEL_PATH = MODEL_SPECS["english_aspect"]["path"]
 
 ASPECT_LABELS = {
     0: "Customer Support",
@@ -38,30 +41,63 @@ ASPECT_LABELS = {
     5: "Trust and Security"
 }
 
+def classify_aspect_batch(texts) -> list:
+    aspect_tokenizer, aspect_model = get_model("english_aspect")
+    logits = predict_logits(aspect_tokenizer, aspect_model, texts, batch_size=batch_size_for("english_aspect"))
+    return [ASPECT_LABELS.get(int(label), "Unknown") for label in np.argmax(logits, axis=1)]
+
 def classify_aspect(text: str) -> str:
-    inputs = aspect_tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
-    with torch.no_grad():
-        outputs = aspect_model(**inputs)
-        predicted_label = torch.argmax(outputs.logits, dim=1).item()
-    return ASPECT_LABELS.get(predicted_label, "Unknown")
+    return classify_aspect_batch([text])[0]
 
 
 # ==============================
 # 🔁 Combined Pipeline
 # ==============================
 
+# ✅ (label, aspect) per normalized comment, keyed on the cascade and both model fingerprints
+GARBAGE_ASPECT_MODELS = ("english_garbage_cascade", "english_garbage", "english_aspect")
+combined_cache = prediction_cache("english_garbage_aspect", models=GARBAGE_ASPECT_MODELS)
+
+def _garbage_then_aspect_uncached(texts) -> list:
+    texts = list(texts)
+    is_garbage = garbage_mask(texts)
+    valid_texts = [text for text, garbage in zip(texts, is_garbage) if not garbage]
+    aspects = iter(classify_aspect_batch(valid_texts))
+
+    results = []
+    for text, garbage in zip(texts, is_garbage):
+        if garbage:
+            results.append({
+                "comment": text,
+                "label": "garbage",
+                "aspect": None
+            })
+        else:
+            results.append({
+                "comment": text,
+                "label": "valid",
+                "aspect": next(aspects)
+            })
+    return results
+
+def garbage_then_aspect_batch(texts, normalized=None) -> list:
+    """Garbage model over the whole list, then the aspect model over the valid subset only.
+
+    ``normalized`` optionally gives each text's ``normalize_text`` form (computed once upstream).
+    """
+    texts = list(texts)
+    normalized = list(normalized) if normalized is not None else [normalize_text(text) for text in texts]
+    fingerprint = model_fingerprint(*GARBAGE_ASPECT_MODELS)
+    predictions = combined_cache.get_many(
+        [(norm, fingerprint) for norm in normalized], list(zip(texts, normalized)),
+        lambda missing: inference_store.get_many(
+            "english_garbage_aspect", namespace_revision(*GARBAGE_ASPECT_MODELS),
+            [norm for _, norm in missing], [text for text, _ in missing],
+            lambda rest: [(r["label"], r["aspect"]) for r in _garbage_then_aspect_uncached(rest)],
+            decode=tuple,
+        )
+    )
+    return [{"comment": text, "label": label, "aspect": aspect} for text, (label, aspect) in zip(texts, predictions)]
+
 def garbage_then_aspect(text: str) -> dict:
-    is_garbage = is_garbage_comment(text)
-    if is_garbage:
-        return {
-            "comment": text,
-            "label": "garbage",
-            "aspect": None
-        }
-    else:
-        aspect = classify_aspect(text)
-        return {
-            "comment": text,
-            "label": "valid",
-            "aspect": aspect
-        }
+    return garbage_then_aspect_batch([text])[0]
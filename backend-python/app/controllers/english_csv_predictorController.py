@@ -2,7 +2,8 @@ import os
 import re
 import pandas as pd
 from datetime import datetime
-from app.services.sentiment_service import predict_sentiment
+from app.services.sentiment_service import predict_sentiment, predict_sentiment_batch
+from app.services.batch_inference import score_rows
 from app.db.mongodb import english_collection
 
 def extract_timestamp(filename):
@@ -34,15 +35,14 @@ def process_english_csv_prediction():
     if "Comment" not in df.columns or "Aspect" not in df.columns:
         raise ValueError("Excel file must contain 'Comment' and 'Aspect' columns")
 
+    rows = [row for _, row in df.iterrows() if not (pd.isna(row["Comment"]) or pd.isna(row["Aspect"]))]
+    scored = score_rows(rows, predict_sentiment_batch, predict_sentiment)
+
     predictions = []
-    for _, row in df.iterrows():
-        if pd.isna(row["Comment"]) or pd.isna(row["Aspect"]):
-            continue
-        try:
-            sentiment, score = predict_sentiment(row["Comment"], row["Aspect"])
-        except Exception as e:
-            print(f"❌ Error for comment: {row['Comment']} | Error: {e}")
+    for row, prediction in zip(rows, scored):
+        if prediction is None:
             continue
+        sentiment, score = prediction
 
         record = {
             "comment": row["Comment"],
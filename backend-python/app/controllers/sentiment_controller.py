@@ -1,3 +1,5 @@
 # app/controllers/sentiment_controller.py
-from app.services.sentiment_service import predict_sentiment
-print("✅ English model and tokenizer loaded successfully!")
+from app.services.sentiment_service import (
+    SENTIMENT_MAP, predict_sentiment, predict_sentiment_batch, predict_sentiment_matrix, predict_sentiment_queued
+)
+print("✅ English sentiment controller ready (model loads on first use)")
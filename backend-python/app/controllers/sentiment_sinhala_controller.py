@@ -1,3 +1,3 @@
 # In app/controllers/sentiment_sinhala_controller.py
-from app.services.sentiment_sinhala_service import predict_sentiment_sinhala
-print("✅ Sinhala model and tokenizer loaded successfully!")
\ No newline at end of file
+from app.services.sentiment_sinhala_service import predict_sentiment_sinhala, predict_sentiment_sinhala_bulk, predict_sentiment_sinhala_queued
+print("✅ Sinhala sentiment controller ready (model loads on first use)")
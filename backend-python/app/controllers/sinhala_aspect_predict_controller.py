@@ -1,20 +1,20 @@
 import os
 import json
-import torch
+import hashlib
 import re
-from transformers import XLMRobertaTokenizer, XLMRobertaForSequenceClassification
+import numpy as np
+from app.services.batch_inference import batch_size_for, predict_logits, softmax
+from app.services.model_backends import MODEL_SPECS
+from app.services.model_registry import get_model, model_fingerprint
+from app.services.inference_store import inference_store, namespace_revision
+from app.services.garbage_cascade import CASCADE_MODELS, cascade_garbage_mask
+from app.utils.cache_handler import normalize_text, prediction_cache
 
 # ========== 🔹 Sinhala Garbage Classifier ==========
-GARBAGE_MODEL_PATH = "Navojith012/sinhala_garbage_model"
-garbage_tokenizer = XLMRobertaTokenizer.from_pretrained(GARBAGE_MODEL_PATH)
-garbage_model = XLMRobertaForSequenceClassification.from_pretrained(GARBAGE_MODEL_PATH)
-garbage_model.eval()
+GARBAGE_MODEL_PATH = MODEL_SPECS["sinhala_garbage"]["path"]
 
 # ========== 🔹 Sinhala Aspect Classifier ==========
-ASPECT_MODEL_PATH = "Navojith012/sinhala-aspect-classifier-v2"
-aspect_tokenizer = XLMRobertaTokenizer.from_pretrained(ASPECT_MODEL_PATH)
-aspect_model = XLMRobertaForSequenceClassification.from_pretrained(ASPECT_MODEL_PATH)
-aspect_model.eval()
+ASPECT_MODEL_PATH = MODEL_SPECS["sinhala_aspect"]["path"]
 
 aspect_label_map = {
     0: "Customer Support",
@@ -24,6 +24,8 @@ aspect_label_map = {
     4: "Transactions and Payments",
     5: "Trust and Security"
 }
+ASPECT_NAMES = [aspect_label_map[i] for i in range(len(aspect_label_map))]
+OTHERS_INDEX = ASPECT_NAMES.index("Others")
 
 # ========== 🧠 Load Aspect Lexicon ==========
 LEXICON_PATH = "data/sinhala_aspect_lexicon.json"
@@ -41,8 +43,13 @@ try:
 except FileNotFoundError:
     garbage_lexicon = []
 
+# Stored predictions depend on the lexicons as well as the models
+LEXICON_VERSION = hashlib.sha1(
+    json.dumps([aspect_lexicon, garbage_lexicon], ensure_ascii=False, sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
+
 # ========== 🗑️ Sinhala Garbage Detection ==========
-def is_sinhala_garbage(text: str, debug=False) -> bool:
+def sinhala_rule_garbage(text: str, debug=False) -> bool:
     cleaned = text.strip().lower()
 
     # Lexicon-based garbage detection
@@ -60,48 +67,139 @@ def is_sinhala_garbage(text: str, debug=False) -> bool:
         if debug: print("🗑️ Only symbols")
         return True
 
-    # Model-based garbage detection
-    inputs = garbage_tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
-    with torch.no_grad():
-        outputs = garbage_model(**inputs)
-        prediction = torch.argmax(outputs.logits, dim=1).item()
-        if debug:
-            print(f"🧠 Garbage model prediction: {prediction}")
+    return False
+
+def _transformer_garbage_mask(texts) -> np.ndarray:
+    garbage_tokenizer, garbage_model = get_model("sinhala_garbage")
+    logits = predict_logits(garbage_tokenizer, garbage_model, texts, batch_size=batch_size_for("sinhala_garbage"))
+    return np.argmax(logits, axis=1) == 0  # 0 = garbage, 1 = valid
+
+def sinhala_garbage_mask(texts) -> np.ndarray:
+    """Lexicon/rule checks per comment, then the n-gram cascade, then one batched
+    garbage-model pass over whatever is still uncertain."""
+    texts = list(texts)
+    rules = np.array([sinhala_rule_garbage(text) for text in texts], dtype=bool)
+    return cascade_garbage_mask("Sinhala", texts, _transformer_garbage_mask, decided=rules)
 
-    return prediction == 0  # 0 = garbage, 1 = valid
+def is_sinhala_garbage(text: str, debug=False) -> bool:
+    if sinhala_rule_garbage(text, debug=debug):
+        return True
+
+    # N-gram cascade, then the garbage model for uncertain comments
+    is_garbage = bool(sinhala_garbage_mask([text])[0])
+    if debug:
+        cascade = get_model(CASCADE_MODELS["Sinhala"])
+        stage = "N-gram cascade" if cascade.active and cascade.decide([text])[0] >= 0 else "Garbage model"
+        print(f"🧠 {stage} prediction: {0 if is_garbage else 1}")
+    return is_garbage
 
 # ========== 📊 Sinhala Aspect Classification ==========
+def sinhala_aspect_probs(texts) -> np.ndarray:
+    aspect_tokenizer, aspect_model = get_model("sinhala_aspect")
+    logits = predict_logits(aspect_tokenizer, aspect_model, texts, batch_size=batch_size_for("sinhala_aspect"))
+    return softmax(logits)
+
 def classify_sinhala_aspect(text: str) -> str:
-    inputs = aspect_tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=128)
-    with torch.no_grad():
-        outputs = aspect_model(**inputs)
-        predicted_label = torch.argmax(outputs.logits, dim=1).item()
+    predicted_label = int(np.argmax(sinhala_aspect_probs([text])[0]))
     return aspect_label_map.get(predicted_label, "Unknown")
 
-# ========== 🔁 Combined Prediction ==========
-def sinhala_garbage_then_aspect(text: str) -> dict:
-    if is_sinhala_garbage(text):
-        return {
-            "comment": text,
-            "label": "garbage",
-            "aspect": None
-        }
-
-    # Step 1: Model prediction
-    model_aspect = classify_sinhala_aspect(text)
-
-    # Step 2: Lexicon override
-    corrected_aspect = model_aspect
+def lexicon_score_matrix(texts) -> np.ndarray:
+    """Keyword hit counts, one row per comment and one column per aspect label."""
+    lowered = [text.lower() for text in texts]
+    counts = np.zeros((len(lowered), len(ASPECT_NAMES)), dtype=np.float32)
     for aspect, keywords in aspect_lexicon.items():
+        if aspect not in ASPECT_NAMES:
+            continue
+        column = ASPECT_NAMES.index(aspect)
         for kw in keywords:
-            if kw.lower() in text.lower():
-                corrected_aspect = aspect
+            kw = kw.lower()
+            counts[:, column] += np.fromiter((kw in text for text in lowered), dtype=bool, count=len(lowered))
+    return counts
+
+def blend_aspects(model_probs, lexicon_counts):
+    """0.7 model / 0.3 normalised lexicon blend with the "Others" fallback, as arrays."""
+    max_lex = lexicon_counts.max(axis=1, keepdims=True)
+    lexicon_scores = lexicon_counts / np.where(max_lex > 0, max_lex, 1)
+    combined = 0.7 * model_probs + 0.3 * lexicon_scores
+
+    rows = np.arange(len(combined))
+    best = np.argmax(combined, axis=1)
+    fallback = (model_probs[rows, best] < 0.4) & (lexicon_scores[rows, best] < 0.1)
+    final = np.where(fallback, OTHERS_INDEX, best)
+    return final, model_probs[rows, final], lexicon_scores[rows, final], combined[rows, final]
+
+def override_aspects(model_probs, lexicon_counts):
+    """Model aspect, replaced by the first lexicon aspect (in lexicon order) that disagrees with it."""
+    lexicon_order = [ASPECT_NAMES.index(aspect) for aspect in aspect_lexicon if aspect in ASPECT_NAMES]
+    final = np.argmax(model_probs, axis=1)
+    for row, model_idx in enumerate(final):
+        for column in lexicon_order:
+            if lexicon_counts[row, column] > 0 and column != model_idx:
+                final[row] = column
                 break
-        if corrected_aspect != model_aspect:
-            break
-
-    return {
-        "comment": text,
-        "label": "valid",
-        "aspect": corrected_aspect
-    }
+    return final
+
+def _classify_sinhala_uncached(texts, lexicon_mode="blend") -> list:
+    texts = list(texts)
+    is_garbage = sinhala_garbage_mask(texts)
+    valid = np.flatnonzero(~is_garbage)
+    valid_texts = [texts[i] for i in valid]
+
+    results = [{"comment": text, "label": "garbage", "aspect": None} for text in texts]
+    if not valid_texts:
+        return results
+
+    model_probs = sinhala_aspect_probs(valid_texts)
+    lexicon_counts = lexicon_score_matrix(valid_texts)
+
+    if lexicon_mode == "override":
+        final = override_aspects(model_probs, lexicon_counts)
+        for i, aspect_idx in zip(valid, final):
+            results[i] = {"comment": texts[i], "label": "valid", "aspect": ASPECT_NAMES[aspect_idx]}
+        return results
+
+    final, model_scores, lexicon_scores, final_scores = blend_aspects(model_probs, lexicon_counts)
+    for row, i in enumerate(valid):
+        results[i] = {
+            "comment": texts[i],
+            "label": "valid",
+            "aspect": ASPECT_NAMES[final[row]],
+            "model_score": float(model_scores[row]),
+            "lexicon_score": float(lexicon_scores[row]),
+            "final_score": float(final_scores[row])
+        }
+    return results
+
+# ✅ Per normalized comment and lexicon mode, keyed on the cascade and both model fingerprints
+GARBAGE_ASPECT_MODELS = ("sinhala_garbage_cascade", "sinhala_garbage", "sinhala_aspect")
+combined_cache = prediction_cache("sinhala_garbage_aspect", models=GARBAGE_ASPECT_MODELS)
+
+def classify_sinhala_batch(texts, lexicon_mode="blend", normalized=None) -> list:
+    """Garbage filter, aspect model and lexicon scoring for a whole batch of Sinhala comments.
+
+    ``lexicon_mode="blend"`` is the scraper's 0.7/0.3 weighting with the "Others"
+    fallback; ``"override"`` keeps the /sinhala/combined keyword override.
+    ``normalized`` optionally gives each text's ``normalize_text`` form (computed once upstream).
+    """
+    texts = list(texts)
+    normalized = list(normalized) if normalized is not None else [normalize_text(text) for text in texts]
+    fingerprint = model_fingerprint(*GARBAGE_ASPECT_MODELS)
+    predictions = combined_cache.get_many(
+        [(norm, lexicon_mode, fingerprint) for norm in normalized], list(zip(texts, normalized)),
+        lambda missing: inference_store.get_many(
+            "sinhala_garbage_aspect", namespace_revision(*GARBAGE_ASPECT_MODELS),
+            [[norm, lexicon_mode, LEXICON_VERSION] for _, norm in missing], [text for text, _ in missing],
+            lambda rest: [
+                {k: v for k, v in result.items() if k != "comment"}
+                for result in _classify_sinhala_uncached(rest, lexicon_mode=lexicon_mode)
+            ],
+        )
+    )
+    return [{"comment": text, **prediction} for text, prediction in zip(texts, predictions)]
+
+# ========== 🔁 Combined Prediction ==========
+def sinhala_garbage_then_aspect_batch(texts) -> list:
+    return classify_sinhala_batch(texts, lexicon_mode="override")
+
+def sinhala_garbage_then_aspect(text: str) -> dict:
+    return sinhala_garbage_then_aspect_batch([text])[0]
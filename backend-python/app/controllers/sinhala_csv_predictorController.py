@@ -2,7 +2,8 @@ import os
 import re
 import pandas as pd
 from datetime import datetime
-from app.services.sentiment_sinhala_service import predict_sentiment_sinhala
+from app.services.sentiment_sinhala_service import predict_sentiment_sinhala, predict_sentiment_sinhala_batch
+from app.services.batch_inference import score_rows
 from app.db.mongodb import sinhala_collection
 import pytz
 
@@ -35,15 +36,14 @@ def process_sinhala_csv_prediction():
     if "Comment" not in df.columns or "Aspect" not in df.columns:
         raise ValueError("Excel file must contain 'Comment' and 'Aspect' columns")
 
+    rows = [row for _, row in df.iterrows() if not (pd.isna(row["Comment"]) or pd.isna(row["Aspect"]))]
+    scored = score_rows(rows, predict_sentiment_sinhala_batch, predict_sentiment_sinhala)
+
     predictions = []
-    for _, row in df.iterrows():
-        if pd.isna(row["Comment"]) or pd.isna(row["Aspect"]):
-            continue
-        try:
-            sentiment, score = predict_sentiment_sinhala(row["Comment"], row["Aspect"])
-        except Exception as e:
-            print(f"❌ Error for comment: {row['Comment']} | Error: {e}")
+    for row, prediction in zip(rows, scored):
+        if prediction is None:
             continue
+        sentiment, score = prediction
 
         sri_lanka_time = datetime.now(pytz.timezone("Asia/Colombo"))
         record = {
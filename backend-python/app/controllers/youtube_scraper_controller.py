@@ -1,17 +1,14 @@
 import os
 import re
-import json
-import torch
 import pandas as pd
 from datetime import datetime
-from torch.nn.functional import softmax
 from pymongo import MongoClient
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from app.utils.language_identifier import detect_language
-from app.controllers.english_aspect_predict_controller import garbage_then_aspect as english_combined_predict
-from app.controllers.sinhala_aspect_predict_controller import is_sinhala_garbage, aspect_tokenizer, aspect_model, aspect_label_map, aspect_lexicon
+from app.controllers.english_aspect_predict_controller import garbage_then_aspect_batch as english_combined_predict_batch
+from app.controllers.sinhala_aspect_predict_controller import classify_sinhala_batch
 
 print('first step done')
 client = MongoClient(os.getenv("MONGODB_URI"))
@@ -125,61 +122,47 @@ def get_top_comments(video_id, api_key_index, max_comments=200):
             return "error"
     return comments
 
-def classify_comment(text, lexicon, processed_comments):
-    clean_text = remove_emojis(text).strip().lower()
-    if not clean_text or clean_text in processed_comments:
-        return None, None
-
-    lang = detect_language(clean_text)
-
-    if lang == "en":
-        result = english_combined_predict(clean_text)
-        if result["label"] == "valid":
-            return result, "en"
-        if any(phrase in clean_text for phrase in ["can i use", "best app", "how to use"]):
-            return {"label": "valid", "aspect": "Digital Banking Experience"}, "en"
-        return result, "en"
-
-    elif lang == "si":
-        if is_sinhala_garbage(clean_text):
-            return {"label": "garbage", "aspect": None}, "si"
-
-        inputs = aspect_tokenizer(clean_text, return_tensors="pt", padding=True, truncation=True, max_length=128)
-        with torch.no_grad():
-            outputs = aspect_model(**inputs)
-            probs = softmax(outputs.logits, dim=1).squeeze()
-
-        model_scores = {aspect_label_map[i]: probs[i].item() for i in range(len(aspect_label_map))}
-        lexicon_scores = {aspect: 0 for aspect in aspect_label_map.values()}
-
-        for aspect, keywords in aspect_lexicon.items():
-            for kw in keywords:
-                if kw.lower() in clean_text:
-                    lexicon_scores[aspect] += 1
-
-        max_lex = max(lexicon_scores.values()) or 1
-        lexicon_scores = {k: v / max_lex for k, v in lexicon_scores.items()}
-
-        combined_scores = {
-            aspect: 0.7 * model_scores.get(aspect, 0) + 0.3 * lexicon_scores.get(aspect, 0)
-            for aspect in aspect_label_map.values()
-        }
+def classify_english_comments(clean_texts):
+    results = []
+    for clean_text, result in zip(clean_texts, english_combined_predict_batch(clean_texts)):
+        if result["label"] != "valid" and any(phrase in clean_text for phrase in ["can i use", "best app", "how to use"]):
+            result = {"label": "valid", "aspect": "Digital Banking Experience"}
+        results.append(result)
+    return results
+
+def classify_comments(texts, processed_comments):
+    """Classifies a list of raw comments; each language shares batched forward passes.
+
+    Returns one (result, lang) pair per input, in input order.
+    """
+    outputs = [(None, None)] * len(texts)
+    english, sinhala = [], []
+
+    for i, text in enumerate(texts):
+        clean_text = remove_emojis(text).strip().lower()
+        if not clean_text or clean_text in processed_comments:
+            continue
+
+        lang = detect_language(clean_text)
+        if lang == "en":
+            english.append((i, clean_text))
+        elif lang == "si":
+            sinhala.append((i, clean_text))
+        else:
+            outputs[i] = ({"label": "skip", "aspect": None}, lang)
 
-        final_aspect = max(combined_scores, key=combined_scores.get)
+    english_results = classify_english_comments([clean_text for _, clean_text in english])
+    for (i, _), result in zip(english, english_results):
+        outputs[i] = (result, "en")
 
-        if model_scores.get(final_aspect, 0) < 0.4 and lexicon_scores.get(final_aspect, 0) < 0.1:
-            final_aspect = "Others"
+    sinhala_results = classify_sinhala_batch([clean_text for _, clean_text in sinhala])
+    for (i, _), result in zip(sinhala, sinhala_results):
+        outputs[i] = (result, "si")
 
-        return {
-            "label": "valid",
-            "aspect": final_aspect,
-            "model_score": model_scores.get(final_aspect, 0),
-            "lexicon_score": lexicon_scores.get(final_aspect, 0),
-            "final_score": combined_scores.get(final_aspect, 0)
-        }, "si"
+    return outputs
 
-    else:
-        return {"label": "skip", "aspect": None}, lang
+def classify_comment(text, processed_comments):
+    return classify_comments([text], processed_comments)[0]
 
 def scrape_and_classify_to_mongo_and_csv(start_date: str, end_date: str):
     try:
@@ -202,6 +185,8 @@ def scrape_and_classify_to_mongo_and_csv(start_date: str, end_date: str):
 
         processed_comments = set()
 
+        # ✅ Collect in-range comments first so they can be classified in batches
+        in_range = []
         for video in search_youtube(keywords, api_key_index):
             comments = get_top_comments(video['video_id'], api_key_index)
             if comments == "error":
@@ -214,34 +199,38 @@ def scrape_and_classify_to_mongo_and_csv(start_date: str, end_date: str):
                     continue
                 if not (start_dt <= comment_date <= end_dt):
                     continue
+                in_range.append(c)
 
-                cleaned_comment = remove_emojis(c['comment']).encode('utf-8', 'ignore').decode('utf-8', 'ignore')
+        print(f"🧠 Classifying {len(in_range)} comments")
+        classified = classify_comments([c['comment'] for c in in_range], processed_comments)
 
-                result, lang = classify_comment(c['comment'], None, processed_comments)
-                if not result or result["label"] == "skip":
-                    results["skipped_langs"][lang] = results["skipped_langs"].get(lang, 0) + 1
-                    continue
+        for c, (result, lang) in zip(in_range, classified):
+            cleaned_comment = remove_emojis(c['comment']).encode('utf-8', 'ignore').decode('utf-8', 'ignore')
+
+            if not result or result["label"] == "skip":
+                results["skipped_langs"][lang] = results["skipped_langs"].get(lang, 0) + 1
+                continue
+
+            record = {
+                "comment": cleaned_comment,
+                "aspect": result.get("aspect"),
+                "published_at": c['published_at'],
+                "brand": brand,
+                "trigger_keywords": keywords,
+                "scrape_id": scrape_id
+            }
+
+            if lang == "si" and result["label"] == "valid":
+                record.update({
+                    "model_score": result.get("model_score"),
+                    "lexicon_score": result.get("lexicon_score"),
+                    "final_score": result.get("final_score")
+                })
 
-                record = {
-                    "comment": cleaned_comment,
-                    "aspect": result.get("aspect"),
-                    "published_at": c['published_at'],
-                    "brand": brand,
-                    "trigger_keywords": keywords,
-                    "scrape_id": scrape_id
-                }
-
-                if lang == "si" and result["label"] == "valid":
-                    record.update({
-                        "model_score": result.get("model_score"),
-                        "lexicon_score": result.get("lexicon_score"),
-                        "final_score": result.get("final_score")
-                    })
-
-                if result["label"] == "valid":
-                    results["english_valid" if lang == "en" else "sinhala_valid"].append(record)
-                else:
-                    results["english_garbage" if lang == "en" else "sinhala_garbage"].append(record)
+            if result["label"] == "valid":
+                results["english_valid" if lang == "en" else "sinhala_valid"].append(record)
+            else:
+                results["english_garbage" if lang == "en" else "sinhala_garbage"].append(record)
 
         if results["english_valid"]:
             db["English_Aspects"].insert_many(results["english_valid"])
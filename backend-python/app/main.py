@@ -1,8 +1,10 @@
 import sys
 import os
+import threading
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
 # ✅ Load environment variables
 load_dotenv()
@@ -19,7 +21,7 @@ from app.services.keyword.english.databaseService import db  # Fix import issue
 from app.routes.keyword_routes import router as keyword_router
 # ✅ Import routers
 from app.routes.sentiment_routes import router as sentiment_router          # English Sentiment
-from app.routes.sentiment_sinhala_routes import router as sinhala_router    # Sinhala Sentiment
+from app.routes.sentiment_sinhala_routes import router as sinhala_sentiment_router    # Sinhala Sentiment
 print("🧪 Importing sentiment_csv_english_route...")
 from app.routes.sentiment_csv_english_route import router as eng_csv_route
 print("✅ Imported english_csv_route")
@@ -34,6 +36,12 @@ from app.routes.English_aspect_predict_routes import router as english_router
 from app.routes.Sinhala_aspect_predict_routes import router as sinhala_router
 from app.routes.aspect_scraper_routes import router as aspect_scraper_router
 from app.routes.results_routes import router as results_router
+from app.routes.inference_routes import router as inference_router
+from app.routes.analyze_routes import router as analyze_router
+from app.services.model_registry import registry
+from app.services.model_swap import start_swap_watcher
+from app.services.inference_governor import DeadlineExceeded, Overloaded
+from app import config
 from app.routes import youtube_meta_routes
 
 
@@ -44,7 +52,7 @@ app = FastAPI()
 app.include_router(keyword_router, prefix="/api/keyword", tags=["Keywords"])
 # ✅ Register all routes
 app.include_router(sentiment_router, prefix="/api/predict", tags=["English Sentiment"])
-app.include_router(sinhala_router, prefix="/api/predict", tags=["Sinhala Sentiment"])
+app.include_router(sinhala_sentiment_router, prefix="/api/predict", tags=["Sinhala Sentiment"])
 app.include_router(eng_csv_route, prefix="/api/csv", tags=["CSV English Prediction"])
 app.include_router(sinhala_csv_router, prefix="/api/csv", tags=["CSV Sinhala Prediction"])
 
@@ -54,6 +62,8 @@ app.include_router(english_router, prefix="/api/predict", tags=["English Aspect
 app.include_router(sinhala_router, prefix="/api/predict", tags=["Sinhala Aspect Prediction"])
 app.include_router(aspect_scraper_router, prefix="/api", tags=["Aspect Classification"])
 app.include_router(results_router, prefix="/api/results", tags=["Results"])  # ✅ KEEP this!
+app.include_router(inference_router, prefix="/api/inference", tags=["Inference"])
+app.include_router(analyze_router, prefix="/api/analyze", tags=["Unified Analysis"])
 
 
 from app.routes.youtube_meta_routes import router as meta_router
@@ -73,6 +83,15 @@ app.add_middleware(
 def read_root():
     return {"message": "Welcome to the Python backend!"}
 
+# ✅ Admission control: shed / expired inference work answers fast with a Retry-After
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=429, content={"error": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=503, content={"error": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
 # ✅ Check MongoDB Connection on Startup
 @app.on_event("startup")
 async def startup_db_client():
@@ -82,6 +101,22 @@ async def startup_db_client():
     except Exception as e:
         print(f"❌ MongoDB Connection Failed: {str(e)}")
 
+# ✅ Preload PRELOAD_MODELS (then AUTOTUNE_ON_STARTUP tuning) in the background; /api/inference/ready reports progress
+@app.on_event("startup")
+async def preload_models():
+    def preload_and_tune():
+        registry.preload()
+        if config.AUTOTUNE_ON_STARTUP:
+            # Only models without a tuning for this host (one process at a time); batch paths
+            # pick the result up immediately. app.prefork tunes in the parent instead.
+            from app.services.batch_autotune import autotune_on_startup
+            autotune_on_startup()
+
+    if config.PRELOAD_MODELS or config.AUTOTUNE_ON_STARTUP:
+        threading.Thread(target=preload_and_tune, name="model-preload", daemon=True).start()
+    registry.start_residency_sweeper()
+    start_swap_watcher()
+
 
 
 # ✅ Root Route
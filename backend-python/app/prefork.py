@@ -0,0 +1,170 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from app import config
+from app.utils.process_memory import memory_report
+
+# Production launcher: ``python -m app.prefork --workers 4``
+#
+# The parent loads and warms every preload model once, freezes the weights and
+# moves all live Python objects into the GC's permanent generation, then forks
+# the HTTP workers. The workers inherit the model pages copy-on-write; since
+# neither inference nor the garbage collector writes to them, they stay shared
+# and each worker only adds its own private pages (see the memory report).
+# Linux only (os.fork + /proc/<pid>/smaps_rollup).
+
+def freeze_parameters(value):
+    """No grads, no autograd bookkeeping: the weight tensors are never written after the fork."""
+    from app.services.model_registry import torch_modules
+    count = 0
+    for module in torch_modules(value):
+        module.eval()
+        module.requires_grad_(False)
+        count += 1
+    return count
+
+def load_and_warm(names):
+    from app.services.inference_governor import configure_torch_threads
+    from app.services.model_registry import registry
+
+    # A single intra-op thread in the parent: an OpenMP pool created before
+    # fork() is not usable in the children (and can hang them). Configuring it
+    # here also makes the budget model_backends applies on import a no-op.
+    configure_torch_threads(num_threads=1)
+    # registry.get loads and warms (services/model_warmup.py) each model
+    for name in registry.resolve(names):
+        frozen = freeze_parameters(registry.get(name))
+        print(f"🧊 {name}: {frozen} module(s) frozen")
+
+    gc.collect()
+    gc.freeze()
+    print(f"🧊 gc.freeze(): {gc.get_freeze_count()} objects moved to the permanent generation")
+
+def autotune_before_fork():
+    """AUTOTUNE_ON_STARTUP: profile once, before the workers exist, so nothing else competes for the cores.
+
+    Runs the tuning CLI in a child process: the parent has to stay on a single
+    torch thread, while the tuning must be measured with the workers' budget.
+    """
+    print("⏱️ Tuning batch sizes for models without a tuning on this host...")
+    result = subprocess.run(
+        [sys.executable, "-m", "app.services.batch_autotune", "tune", "--missing"],
+        cwd=config.BASE_DIR,
+    )
+    if result.returncode != 0:
+        print(f"⚠️ Batch autotuning exited with status {result.returncode}; serving the untuned defaults")
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(sock, worker_id):
+    import torch
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    torch.set_num_threads(max(config.TORCH_NUM_THREADS, 1))
+    # The parent already tuned (autotune_before_fork); workers only read the result
+    config.AUTOTUNE_ON_STARTUP = False
+
+    # The app (and its MongoDB clients) is imported after the fork, per worker
+    from app.main import app
+    print(f"🚀 Worker {worker_id} (pid {os.getpid()}) serving")
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    server.run(sockets=[sock])
+
+def spawn_worker(sock, worker_id):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock, worker_id)
+        except BaseException as e:
+            print(f"❌ Worker {worker_id} crashed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+def print_memory_report(workers):
+    report = memory_report(os.getpid(), list(workers))
+    if report["parent"] is None:
+        print("⚠️ /proc/<pid>/smaps_rollup not available; no memory report")
+        return report
+    parent = report["parent"]
+    print(f"📊 parent pid {parent['pid']}: RSS {parent['rss_mb']} MB, PSS {parent['pss_mb']} MB")
+    for usage in report["workers"]:
+        print(f"📊 worker pid {usage['pid']}: RSS {usage['rss_mb']} MB, PSS {usage['pss_mb']} MB, "
+              f"adds {usage['private_mb']} MB private, {usage['shared_mb']} MB shared")
+    print(f"📊 total: RSS {report['total_rss_mb']} MB (double counts shared pages), PSS {report['total_pss_mb']} MB")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load models once, then fork HTTP workers that share them")
+    parser.add_argument("--host", default=config.PREFORK_HOST)
+    parser.add_argument("--port", type=int, default=config.env_int("PORT", 8000))
+    parser.add_argument("--workers", type=int, default=config.PREFORK_WORKERS)
+    parser.add_argument("--preload", nargs="+", default=config.PRELOAD_MODELS or ["all"],
+                        help='model registry names, or "all"')
+    parser.add_argument("--report-every", type=float, default=config.PREFORK_MEMORY_REPORT_SECONDS,
+                        help="seconds between memory reports (0 = once after start-up)")
+    args = parser.parse_args(argv)
+
+    if config.AUTOTUNE_ON_STARTUP:
+        autotune_before_fork()
+    load_and_warm(args.preload)
+    sock = bind_socket(args.host, args.port)
+
+    workers = {}
+    for worker_id in range(args.workers):
+        workers[spawn_worker(sock, worker_id)] = worker_id
+    print(f"✅ {args.workers} workers forked on {args.host}:{args.port}")
+
+    stopping = False
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Let the workers import the app before the first report
+    time.sleep(5)
+    print_memory_report(workers)
+    next_report = time.monotonic() + args.report_every if args.report_every > 0 else None
+
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            worker_id = workers.pop(pid)
+            if not stopping:
+                print(f"⚠️ Worker {worker_id} (pid {pid}) exited with status {status}; restarting")
+                workers[spawn_worker(sock, worker_id)] = worker_id
+            continue
+        if next_report and time.monotonic() >= next_report:
+            print_memory_report(workers)
+            next_report = time.monotonic() + args.report_every
+        time.sleep(0.5)
+
+    sock.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
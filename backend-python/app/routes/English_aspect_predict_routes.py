@@ -1,7 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header
 from pydantic import BaseModel
-from typing import List
-from app.controllers.english_aspect_predict_controller import garbage_then_aspect
+from typing import List, Optional
+from app.controllers.english_aspect_predict_controller import garbage_then_aspect_batch
+from app.services.inference_governor import admission
 
 
 router = APIRouter()
@@ -10,9 +11,7 @@ class CombinedInput(BaseModel):
     comments: List[str]
 
 @router.post("/garbage-then-aspect")
-def classify_valid_and_aspect(input: CombinedInput):
-    results = []
-    for comment in input.comments:
-        result = garbage_then_aspect(comment)
-        results.append(result)
+def classify_valid_and_aspect(input: CombinedInput, x_deadline_ms: Optional[float] = Header(None)):
+    with admission(["english_garbage", "english_aspect"], len(input.comments), x_deadline_ms):
+        results = garbage_then_aspect_batch(input.comments)
     return {"status": "success", "data": results}
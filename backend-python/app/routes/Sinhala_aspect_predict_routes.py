@@ -1,11 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header
 from pydantic import BaseModel
-from typing import List
-from app.controllers.sinhala_aspect_predict_controller import (
-    is_sinhala_garbage,
-    classify_sinhala_aspect,
-    sinhala_garbage_then_aspect
-)
+from typing import List, Optional
+from app.controllers.sinhala_aspect_predict_controller import sinhala_garbage_then_aspect_batch
+from app.services.inference_governor import admission
 
 
 router = APIRouter()
@@ -33,9 +30,7 @@ class SinhalaInput(BaseModel):
 
 # 🔁 Combined: Garbage Filter + Aspect Classification
 @router.post("/sinhala/combined")
-def sinhala_combined_predict(input: SinhalaInput):
-    results = []
-    for comment in input.comments:
-        result = sinhala_garbage_then_aspect(comment)
-        results.append(result)
+def sinhala_combined_predict(input: SinhalaInput, x_deadline_ms: Optional[float] = Header(None)):
+    with admission(["sinhala_garbage", "sinhala_aspect"], len(input.comments), x_deadline_ms):
+        results = sinhala_garbage_then_aspect_batch(input.comments)
     return {"status": "success", "data": results}
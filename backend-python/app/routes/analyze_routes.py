@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Header
+from pydantic import BaseModel
+from typing import List, Optional
+from app.controllers.analyze_controller import analyze_planned, models_for, plan_analysis
+from app.services.inference_governor import admission
+
+router = APIRouter()
+
+class AnalyzeInput(BaseModel):
+    comments: List[str]
+
+# 🔁 Mixed-language comments: language detection, garbage → aspect → sentiment in one round trip
+@router.post("")
+def analyze(input: AnalyzeInput, x_deadline_ms: Optional[float] = Header(None)):
+    plan = plan_analysis(input.comments)
+    models = models_for(plan)
+    if not models:
+        return {"status": "success", **analyze_planned(plan)}
+    with admission(models, len(plan["unique"]), x_deadline_ms):
+        result = analyze_planned(plan)
+    return {"status": "success", **result}
@@ -1,15 +1,19 @@
 from fastapi import APIRouter, Query
 from fastapi.responses import JSONResponse
 from app.controllers.youtube_scraper_controller import scrape_and_classify_to_mongo_and_csv
+from app.services.inference_governor import inference_priority
 import traceback
 
 router = APIRouter()
 
+# ✅ Plain def: the blocking scrape + classification runs in the threadpool, not on the event loop
 @router.get("/aspect/scrape")
-async def trigger_scraping(start_date: str = Query(...), end_date: str = Query(...)):
+def trigger_scraping(start_date: str = Query(...), end_date: str = Query(...)):
     try:
         print("🔍 Start scraping from", start_date, "to", end_date)
-        result = scrape_and_classify_to_mongo_and_csv(start_date, end_date)
+        # ✅ Bulk job: yields the models to interactive predictions
+        with inference_priority("bulk"):
+            result = scrape_and_classify_to_mongo_and_csv(start_date, end_date)
 
         if not isinstance(result, dict):
             print("❌ Invalid response format from scraper:", result)
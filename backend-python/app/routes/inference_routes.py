@@ -0,0 +1,107 @@
+import hmac
+import os
+from typing import Optional
+from fastapi import APIRouter, Header
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from app.services.batch_inference import padding_stats
+from app.services.inference_governor import governor_stats
+from app.services.model_registry import registry
+from app.services.sentiment_service import sentiment_batcher
+from app.services.sentiment_sinhala_service import sentiment_sinhala_batcher, sentiment_tier_stats
+from app.utils.process_memory import memory_usage
+from app.utils.cache_handler import cache_stats
+from app.services.inference_store import inference_store
+from app.services.tokenization import tokenizer_stats
+from app.services.garbage_cascade import cascade_stats
+from app.services.batch_autotune import tuning_stats
+from app.services.model_backends import MODEL_SPECS
+from app.services.model_swap import requested_revisions, resolve_swap_revision, swap_in_background
+from app import config
+
+router = APIRouter()
+
+# ✅ Batching / padding statistics for tuning LENGTH_BUCKET_EDGES and batch sizes
+@router.get("/stats")
+def get_inference_stats():
+    return {
+        "length_bucketing": config.LENGTH_BUCKETING,
+        "bucket_edges": config.LENGTH_BUCKET_EDGES,
+        "padding": padding_stats(),
+        "governor": governor_stats(),
+        "micro_batching": [sentiment_batcher.stats(), sentiment_sinhala_batcher.stats()],
+        "sinhala_sentiment_tiers": sentiment_tier_stats(),
+        "prediction_cache": cache_stats(),
+        "inference_store": inference_store.stats(),
+        "tokenization": tokenizer_stats(),
+        "garbage_cascade": cascade_stats(),
+        "batch_tuning": tuning_stats(),
+    }
+
+# ✅ Readiness: 503 until every PRELOAD_MODELS entry is loaded and warmed; per-model state, load + warmup time
+@router.get("/ready")
+def get_readiness():
+    ready = registry.is_ready()
+    body = {
+        "ready": ready,
+        "preload": registry.resolve(config.PRELOAD_MODELS),
+        "models": registry.status(),
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+# ✅ Model residency: memory budget, per-model footprint / idle time, eviction + reload log
+@router.get("/models")
+def get_models():
+    return {"residency": registry.residency(), "models": registry.status()}
+
+# ✅ Hot swap: load + warm a new revision in the background, then swap it in (all workers follow)
+class SwapInput(BaseModel):
+    revision: str
+
+@router.post("/models/{name}/swap")
+def swap_model_revision(name: str, input: SwapInput, x_admin_token: Optional[str] = Header(None)):
+    # Disabled unless ADMIN_TOKEN is set: a swap loads new weights into every worker
+    if not config.ADMIN_TOKEN or not hmac.compare_digest(x_admin_token or "", config.ADMIN_TOKEN):
+        return JSONResponse(status_code=403, content={"error": "Admin token required (set ADMIN_TOKEN to enable swaps)"})
+    if name not in MODEL_SPECS:
+        return JSONResponse(status_code=400, content={"error": f"'{name}' can't be swapped. Use one of: {', '.join(MODEL_SPECS)}"})
+    if config.MODEL_SERVER_ADDRESS:
+        # The weights live in the model server processes, which don't swap
+        return JSONResponse(status_code=409, content={
+            "error": "Hot swaps are not supported with MODEL_SERVER_ADDRESS; set the revision and restart the model server"
+        })
+    swap = registry.status(name)[name]["swap"]
+    if swap and swap["state"] in ("loading", "warming"):
+        return JSONResponse(status_code=409, content={"error": f"A swap of '{name}' is already running", "swap": swap})
+
+    try:
+        revision = resolve_swap_revision(name, input.revision)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"error": f"Could not check '{input.revision}' against the hub: {e}"})
+    if revision is None:
+        return JSONResponse(status_code=400, content={
+            "error": f"'{input.revision}' is not a commit on the main history of {MODEL_SPECS[name]['path']}"
+        })
+
+    swap_in_background(name, revision)
+    return JSONResponse(status_code=202, content={
+        "model": name,
+        "revision": revision,
+        "message": "Loading and warming in the background; GET /api/inference/models/swaps for progress",
+    })
+
+@router.get("/models/swaps")
+def get_model_swaps():
+    status = registry.status()
+    return {
+        "requested": requested_revisions(),
+        "models": {
+            name: {"fingerprint": registry.fingerprint(name), "swap": status[name]["swap"], "draining": status[name]["draining"]}
+            for name in MODEL_SPECS
+        },
+    }
+
+# ✅ Memory of this worker process (under app.prefork, private_mb is what the worker adds)
+@router.get("/memory")
+def get_memory():
+    return {"parent_pid": os.getppid(), "worker": memory_usage()}
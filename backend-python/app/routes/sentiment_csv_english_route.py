@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from app.controllers.english_csv_predictorController import process_english_csv_prediction
+from app.services.inference_governor import inference_priority
 
 router = APIRouter()
 
@@ -10,7 +11,9 @@ def run_english_sentiment_pipeline():
     saves to MongoDB, and returns results.
     """
     try:
-        result = process_english_csv_prediction()
+        # ✅ Bulk job: yields the models to interactive predictions
+        with inference_priority("bulk"):
+            result = process_english_csv_prediction()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,12 @@
 #eng rou
-from fastapi import APIRouter
+from fastapi import APIRouter, Header
 from pydantic import BaseModel
-from typing import List
-from app.controllers.sentiment_controller import predict_sentiment
+from typing import List, Optional
+from app.controllers.sentiment_controller import (
+    SENTIMENT_MAP, predict_sentiment_batch, predict_sentiment_matrix, predict_sentiment_queued
+)
+from app.controllers.english_aspect_predict_controller import ASPECT_LABELS
+from app.services.inference_governor import admission
 
 router = APIRouter()
 
@@ -13,9 +17,14 @@ class SentimentInput(BaseModel):
 class SentimentBatchInput(BaseModel):
     items: List[SentimentInput]
 
+class SentimentMatrixInput(BaseModel):
+    reviews: List[str]
+    aspects: Optional[List[str]] = None  # default: all six aspect labels
+
 @router.post("/sentiment")
-def get_sentiment(input: SentimentInput):
-    sentiment, score = predict_sentiment(input.review, input.aspect)
+def get_sentiment(input: SentimentInput, x_deadline_ms: Optional[float] = Header(None)):
+    with admission(["english_sentiment"], 1, x_deadline_ms):
+        sentiment, score = predict_sentiment_queued(input.review, input.aspect)
     return {
         "review": input.review,
         "aspect": input.aspect,
@@ -24,10 +33,11 @@ def get_sentiment(input: SentimentInput):
     }
 
 @router.post("/sentiment-batch")
-def get_batch_sentiments(input: SentimentBatchInput):
+def get_batch_sentiments(input: SentimentBatchInput, x_deadline_ms: Optional[float] = Header(None)):
+    with admission(["english_sentiment"], len(input.items), x_deadline_ms):
+        predictions = predict_sentiment_batch([(item.review, item.aspect) for item in input.items])
     results = []
-    for item in input.items:
-        sentiment, score = predict_sentiment(item.review, item.aspect)
+    for item, (sentiment, score) in zip(input.items, predictions):
         results.append({
             "review": item.review,
             "aspect": item.aspect,
@@ -37,4 +47,27 @@ def get_batch_sentiments(input: SentimentBatchInput):
     return {
         "status": "success",
         "data": results
-    }
\ No newline at end of file
+    }
+
+# ✅ Every review against every aspect in one batched pass: reviews x aspects x classes
+@router.post("/sentiment-matrix")
+def get_sentiment_matrix(input: SentimentMatrixInput, x_deadline_ms: Optional[float] = Header(None)):
+    aspects = input.aspects or list(ASPECT_LABELS.values())
+    with admission(["english_sentiment"], len(input.reviews) * len(aspects), x_deadline_ms):
+        probabilities, sentiments = predict_sentiment_matrix(input.reviews, aspects)
+    return {
+        "status": "success",
+        "aspects": aspects,
+        "classes": [SENTIMENT_MAP[i] for i in sorted(SENTIMENT_MAP)],
+        "probabilities": probabilities.round(4).tolist(),
+        "data": [
+            {
+                "review": review,
+                "sentiments": [
+                    {"aspect": aspect, "sentiment": sentiment, "score": score}
+                    for aspect, (sentiment, score) in zip(aspects, row)
+                ]
+            }
+            for review, row in zip(input.reviews, sentiments)
+        ]
+    }
@@ -1,7 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header
 from pydantic import BaseModel
-from typing import List
-from app.controllers.sentiment_sinhala_controller import predict_sentiment_sinhala
+from typing import List, Optional
+from app.controllers.sentiment_sinhala_controller import predict_sentiment_sinhala_bulk, predict_sentiment_sinhala_queued
+from app.services.inference_governor import admission
 
 router = APIRouter()
 
@@ -13,8 +14,9 @@ class SentimentBatchInputSinhala(BaseModel):
     items: List[SentimentInputSinhala]
 
 @router.post("/sinhala-sentiment")
-def get_sentiment_sinhala(input: SentimentInputSinhala):
-    sentiment, score = predict_sentiment_sinhala(input.review, input.aspect)
+def get_sentiment_sinhala(input: SentimentInputSinhala, x_deadline_ms: Optional[float] = Header(None)):
+    with admission(["sinhala_sentiment"], 1, x_deadline_ms):
+        sentiment, score = predict_sentiment_sinhala_queued(input.review, input.aspect)
     return {
         "review": input.review,
         "aspect": input.aspect,
@@ -23,10 +25,11 @@ def get_sentiment_sinhala(input: SentimentInputSinhala):
     }
 
 @router.post("/sinhala-sentiment-batch")
-def get_batch_sentiments_sinhala(input: SentimentBatchInputSinhala):
+def get_batch_sentiments_sinhala(input: SentimentBatchInputSinhala, x_deadline_ms: Optional[float] = Header(None)):
+    with admission(["sinhala_sentiment"], len(input.items), x_deadline_ms):
+        predictions, tiers = predict_sentiment_sinhala_bulk([(item.review, item.aspect) for item in input.items])
     results = []
-    for item in input.items:
-        sentiment, score = predict_sentiment_sinhala(item.review, item.aspect)
+    for item, (sentiment, score) in zip(input.items, predictions):
         results.append({
             "review": item.review,
             "aspect": item.aspect,
@@ -35,5 +38,6 @@ def get_batch_sentiments_sinhala(input: SentimentBatchInputSinhala):
         })
     return {
         "status": "success",
+        "tiers": tiers,
         "data": results
     }
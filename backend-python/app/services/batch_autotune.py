@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+from datetime import datetime
+import numpy as np
+from app import config
+
+# Batch-size autotuner: times every sequence classifier on this machine at
+# several batch sizes per LENGTH_BUCKET_EDGES bucket and keeps, per bucket, the
+# smallest batch that reaches AUTOTUNE_KNEE of the best throughput while a
+# forward pass stays under AUTOTUNE_LATENCY_SLO_MS. The result is written to
+# models/batch_tuning.json (per host: CPU count + torch threads, and per backend
+# + precision) and picked up by batch_size_for, the per-bucket batch planner and
+# the micro-batchers. Explicit per-model env settings (e.g.
+# SINHALA_ASPECT_INFERENCE_BATCH_SIZE) still win.
+#
+#   python -m app.services.batch_autotune tune [--model sinhala_aspect] [--slo-ms 150]
+#   python -m app.services.batch_autotune show
+#
+# Tune once per host (this CLI, or AUTOTUNE_ON_STARTUP in the app.prefork parent);
+# processes profiling side by side on shared cores would corrupt each other's timings.
+
+BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64, 128)
+
+_lock = threading.Lock()
+_tuning = None
+_tuning_mtime = None
+_warned = set()
+
+
+def host_signature():
+    import torch
+    return {
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count() or 1,
+        "torch_threads": max(config.TORCH_NUM_THREADS, 1),
+        "torch": torch.__version__,
+    }
+
+def _host_key(host):
+    return f"{host['machine']}/{host['cpu_count']}cpu/{host['torch_threads']}threads"
+
+def _mtime():
+    try:
+        return os.stat(config.BATCH_TUNING_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+def load_tuning(refresh=False):
+    """The tuning file, re-read whenever it changes (e.g. written by another process)."""
+    global _tuning, _tuning_mtime
+    mtime = _mtime()
+    with _lock:
+        if _tuning is None or refresh or mtime != _tuning_mtime:
+            try:
+                with open(config.BATCH_TUNING_FILE, "r", encoding="utf-8") as f:
+                    _tuning = json.load(f)
+            except FileNotFoundError:
+                _tuning = {}
+            _tuning_mtime = mtime
+        return _tuning
+
+def save_tuning(tuning):
+    global _tuning, _tuning_mtime
+    os.makedirs(os.path.dirname(config.BATCH_TUNING_FILE), exist_ok=True)
+    tmp = f"{config.BATCH_TUNING_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(tmp, config.BATCH_TUNING_FILE)
+    with _lock:
+        _tuning, _tuning_mtime = tuning, _mtime()
+
+def serving_setup(model_key):
+    """Configured backend + precision: a tuning measured under other ones doesn't apply."""
+    return {
+        "backend_setting": config.model_setting(model_key, "MODEL_BACKEND", config.MODEL_BACKEND, config.env_str),
+        "precision": config.model_setting(model_key, "MODEL_PRECISION", config.MODEL_PRECISION, config.env_str),
+    }
+
+def _ignore(model_key, reason):
+    if (model_key, reason) not in _warned:
+        _warned.add((model_key, reason))
+        print(f"⚠️ Batch tuning for '{model_key}' was measured {reason}; ignoring it")
+    return {}
+
+def tuning_for(model_key):
+    """The persisted tuning for ``model_key`` when it was measured on a host like this one,
+    with the same backend and precision, else {}."""
+    if not config.AUTOTUNED_BATCHING:
+        return {}
+    entry = load_tuning().get(model_key)
+    if not entry:
+        return {}
+    # Cheap host check (no torch import): CPU count + thread budget decide the best batch
+    host = entry.get("host", {})
+    if host.get("cpu_count") != (os.cpu_count() or 1) or host.get("torch_threads") != max(config.TORCH_NUM_THREADS, 1):
+        return _ignore(model_key, f"on {_host_key(host) if host else 'another host'}")
+    setup = serving_setup(model_key)
+    if any(entry.get(name) != value for name, value in setup.items()):
+        measured = f"{entry.get('backend_setting', '?')}/{entry.get('precision', '?')}"
+        return _ignore(model_key, f"with {measured}, not {setup['backend_setting']}/{setup['precision']}")
+    return entry
+
+def tuned_setting(model_key, name, value, default, cast=config.env_int):
+    """Per-model env override, else the tuned ``value`` (if any), else the global setting."""
+    if value is not None and os.getenv(f"{model_key.upper()}_{name}") in (None, ""):
+        return value
+    return config.model_setting(model_key, name, default, cast)
+
+def tuned_batch_size(model_key):
+    sizes = tuning_for(model_key).get("bucket_batch_sizes")
+    if not sizes:
+        return None
+    # Without bucketing a batch is padded to its longest row: size for the longest bucket
+    return max(sizes.values()) if config.LENGTH_BUCKETING else sizes[max(sizes, key=_bucket_order)]
+
+def tuned_bucket_sizes(model_key):
+    """{bucket label: batch size} caps for the length-bucketed planner (empty when untuned)."""
+    return dict(tuning_for(model_key).get("bucket_batch_sizes") or {})
+
+def microbatch_size_for(model_key):
+    return tuned_setting(model_key, "MICROBATCH_MAX_SIZE", tuning_for(model_key).get("microbatch_max_size"),
+                         config.MICROBATCH_MAX_SIZE)
+
+def tuning_stats():
+    """Effective batch settings per classifier, and whether they come from a tuning."""
+    from app.services.batch_inference import batch_size_for
+    from app.services.model_backends import MODEL_SPECS
+    return {
+        model_key: {
+            "tuned": bool(tuning_for(model_key)),
+            "batch_size": batch_size_for(model_key),
+            "bucket_batch_sizes": tuned_bucket_sizes(model_key),
+            "microbatch_max_size": microbatch_size_for(model_key),
+        }
+        for model_key in MODEL_SPECS
+    }
+
+def _bucket_order(label):
+    return (label.startswith(">"), int(label.lstrip("<=>")))
+
+
+# ==============================
+# 🔹 Profiling
+# ==============================
+
+def time_forward(model_key, tokenizer, backend, batch_size, length, repeats):
+    """Median seconds of one forward pass over a ``batch_size x length`` batch."""
+    from app.services.inference_governor import forward_slot
+    from app.services.model_warmup import _synthetic_text
+
+    encoded = tokenizer(
+        [_synthetic_text(length)] * batch_size,
+        padding="max_length", truncation=True, max_length=length, return_tensors="pt"
+    )
+    timings = []
+    for _ in range(repeats + 1):
+        with forward_slot(model_key, priority="bulk"):
+            start = time.perf_counter()
+            backend.logits(encoded)
+            timings.append(time.perf_counter() - start)
+    # First pass is a warmup at this shape
+    return float(np.median(timings[1:]))
+
+def choose_batch_size(points, slo_ms, knee):
+    """Smallest batch within ``knee`` of the best throughput among points under the SLO."""
+    feasible = [p for p in points if p["latency_ms"] <= slo_ms] or [min(points, key=lambda p: p["latency_ms"])]
+    best = max(p["rows_per_second"] for p in feasible)
+    return min(p["batch_size"] for p in feasible if p["rows_per_second"] >= knee * best)
+
+def typical_bucket(model_key, labels):
+    """Bucket of the median stored comment: where single (micro-batched) requests usually land."""
+    from app.services.batch_inference import bucket_label, bucket_of
+    from app.services.model_backends import load_stored_comments
+    from app.services.tokenization import encode_batch
+    from app.services.model_registry import get_model
+
+    tokenizer, _ = get_model(model_key)
+    texts = load_stored_comments(model_key, limit=256)
+    if not texts:
+        return max(labels, key=_bucket_order)
+    median = int(np.median([len(row["input_ids"]) for row in encode_batch(tokenizer, texts)]))
+    label = bucket_label(bucket_of(median))
+    return label if label in labels else max(labels, key=_bucket_order)
+
+def profile_model(model_key, slo_ms=None, knee=None, batch_sizes=BATCH_SIZES, repeats=5):
+    from app.services.batch_inference import bucket_label, bucket_of
+    from app.services.model_registry import get_model
+    from app.services.model_warmup import warmup_lengths
+
+    slo_ms = slo_ms or config.model_setting(model_key, "AUTOTUNE_LATENCY_SLO_MS", config.AUTOTUNE_LATENCY_SLO_MS)
+    knee = knee or config.AUTOTUNE_KNEE
+    tokenizer, backend = get_model(model_key)
+
+    print(f"⏱️ Profiling '{model_key}' ({backend.name}) under a {slo_ms:.0f} ms SLO")
+    profile, bucket_sizes = [], {}
+    for length in warmup_lengths():
+        label = bucket_label(bucket_of(length))
+        points = []
+        for batch_size in batch_sizes:
+            seconds = time_forward(model_key, tokenizer, backend, batch_size, length, repeats)
+            point = {
+                "bucket": label, "length": length, "batch_size": batch_size,
+                "latency_ms": round(seconds * 1000.0, 3),
+                "rows_per_second": round(batch_size / max(seconds, 1e-9), 1),
+            }
+            points.append(point)
+            print(f"   {label:>6} x{batch_size:<4} {point['latency_ms']:>9.1f} ms {point['rows_per_second']:>9.1f} rows/s")
+            if point["latency_ms"] > 2 * slo_ms:
+                # Larger batches only get slower per pass
+                break
+        bucket_sizes[label] = choose_batch_size(points, slo_ms, knee)
+        profile.extend(points)
+
+    entry = {
+        "bucket_batch_sizes": bucket_sizes,
+        "microbatch_max_size": bucket_sizes[typical_bucket(model_key, list(bucket_sizes))],
+        "slo_ms": slo_ms,
+        "knee": knee,
+        "backend": backend.name,
+        **serving_setup(model_key),
+        "host": host_signature(),
+        "tuned_at": datetime.now().isoformat(timespec="seconds"),
+        "profile": profile,
+    }
+    print(f"✅ {model_key}: {bucket_sizes} (micro-batch {entry['microbatch_max_size']})")
+    return entry
+
+def autotune(model_keys=None, slo_ms=None, knee=None, only_missing=False):
+    """Profiles ``model_keys`` (default: every sequence classifier) and persists the choices."""
+    from app.services.model_backends import MODEL_SPECS
+
+    tuning = dict(load_tuning(refresh=True))
+    for model_key in model_keys or list(MODEL_SPECS):
+        if only_missing and tuning_for(model_key):
+            continue
+        tuning[model_key] = profile_model(model_key, slo_ms, knee)
+        save_tuning(tuning)
+    return tuning
+
+def autotune_on_startup():
+    """AUTOTUNE_ON_STARTUP: tunes the models missing a tuning, unless another process on this host
+    already is (the others pick the file up once it is written)."""
+    os.makedirs(os.path.dirname(config.BATCH_TUNING_FILE), exist_ok=True)
+    with open(config.BATCH_TUNING_FILE + ".lock", "w") as lock_file:
+        try:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            pass
+        except OSError:
+            print("⏭️ Another process is tuning batch sizes; using its result once written")
+            return None
+        return autotune(only_missing=True)
+
+def main(argv=None):
+    from app.services.model_backends import MODEL_SPECS
+
+    parser = argparse.ArgumentParser(description="Pick batch sizes per model and length bucket under a latency SLO")
+    sub = parser.add_subparsers(dest="command", required=True)
+    tune_cmd = sub.add_parser("tune")
+    tune_cmd.add_argument("--model", nargs="+", default=list(MODEL_SPECS), choices=list(MODEL_SPECS))
+    tune_cmd.add_argument("--slo-ms", type=float, default=None)
+    tune_cmd.add_argument("--knee", type=float, default=None, help="fraction of the best throughput to settle for")
+    tune_cmd.add_argument("--missing", action="store_true", help="only models without a tuning for this host and setup")
+    sub.add_parser("show")
+    args = parser.parse_args(argv)
+
+    if args.command == "tune":
+        autotune(args.model, args.slo_ms, args.knee, only_missing=args.missing)
+    else:
+        for model_key, entry in load_tuning().items():
+            print(f"{model_key:<18} {entry['bucket_batch_sizes']} micro-batch {entry['microbatch_max_size']} "
+                  f"(SLO {entry['slo_ms']:.0f} ms, {_host_key(entry['host'])}, "
+                  f"{entry.get('backend_setting', entry['backend'])}/{entry.get('precision', '?')}, {entry['tuned_at']})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
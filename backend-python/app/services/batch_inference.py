@@ -0,0 +1,161 @@
+import threading
+from bisect import bisect_left
+import numpy as np
+from app import config
+from app.services.inference_governor import bulk_chunk_size, current_priority, forward_slot, interactive_waiting
+from app.services.tokenization import encode_batch
+from app.services.batch_autotune import tuned_batch_size, tuned_bucket_sizes, tuned_setting
+
+
+def batch_size_for(model_key):
+    """Per-model env override, else the autotuned size for this host, else INFERENCE_BATCH_SIZE."""
+    return tuned_setting(model_key, "INFERENCE_BATCH_SIZE", tuned_batch_size(model_key), config.INFERENCE_BATCH_SIZE)
+
+
+# ==============================
+# 🔹 Length-bucketed scheduling
+# ==============================
+
+def bucket_of(length, edges=None):
+    """Index of the first bucket edge >= ``length`` (the last bucket takes anything longer)."""
+    edges = config.LENGTH_BUCKET_EDGES if edges is None else edges
+    return min(bisect_left(edges, length), len(edges))
+
+def bucket_label(bucket, edges=None):
+    edges = config.LENGTH_BUCKET_EDGES if edges is None else edges
+    return f"<={edges[bucket]}" if bucket < len(edges) else f">{edges[-1]}"
+
+def plan_batches(lengths, batch_size, bucketing=None, edges=None, bucket_sizes=None):
+    """Groups row indices into batches of similar token length.
+
+    With bucketing on, rows are sorted by length and a batch never spans two
+    buckets; otherwise batches follow arrival order. ``bucket_sizes`` optionally
+    caps the batch size per bucket label (autotuned). Yields (bucket, indices).
+    """
+    bucketing = config.LENGTH_BUCKETING if bucketing is None else bucketing
+    order = np.argsort(lengths, kind="stable") if bucketing else np.arange(len(lengths))
+
+    current, current_bucket = [], None
+    for idx in order:
+        bucket = bucket_of(lengths[idx], edges) if bucketing else 0
+        if current:
+            limit = batch_size
+            if bucket_sizes and bucketing:
+                limit = min(batch_size, bucket_sizes.get(bucket_label(current_bucket, edges), batch_size))
+            if bucket != current_bucket or len(current) >= limit:
+                yield current_bucket, current
+                current = []
+        current.append(int(idx))
+        current_bucket = bucket
+    if current:
+        yield current_bucket, current
+
+
+# ==============================
+# 🔹 Padding-efficiency statistics
+# ==============================
+
+_stats_lock = threading.Lock()
+_padding_stats = {}
+
+def record_padding(model_key, bucket, rows, real_tokens, padded_tokens):
+    with _stats_lock:
+        model_stats = _padding_stats.setdefault(model_key, {"batches": 0, "rows": 0, "real_tokens": 0, "padded_tokens": 0, "buckets": {}})
+        bucket_stats = model_stats["buckets"].setdefault(bucket, {"batches": 0, "rows": 0, "real_tokens": 0, "padded_tokens": 0})
+        for target in (model_stats, bucket_stats):
+            target["batches"] += 1
+            target["rows"] += rows
+            target["real_tokens"] += real_tokens
+            target["padded_tokens"] += padded_tokens
+
+def padding_stats():
+    """Per model (and per length bucket): real tokens / padded tokens actually computed."""
+    def summarise(entry):
+        efficiency = entry["real_tokens"] / entry["padded_tokens"] if entry["padded_tokens"] else 1.0
+        return {**{k: v for k, v in entry.items() if k != "buckets"}, "padding_efficiency": round(efficiency, 4)}
+
+    with _stats_lock:
+        return {
+            model_key: {
+                **summarise(entry),
+                "buckets": {
+                    bucket_label(bucket) if config.LENGTH_BUCKETING else "all": summarise(bucket_entry)
+                    for bucket, bucket_entry in sorted(entry["buckets"].items())
+                },
+            }
+            for model_key, entry in _padding_stats.items()
+        }
+
+
+# ==============================
+# 🔹 Batched forward passes
+# ==============================
+
+def predict_logits(tokenizer, backend, texts, max_length=128, batch_size=None, model_key=None):
+    """Tokenizes ``texts`` once (batched, cached), then runs length-bucketed, dynamically padded forward passes.
+
+    ``backend`` is one of the ``model_backends`` wrappers (eager, TorchScript or
+    ONNX). Returns a float32 array of logits, one row per text, in input order.
+    """
+    texts = list(texts)
+    encoded = encode_batch(tokenizer, texts, max_length) if texts else []
+    return predict_logits_encoded(tokenizer, backend, encoded, batch_size=batch_size, model_key=model_key)
+
+
+def predict_logits_encoded(tokenizer, backend, encoded, batch_size=None, model_key=None):
+    """``predict_logits`` over rows that are already tokenized (unpadded dicts of token lists)."""
+    if not encoded:
+        return np.zeros((0, backend.num_labels), dtype=np.float32)
+
+    batch_size = batch_size or config.INFERENCE_BATCH_SIZE
+    model_key = model_key or getattr(backend, "model_key", "unknown")
+    bulk = current_priority() == "bulk"
+    lengths = [len(row["input_ids"]) for row in encoded]
+
+    logits = np.zeros((len(encoded), backend.num_labels), dtype=np.float32)
+    for bucket, batch in plan_batches(lengths, batch_size, bucket_sizes=tuned_bucket_sizes(model_key)):
+        features = {key: [encoded[i][key] for i in batch] for key in encoded[0]}
+        padded = tokenizer.pad(features, padding=True, return_tensors="pt")
+        start = 0
+        while start < len(batch):
+            with forward_slot(model_key):
+                # Bulk work runs full batches unless interactive callers are queued for the
+                # model; then it shrinks to bounded chunks so they never wait behind a big pass
+                end = len(batch)
+                if bulk and interactive_waiting(model_key):
+                    end = min(start + bulk_chunk_size(model_key), end)
+                logits[batch[start:end]] = backend.logits({key: value[start:end] for key, value in padded.items()})
+            start = end
+
+        longest = max(lengths[i] for i in batch)
+        record_padding(model_key, bucket, len(batch), sum(lengths[i] for i in batch), longest * len(batch))
+
+    return logits
+
+
+def softmax(logits, temperature=1.0):
+    """Row-wise softmax; ``temperature`` is a scalar or one value per row."""
+    logits = np.asarray(logits, dtype=np.float32)
+    temperature = np.asarray(temperature, dtype=np.float32).reshape(-1, 1)
+    scaled = logits / temperature
+    scaled = scaled - scaled.max(axis=1, keepdims=True)
+    exp = np.exp(scaled)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def score_rows(rows, batch_fn, single_fn):
+    """``batch_fn`` over the rows' (Comment, Aspect) pairs; falls back to ``single_fn`` row by row
+    so one bad row is skipped (None), not fatal. Used by the CSV prediction controllers."""
+    try:
+        return batch_fn([(row["Comment"], row["Aspect"]) for row in rows])
+    except Exception as e:
+        print(f"⚠️ Batch scoring failed ({e}); retrying row by row")
+
+    scored = []
+    for row in rows:
+        try:
+            scored.append(single_fn(row["Comment"], row["Aspect"]))
+        except Exception as e:
+            print(f"❌ Error for comment: {row['Comment']} | Error: {e}")
+            scored.append(None)
+    return scored
@@ -0,0 +1,262 @@
+import argparse
+import glob
+import hashlib
+import io
+import os
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from app import config
+
+# Cascade stage in front of the garbage transformers: a linear model over
+# hashed character n-grams (links, "subscribe", vacancy spam and emoji runs
+# are all obvious at the character level). Comments it scores at or above the
+# garbage threshold, or at or below the valid threshold, are decided here;
+# only the uncertain middle goes to the BERT / XLM-R garbage model.
+#
+#   python -m app.services.garbage_cascade train --language English
+#
+# Training data: comments in data/garbage_classification/<language> are
+# garbage, comments in data/aspect_classification/<language> are valid.
+
+LANGUAGES = ("English", "Sinhala")
+CASCADE_MODELS = {"English": "english_garbage_cascade", "Sinhala": "sinhala_garbage_cascade"}
+GARBAGE_MODELS = {"English": "english_garbage", "Sinhala": "sinhala_garbage"}
+
+STAGES = ("rules", "cascade_garbage", "cascade_valid", "transformer")
+_stats_lock = threading.Lock()
+_stage_counts = {language: {stage: 0 for stage in STAGES} for language in LANGUAGES}
+_digests = {}
+_reload_lock = threading.Lock()
+_failed_reloads = set()
+
+
+def model_path(language):
+    return os.path.join(config.MODELS_DIR, "cascade", f"{language.lower()}_garbage.joblib")
+
+def thresholds(language):
+    """(garbage threshold, valid threshold), e.g. SINHALA_GARBAGE_CASCADE_GARBAGE_THRESHOLD=0.99."""
+    key = GARBAGE_MODELS[language]
+    return (
+        config.model_setting(key, "CASCADE_GARBAGE_THRESHOLD", config.CASCADE_GARBAGE_THRESHOLD),
+        config.model_setting(key, "CASCADE_VALID_THRESHOLD", config.CASCADE_VALID_THRESHOLD),
+    )
+
+def make_vectorizer():
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(
+        analyzer="char_wb", ngram_range=(2, 4), lowercase=True,
+        n_features=2 ** 18, alternate_sign=False, norm="l2"
+    )
+
+
+class GarbageCascade:
+    def __init__(self, classifier, language, digest=None):
+        self.classifier = classifier
+        self.language = language
+        # sha1 of the model file this cascade was loaded from (None when inactive)
+        self.digest = digest
+        self.vectorizer = make_vectorizer()
+
+    def garbage_probability(self, texts):
+        features = self.vectorizer.transform([str(text) for text in texts])
+        return self.classifier.predict_proba(features)[:, list(self.classifier.classes_).index(1)]
+
+    @property
+    def active(self):
+        return self.classifier is not None
+
+    def decide(self, texts):
+        """1 = garbage, 0 = valid, -1 = uncertain (send to the transformer)."""
+        if not self.active:
+            return np.full(len(texts), -1)
+        garbage_at, valid_at = thresholds(self.language)
+        probs = self.garbage_probability(texts)
+        return np.where(probs >= garbage_at, 1, np.where(probs <= valid_at, 0, -1))
+
+
+def load_cascade(language):
+    """Registry loader. Without a trained model (or with CASCADE_ENABLED off) the cascade
+    is inactive and every comment goes to the transformer."""
+    path = model_path(language)
+    if not config.CASCADE_ENABLED or not os.path.exists(path):
+        return GarbageCascade(None, language)
+    import joblib
+    # Hash the exact bytes that get loaded, so the version always names this cascade
+    with open(path, "rb") as f:
+        data = f.read()
+    return GarbageCascade(joblib.load(io.BytesIO(data))["classifier"], language, _digest(data))
+
+def _digest(data):
+    return hashlib.sha1(data).hexdigest()[:12]
+
+def _file_digest(path):
+    """sha1 of the saved model, re-hashed only when the file changes (this runs per cache lookup)."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _digests:
+        with open(path, "rb") as f:
+            _digests[key] = _digest(f.read())
+    return _digests[key]
+
+def cascade_version(language):
+    """Served cascade's hash + thresholds: retraining or retuning changes every downstream cache key.
+
+    The hash is the one recorded when the cascade loaded. A model file retrained
+    (or removed) since then is reloaded here first, so its verdicts are never
+    cached under the other cascade's version.
+    """
+    from app.services.model_registry import registry
+
+    name = CASCADE_MODELS[language]
+    path = model_path(language)
+    on_disk = _file_digest(path) if config.CASCADE_ENABLED and os.path.exists(path) else None
+    cascade = registry.loaded(name)
+    if cascade is not None and cascade.digest != on_disk:
+        with _reload_lock:
+            cascade = registry.loaded(name)
+            if cascade is not None and cascade.digest != on_disk and (language, on_disk) not in _failed_reloads:
+                print(f"🔄 Garbage cascade file for {language} changed; reloading")
+                try:
+                    registry.reload(name)
+                except Exception:
+                    # Keep serving (and keying on) the loaded cascade; retried once the file changes again
+                    _failed_reloads.add((language, on_disk))
+            cascade = registry.loaded(name)
+    digest = cascade.digest if cascade is not None else on_disk
+    if digest is None:
+        return "off"
+    garbage_at, valid_at = thresholds(language)
+    return f"{digest}/{garbage_at}/{valid_at}"
+
+
+# ==============================
+# 🔹 Stage accounting
+# ==============================
+
+def record_stages(language, counts):
+    with _stats_lock:
+        for stage, count in counts.items():
+            _stage_counts[language][stage] += int(count)
+
+def cascade_stats():
+    """Share of garbage-check traffic decided by each stage, per language."""
+    with _stats_lock:
+        counts = {language: dict(stages) for language, stages in _stage_counts.items()}
+    report = {}
+    for language, stages in counts.items():
+        total = sum(stages.values())
+        report[language] = {
+            "enabled": os.path.exists(model_path(language)) and config.CASCADE_ENABLED,
+            "thresholds": dict(zip(("garbage", "valid"), thresholds(language))),
+            "counts": stages,
+            "share": {stage: round(count / total, 4) if total else 0.0 for stage, count in stages.items()},
+        }
+    return report
+
+def cascade_garbage_mask(language, texts, transformer_mask_fn, decided=None):
+    """Garbage mask through the cascade, calling ``transformer_mask_fn`` only for uncertain texts.
+
+    ``decided`` optionally pre-marks rows already settled by earlier rules (True = garbage).
+    """
+    from app.services.model_registry import get_model
+
+    texts = list(texts)
+    mask = np.zeros(len(texts), dtype=bool)
+    pending = np.arange(len(texts))
+    counts = {stage: 0 for stage in STAGES}
+    if decided is not None:
+        decided = np.asarray(decided, dtype=bool)
+        mask[decided] = True
+        counts["rules"] = int(decided.sum())
+        pending = np.flatnonzero(~decided)
+
+    cascade = get_model(CASCADE_MODELS[language]) if len(pending) else None
+    if cascade is not None and cascade.active:
+        verdicts = cascade.decide([texts[i] for i in pending])
+        mask[pending[verdicts == 1]] = True
+        counts["cascade_garbage"] = int((verdicts == 1).sum())
+        counts["cascade_valid"] = int((verdicts == 0).sum())
+        pending = pending[verdicts < 0]
+
+    if len(pending):
+        mask[pending] = transformer_mask_fn([texts[i] for i in pending])
+    counts["transformer"] = int(len(pending))
+    record_stages(language, counts)
+    return mask
+
+
+# ==============================
+# 🔹 Training CLI
+# ==============================
+
+def _comments(folder):
+    comments = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.csv"))):
+        df = pd.read_csv(path)
+        df.columns = [str(c).strip().lstrip("\ufeff").lower() for c in df.columns]
+        if "comment" in df.columns:
+            comments.extend(str(c).strip() for c in df["comment"].dropna() if str(c).strip())
+    return comments
+
+def load_training_rows(language):
+    garbage = set(_comments(os.path.join(config.DATA_DIR, "garbage_classification", language)))
+    valid = set(_comments(os.path.join(config.DATA_DIR, "aspect_classification", language)))
+    conflicting = garbage & valid
+    texts = sorted(garbage - conflicting) + sorted(valid - conflicting)
+    labels = [1] * len(garbage - conflicting) + [0] * len(valid - conflicting)
+    return texts, np.array(labels), len(conflicting)
+
+def evaluate(probs, labels, garbage_at, valid_at):
+    decided = (probs >= garbage_at) | (probs <= valid_at)
+    predicted = (probs >= garbage_at).astype(int)
+    accuracy = float((predicted[decided] == labels[decided]).mean()) if decided.any() else 1.0
+    return float(decided.mean()), accuracy
+
+def train(language, holdout=0.2, seed=13):
+    import joblib
+    from sklearn.linear_model import SGDClassifier
+
+    texts, labels, conflicting = load_training_rows(language)
+    if len(set(labels.tolist())) < 2:
+        raise ValueError(f"❌ Need both garbage and valid comments for {language}")
+    order = np.random.default_rng(seed).permutation(len(texts))
+    split = int(len(order) * (1 - holdout))
+    train_idx, test_idx = order[:split], order[split:]
+
+    vectorizer = make_vectorizer()
+    features = vectorizer.transform(texts)
+    classifier = SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=50, class_weight="balanced", random_state=seed)
+    classifier.fit(features[train_idx], labels[train_idx])
+
+    probs = classifier.predict_proba(features[test_idx])[:, list(classifier.classes_).index(1)]
+    print(f"{language}: {int(labels.sum())} garbage / {int((labels == 0).sum())} valid comments "
+          f"({conflicting} with conflicting labels dropped), {len(test_idx)} held out")
+    print(f"{'garbage >=':>10} {'valid <=':>9} {'decided':>8} {'accuracy':>9}")
+    for garbage_at, valid_at in ((0.9, 0.1), (0.95, 0.05), (0.97, 0.03), (0.99, 0.01), thresholds(language)):
+        coverage, accuracy = evaluate(probs, labels[test_idx], garbage_at, valid_at)
+        print(f"{garbage_at:>10} {valid_at:>9} {coverage:>8.1%} {accuracy:>9.2%}")
+
+    # Refit on everything before saving
+    classifier.fit(features, labels)
+    path = model_path(language)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    joblib.dump({"classifier": classifier, "language": language, "rows": len(texts)}, path)
+    print(f"✅ Saved {path}")
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the hashed char n-gram garbage cascade")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train_cmd = sub.add_parser("train")
+    train_cmd.add_argument("--language", nargs="+", default=list(LANGUAGES), choices=LANGUAGES)
+    train_cmd.add_argument("--holdout", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    for language in args.language:
+        train(language, holdout=args.holdout)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+import math
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+import torch
+from app import config
+
+# FastAPI runs the plain ``def`` predict routes in a ~40-thread pool. Without a
+# cap every one of those threads starts a forward pass with its own intra-op
+# thread team, and the CPU ends up oversubscribed. The governor fixes the torch
+# thread budget for the process and lets only MODEL_MAX_CONCURRENCY forward
+# passes per model run at once; everyone else queues for a slot.
+#
+# Waiters are served by priority class: ``interactive`` (the default, single
+# predictions) before ``bulk`` (CSV / scrape jobs, tagged with
+# ``inference_priority("bulk")``). While interactive callers are queued for a
+# model, bulk work shrinks to forward passes of at most BULK_MAX_BATCH_SIZE
+# rows, so they wait for at most one bulk chunk; otherwise bulk passes keep the
+# full (autotuned) batch size. Every PRIORITY_INTERACTIVE_BURST interactive
+# grants in a row, a waiting bulk pass gets a turn so bulk jobs are never
+# starved outright.
+
+PRIORITY_CLASSES = ("interactive", "bulk")
+
+_configured = False
+_lock = threading.Lock()
+_schedulers = {}
+_waits = {}
+_priority = contextvars.ContextVar("inference_priority", default="interactive")
+_deadline = contextvars.ContextVar("inference_deadline", default=None)
+_admission = {}
+
+def configure_torch_threads(num_threads=None):
+    """Applies the thread budget once per process (``num_threads`` overrides TORCH_NUM_THREADS)."""
+    global _configured
+    with _lock:
+        if _configured:
+            return
+        torch.set_num_threads(max(num_threads or config.TORCH_NUM_THREADS, 1))
+        try:
+            torch.set_num_interop_threads(max(config.TORCH_INTEROP_THREADS, 1))
+        except RuntimeError:
+            # Only allowed before the first parallel region; keep torch's choice
+            pass
+        _configured = True
+    print(f"✅ Torch thread budget: {torch.get_num_threads()} intra-op / {torch.get_num_interop_threads()} inter-op")
+
+def concurrency_for(model_key):
+    return max(config.model_setting(model_key, "MODEL_MAX_CONCURRENCY", config.MODEL_MAX_CONCURRENCY, config.env_int), 1)
+
+def bulk_chunk_size(model_key):
+    return max(config.model_setting(model_key, "BULK_MAX_BATCH_SIZE", config.BULK_MAX_BATCH_SIZE, config.env_int), 1)
+
+
+# ==============================
+# 🔹 Priority classes
+# ==============================
+
+@contextmanager
+def inference_priority(priority):
+    """Tags every forward pass started inside the block (same thread / task) with ``priority``."""
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority '{priority}'. Use one of: {', '.join(PRIORITY_CLASSES)}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority():
+    return _priority.get()
+
+def interactive_waiting(model_key):
+    """Whether interactive callers are queued for one of the model's forward-pass slots."""
+    return _scheduler(model_key)[0].queued()["interactive"] > 0
+
+
+class SlotScheduler:
+    """Forward-pass slots for one model, granted in priority-class order (FIFO within a class)."""
+
+    def __init__(self, slots, interactive_burst):
+        self.free = slots
+        self.interactive_burst = max(int(interactive_burst), 1)
+        self._cond = threading.Condition()
+        self._waiting = {priority: deque() for priority in PRIORITY_CLASSES}
+        self._interactive_streak = 0
+
+    def _next(self):
+        interactive, bulk = self._waiting["interactive"], self._waiting["bulk"]
+        if bulk and (not interactive or self._interactive_streak >= self.interactive_burst):
+            return bulk[0]
+        return interactive[0] if interactive else None
+
+    def acquire(self, priority):
+        ticket = object()
+        with self._cond:
+            self._waiting[priority].append(ticket)
+            while self.free <= 0 or self._next() is not ticket:
+                self._cond.wait()
+            self._waiting[priority].popleft()
+            self.free -= 1
+            bulk_waiting = bool(self._waiting["bulk"])
+            self._interactive_streak = self._interactive_streak + 1 if priority == "interactive" and bulk_waiting else 0
+            if self.free > 0:
+                # The head of the queue changed; let the next waiter check again
+                self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self.free += 1
+            self._cond.notify_all()
+
+    def queued(self):
+        with self._cond:
+            return {priority: len(waiting) for priority, waiting in self._waiting.items()}
+
+
+# ==============================
+# 🔹 Admission control + deadlines
+# ==============================
+# Routes wrap their model work in ``admission(models, rows, deadline_ms)``. A
+# request that would push a model past MAX_QUEUE_ROWS pending rows is shed with
+# 429; once the client's X-Deadline-Ms budget has passed, the work is dropped
+# before its next forward pass (503). Both carry a Retry-After.
+
+class Overloaded(Exception):
+    """Too much queued work for ``model_key``; the route answers 429."""
+
+    def __init__(self, model_key, retry_after):
+        super().__init__(f"'{model_key}' is saturated; retry in {retry_after}s")
+        self.model_key = model_key
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The client's deadline passed before the work reached ``model_key``; the route answers 503."""
+
+    def __init__(self, model_key, retry_after):
+        super().__init__(f"Deadline passed before '{model_key}' could run the request")
+        self.model_key = model_key
+        self.retry_after = retry_after
+
+
+def max_queue_rows(model_key):
+    return config.model_setting(model_key, "MAX_QUEUE_ROWS", config.MAX_QUEUE_ROWS, config.env_int)
+
+def retry_after_seconds():
+    return max(int(math.ceil(config.ADMISSION_RETRY_AFTER_SECONDS)), 1)
+
+def _admission_entry(model_key):
+    # Callers hold _lock
+    if model_key not in _admission:
+        _admission[model_key] = {"pending_rows": 0, "admitted": 0, "shed": 0, "expired": 0}
+    return _admission[model_key]
+
+def current_deadline():
+    """time.monotonic() deadline of the request being served, or None."""
+    return _deadline.get()
+
+def deadline_expired(model_key):
+    """Counts an expired request against ``model_key`` and returns the exception to raise."""
+    with _lock:
+        _admission_entry(model_key)["expired"] += 1
+    return DeadlineExceeded(model_key, retry_after_seconds())
+
+def check_deadline(model_key, deadline=None):
+    deadline = current_deadline() if deadline is None else deadline
+    if deadline is not None and time.monotonic() >= deadline:
+        raise deadline_expired(model_key)
+
+@contextmanager
+def admission(model_keys, rows=1, deadline_ms=None):
+    """Admits ``rows`` of work for ``model_keys`` or raises Overloaded / DeadlineExceeded.
+
+    A request larger than the limit is still admitted when nothing else is
+    pending for the model, so big batches are slow rather than impossible.
+    """
+    model_keys = list(model_keys)
+    deadline = time.monotonic() + deadline_ms / 1000.0 if deadline_ms is not None else None
+    token = _deadline.set(deadline)
+    try:
+        check_deadline(model_keys[0], deadline)
+        with _lock:
+            for model_key in model_keys:
+                entry, limit = _admission_entry(model_key), max_queue_rows(model_key)
+                if limit > 0 and entry["pending_rows"] and entry["pending_rows"] + rows > limit:
+                    entry["shed"] += 1
+                    raise Overloaded(model_key, retry_after_seconds())
+            for model_key in model_keys:
+                entry = _admission_entry(model_key)
+                entry["pending_rows"] += rows
+                entry["admitted"] += 1
+        try:
+            yield
+        finally:
+            with _lock:
+                for model_key in model_keys:
+                    _admission[model_key]["pending_rows"] -= rows
+    finally:
+        _deadline.reset(token)
+
+def admission_stats():
+    with _lock:
+        return {
+            model_key: {**entry, "max_queue_rows": max_queue_rows(model_key)}
+            for model_key, entry in _admission.items()
+        }
+
+
+def _new_waits():
+    return {"count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=1000)}
+
+def _scheduler(model_key):
+    with _lock:
+        if model_key not in _schedulers:
+            _schedulers[model_key] = SlotScheduler(concurrency_for(model_key), config.PRIORITY_INTERACTIVE_BURST)
+            _waits[model_key] = {"active": 0, "classes": {priority: _new_waits() for priority in PRIORITY_CLASSES}}
+        return _schedulers[model_key], _waits[model_key]
+
+@contextmanager
+def forward_slot(model_key, priority=None):
+    """Holds one of the model's forward-pass slots; records how long the caller waited for it, per class."""
+    priority = priority or current_priority()
+    scheduler, waits = _scheduler(model_key)
+    check_deadline(model_key)
+    started = time.perf_counter()
+    scheduler.acquire(priority)
+    waited = time.perf_counter() - started
+    try:
+        # Expired while queued: drop it before it reaches the model
+        check_deadline(model_key)
+    except DeadlineExceeded:
+        scheduler.release()
+        raise
+    with _lock:
+        class_waits = waits["classes"][priority]
+        class_waits["count"] += 1
+        class_waits["total"] += waited
+        class_waits["max"] = max(class_waits["max"], waited)
+        class_waits["recent"].append(waited)
+        waits["active"] += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            waits["active"] -= 1
+        scheduler.release()
+
+def _summarise_waits(waits):
+    recent = np.array(waits["recent"]) * 1000.0 if waits["recent"] else np.zeros(1)
+    return {
+        "forward_passes": waits["count"],
+        "avg_wait_ms": round(waits["total"] / waits["count"] * 1000.0, 3) if waits["count"] else 0.0,
+        "p50_wait_ms": round(float(np.percentile(recent, 50)), 3),
+        "p95_wait_ms": round(float(np.percentile(recent, 95)), 3),
+        "max_wait_ms": round(waits["max"] * 1000.0, 3),
+    }
+
+def governor_stats():
+    with _lock:
+        models = {}
+        for model_key, waits in _waits.items():
+            classes = waits["classes"]
+            combined = {
+                "count": sum(w["count"] for w in classes.values()),
+                "total": sum(w["total"] for w in classes.values()),
+                "max": max(w["max"] for w in classes.values()),
+                "recent": [wait for w in classes.values() for wait in w["recent"]],
+            }
+            models[model_key] = {
+                "max_concurrency": concurrency_for(model_key),
+                "bulk_max_batch_size": bulk_chunk_size(model_key),
+                "active": waits["active"],
+                **_summarise_waits(combined),
+                "queued": _schedulers[model_key].queued(),
+                "classes": {priority: _summarise_waits(w) for priority, w in classes.items()},
+            }
+    return {
+        "torch_num_threads": torch.get_num_threads(),
+        "torch_interop_threads": torch.get_num_interop_threads(),
+        "models": models,
+        "admission": admission_stats(),
+    }
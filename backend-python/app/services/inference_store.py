@@ -0,0 +1,316 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from app import config
+from app.services.model_registry import registry
+
+# Persistent prediction store shared by every worker process and every run.
+#
+# Each row maps sha256(namespace, revision, normalized input) to the JSON output.
+# ``namespace`` names what produced the output (a model, or a garbage→aspect
+# chain) and ``revision`` is the registry version of every model involved, so a
+# new revision simply stops matching its old rows; ``compact`` removes them
+# together with rows unused for INFERENCE_STORE_TTL_DAYS. SQLite in WAL mode
+# lets the workers read concurrently while one of them writes; lookups stay
+# read-only and only buffer the keys they hit, whose last_used is written with
+# the next save or by the compaction thread.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    output TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used);
+CREATE INDEX IF NOT EXISTS predictions_namespace ON predictions (namespace, revision);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_SQLITE_MAX_VARIABLES = 500
+
+def store_key(namespace, revision, normalized_input):
+    payload = json.dumps([namespace, revision, normalized_input], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def namespace_revision(*model_names):
+    return "|".join(registry.version(name) for name in model_names)
+
+
+class InferenceStore:
+    def __init__(self, path, ttl_days=90.0, max_rows=1_000_000, compact_every_hours=24.0, enabled=True):
+        self.path = path
+        self.ttl_days = float(ttl_days)
+        self.max_rows = int(max_rows)
+        self.compact_every = float(compact_every_hours) * 3600
+        self.enabled = enabled
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._errors = 0
+        self._next_compaction_check = 0.0
+        self._compaction_lock = threading.Lock()
+        self._touched = set()
+        self._touched_lock = threading.Lock()
+
+    def reopen(self, path):
+        """Points this store at another file (new connections per thread) and resets the counters."""
+        self.path = path
+        self._local = threading.local()
+        self._next_compaction_check = 0.0
+        with self._touched_lock:
+            self._touched = set()
+        with self._stats_lock:
+            self._hits = self._misses = self._writes = self._errors = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, value):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def lookup(self, namespace, revision, inputs):
+        """{input index: stored output} for every input already in the store."""
+        keys = [store_key(namespace, revision, value) for value in inputs]
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(keys), _SQLITE_MAX_VARIABLES):
+            chunk = keys[start:start + _SQLITE_MAX_VARIABLES]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT key, output FROM predictions WHERE key IN ({marks})", chunk).fetchall()
+            found.update(rows)
+        if found:
+            with self._touched_lock:
+                self._touched.update(found)
+        return {i: json.loads(found[key]) for i, key in enumerate(keys) if key in found}
+
+    def _flush_touched(self, conn):
+        """Writes last_used for the rows hit since the last flush (inside the caller's transaction)."""
+        with self._touched_lock:
+            touched, self._touched = list(self._touched), set()
+        now = time.time()
+        for start in range(0, len(touched), _SQLITE_MAX_VARIABLES):
+            chunk = touched[start:start + _SQLITE_MAX_VARIABLES]
+            marks = ",".join("?" * len(chunk))
+            conn.execute(f"UPDATE predictions SET last_used = ? WHERE key IN ({marks})", [now, *chunk])
+
+    def save(self, namespace, revision, inputs, outputs):
+        now = time.time()
+        rows = [
+            (store_key(namespace, revision, value), namespace, revision, json.dumps(output, ensure_ascii=False), now, now)
+            for value, output in zip(inputs, outputs)
+        ]
+        conn = self._connection()
+        with conn:
+            self._flush_touched(conn)
+            conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self._count("_writes", len(rows))
+
+    def get_many(self, namespace, revision, inputs, items, compute_fn, decode=None):
+        """Stored outputs where present; ``compute_fn(items)`` for the rest, which are then stored.
+
+        ``inputs`` are the normalized, JSON-serialisable inputs matching ``items``.
+        Store errors never fail a prediction: they fall back to ``compute_fn``.
+        """
+        items = list(items)
+        if not self.enabled or not items:
+            return compute_fn(items)
+
+        self.maybe_compact()
+        try:
+            stored = self.lookup(namespace, revision, inputs)
+        except sqlite3.Error as e:
+            print(f"⚠️ Inference store read failed: {e}")
+            self._count("_errors", 1)
+            stored = {}
+
+        decode = decode or (lambda value: value)
+        results = [decode(stored[i]) if i in stored else None for i in range(len(items))]
+        missing = [i for i in range(len(items)) if i not in stored]
+        self._count("_hits", len(stored))
+        self._count("_misses", len(missing))
+
+        if missing:
+            computed = compute_fn([items[i] for i in missing])
+            for i, value in zip(missing, computed):
+                results[i] = value
+            try:
+                self.save(namespace, revision, [inputs[i] for i in missing], computed)
+            except sqlite3.Error as e:
+                print(f"⚠️ Inference store write failed: {e}")
+                self._count("_errors", 1)
+        return results
+
+    def maybe_compact(self):
+        """Compacts at most every INFERENCE_STORE_COMPACT_HOURS across all workers (tracked in ``meta``),
+        in a background thread so the request that notices it never waits for the DELETEs."""
+        with self._compaction_lock:
+            if self.compact_every <= 0 or time.monotonic() < self._next_compaction_check:
+                return
+            self._next_compaction_check = time.monotonic() + min(self.compact_every, 3600)
+        threading.Thread(target=self._compact_if_due, name="inference-store-compaction", daemon=True).start()
+
+    def _compact_if_due(self):
+        try:
+            # Before expiring anything, so rows that are only ever read stay fresh
+            with self._connection() as conn:
+                self._flush_touched(conn)
+            row = self._connection().execute("SELECT value FROM meta WHERE name = 'last_compaction'").fetchone()
+            if row is None or time.time() - float(row[0]) >= self.compact_every:
+                self.compact(live_revisions=live_revisions())
+        except sqlite3.Error as e:
+            print(f"⚠️ Inference store compaction skipped: {e}")
+        finally:
+            # This thread's connection would otherwise stay open until garbage collection
+            conn = getattr(self._local, "conn", None)
+            if conn is not None:
+                conn.close()
+                self._local.conn = None
+
+    def compact(self, live_revisions=None, vacuum=False):
+        """Drops expired rows, rows of superseded revisions and the least recently used overflow."""
+        conn = self._connection()
+        removed = {}
+        with conn:
+            if self.ttl_days > 0:
+                cutoff = time.time() - self.ttl_days * 86400
+                removed["expired"] = conn.execute("DELETE FROM predictions WHERE last_used < ?", (cutoff,)).rowcount
+            for namespace, revision in (live_revisions or {}).items():
+                removed.setdefault("stale_revision", 0)
+                removed["stale_revision"] += conn.execute(
+                    "DELETE FROM predictions WHERE namespace = ? AND revision != ?", (namespace, revision)
+                ).rowcount
+            total = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            if self.max_rows > 0 and total > self.max_rows:
+                removed["overflow"] = conn.execute(
+                    "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY last_used ASC LIMIT ?)",
+                    (total - self.max_rows,)
+                ).rowcount
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('last_compaction', ?)", (str(time.time()),))
+        if vacuum:
+            conn.execute("VACUUM")
+        print(f"🧹 Inference store compacted: {removed}")
+        return removed
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM predictions")
+
+    def stats(self):
+        with self._stats_lock:
+            counters = {"hits": self._hits, "misses": self._misses, "writes": self._writes, "errors": self._errors}
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+        try:
+            rows = self._connection().execute(
+                "SELECT namespace, COUNT(*) FROM predictions GROUP BY namespace"
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "size_mb": round(os.path.getsize(self.path) / 1e6, 2) if os.path.exists(self.path) else 0.0,
+            "rows": dict(rows),
+            **counters,
+        }
+
+
+inference_store = InferenceStore(
+    config.INFERENCE_STORE_PATH,
+    ttl_days=config.INFERENCE_STORE_TTL_DAYS,
+    max_rows=config.INFERENCE_STORE_MAX_ROWS,
+    compact_every_hours=config.INFERENCE_STORE_COMPACT_HOURS,
+    enabled=config.INFERENCE_STORE_ENABLED,
+)
+
+# Namespaces written by the batch paths -> models whose revisions they depend on
+STORE_NAMESPACES = {
+    "english_sentiment": ("english_sentiment",),
+    "english_garbage_aspect": ("english_garbage_cascade", "english_garbage", "english_aspect"),
+    "sinhala_sentiment": ("sinhala_sentiment",),
+    "sinhala_garbage_aspect": ("sinhala_garbage_cascade", "sinhala_garbage", "sinhala_aspect"),
+}
+
+
+def live_revisions():
+    return {namespace: namespace_revision(*models) for namespace, models in STORE_NAMESPACES.items()}
+
+
+# ==============================
+# 🔹 CLI: compaction + cold/warm benchmark
+# ==============================
+
+def benchmark(limit=512):
+    """Runs the English pipelines over stored comments twice against a fresh store file."""
+    import tempfile
+    from app.services import model_backends
+    from app.services.sentiment_service import predict_sentiment_batch, sentiment_cache
+    from app.controllers.english_aspect_predict_controller import garbage_then_aspect_batch, combined_cache
+
+    original_path = inference_store.path
+    pairs = [text.split(" [SEP] ", 1) for text in model_backends.load_stored_comments("english_sentiment", limit)]
+    comments = [comment for comment, _ in pairs]
+    # Load the models first so the cold run measures inference, not loading
+    registry.preload(["english_sentiment", "english_garbage", "english_aspect"])
+
+    with tempfile.TemporaryDirectory() as folder:
+        inference_store.reopen(os.path.join(folder, "bench.sqlite3"))
+        sentiment_cache.enabled = combined_cache.enabled = False
+        try:
+            timings = {}
+            for run in ("cold", "warm"):
+                start = time.perf_counter()
+                garbage_then_aspect_batch(comments)
+                predict_sentiment_batch([tuple(pair) for pair in pairs])
+                timings[run] = time.perf_counter() - start
+            stats = inference_store.stats()
+        finally:
+            inference_store.reopen(original_path)
+            sentiment_cache.enabled = combined_cache.enabled = config.PREDICTION_CACHE_ENABLED
+
+    print(f"Comments: {len(comments)} (+ {len(pairs)} sentiment pairs)")
+    print(f"Cold (empty store): {timings['cold']:.2f}s")
+    print(f"Warm (all stored):  {timings['warm']:.2f}s  → {timings['cold'] / max(timings['warm'], 1e-9):.1f}x faster")
+    print(f"Store: {stats['rows']} rows, {stats['size_mb']} MB, hit rate {stats['hit_rate']}")
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent inference store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact_cmd = sub.add_parser("compact", help="expire old rows, drop superseded revisions, cap the size")
+    compact_cmd.add_argument("--vacuum", action="store_true")
+    sub.add_parser("stats")
+    bench_cmd = sub.add_parser("benchmark", help="cold vs warm run over stored English comments")
+    bench_cmd.add_argument("--limit", type=int, default=512)
+    args = parser.parse_args(argv)
+
+    if args.command == "compact":
+        inference_store.compact(live_revisions=live_revisions(), vacuum=args.vacuum)
+    elif args.command == "stats":
+        print(json.dumps(inference_store.stats(), indent=2, ensure_ascii=False))
+    else:
+        benchmark(args.limit)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,8 @@ import pandas as pd
 import ast
 import time
 from fastapi import APIRouter, HTTPException
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import util
+from app.services.model_registry import get_model
 
 # ✅ Initialize FastAPI Router
 router = APIRouter()
@@ -29,8 +30,7 @@ try:
 except Exception as e:
     raise RuntimeError(f"❌ Failed to load financial vocabulary: {e}")
 
-# ✅ Load Sentence Transformer
-embed_model = SentenceTransformer("sentence-transformers/msmarco-distilbert-base-v3")
+# ✅ Sentence Transformer (loaded on first use through the model registry)
 
 # ✅ Noise filter
 NOISE_WORDS = {
@@ -54,6 +54,7 @@ def extract_embedrank_keywords(text, yake_keywords, keybert_keywords, top_n=5):
     if not keywords:
         return [], 0.0
 
+    embed_model = get_model("msmarco_embedder")
     text_embedding = embed_model.encode(text, convert_to_tensor=True)
     word_embeddings = embed_model.encode(keywords, convert_to_tensor=True)
     similarity_scores = util.pytorch_cos_sim(text_embedding, word_embeddings)[0]
@@ -3,8 +3,7 @@ import json
 import time
 import pandas as pd
 from fastapi import APIRouter, HTTPException
-from keybert import KeyBERT
-from transformers import AutoTokenizer, AutoModel
+from app.services.model_registry import get_model
 
 # ✅ Initialize FastAPI Router
 router = APIRouter()
@@ -27,21 +26,13 @@ try:
 except Exception as e:
     raise RuntimeError(f"❌ Failed to load financial vocabulary: {e}")
 
-# ✅ Load fine-tuned FinBERT model
-try:
-    finbert_model = AutoModel.from_pretrained("Azmarah/finbert-keyword-extraction", ignore_mismatched_sizes=True)
-    finbert_tokenizer = AutoTokenizer.from_pretrained("Azmarah/finbert-keyword-extraction", ignore_mismatched_sizes=True)
-    print("✅ Successfully loaded fine-tuned FinBERT model.")
-except Exception as e:
-    raise RuntimeError(f"❌ Failed to load fine-tuned FinBERT model: {e}")
-
-# ✅ Initialize KeyBERT
-kw_model = KeyBERT(model=finbert_model)
+# ✅ KeyBERT over fine-tuned FinBERT (loaded on first use through the model registry)
 
 # ✅ Keyphrase extractor with timing
 def extract_keyphrases_keybert(text, top_n=5):
     start_time = time.time()
     try:
+        kw_model = get_model("finbert_keybert")
         keyphrases = kw_model.extract_keywords(
             text,
             keyphrase_ngram_range=(1, 3),
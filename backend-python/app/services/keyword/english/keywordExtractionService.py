@@ -1,7 +1,6 @@
 import os
 import json
 import pandas as pd
-import spacy
 from nltk.corpus import stopwords
 from fastapi import HTTPException
 from pymongo import MongoClient
@@ -31,8 +30,6 @@ collection = db[COLLECTION_NAME]
 DATA_DIR = os.path.join("data", "keyword", "english")
 FINAL_KEYWORDS_FILE = os.path.join(DATA_DIR, "final_boosted_keywords.json")
 
-# Load NLP model
-nlp = spacy.load("en_core_web_sm")
 stop_words = set(stopwords.words("english"))
 
 # Load Financial Vocabulary List
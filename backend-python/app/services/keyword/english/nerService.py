@@ -1,9 +1,8 @@
 import os
 import json
-import spacy
-import subprocess
 import pandas as pd
 from fastapi import APIRouter, HTTPException
+from app.services.model_registry import get_model
 
 # ✅ Initialize FastAPI Router
 router = APIRouter()
@@ -26,22 +25,11 @@ try:
 except Exception as e:
     raise RuntimeError(f"❌ Failed to load financial vocabulary: {e}")
 
-# ✅ Load Fine-tuned SpaCy NER model
-try:
-    nlp = spacy.load("en_finetuned_spacy_ner")
-    print("✅ SpaCy NER model loaded.")
-except OSError:
-    print("⚠️ Model not found. Installing...")
-    subprocess.run([
-        "pip", "install",
-        "https://huggingface.co/Azmarah/finetuned-spacy-ner/resolve/main/en_finetuned_spacy_ner-1.0.0-py3-none-any.whl"
-    ], check=True)
-    nlp = spacy.load("en_finetuned_spacy_ner")
-    print("✅ SpaCy NER model installed and loaded.")
+# ✅ Fine-tuned SpaCy NER model (loaded on first use through the model registry)
 
 # ✅ NER tag extractor
 def extract_ner_tags(sentence):
-    doc = nlp(sentence)
+    doc = get_model("spacy_ner")(sentence)
     return [[ent.text, ent.label_, ent.start_char, ent.end_char] for ent in doc.ents]
 
 # ✅ Main route
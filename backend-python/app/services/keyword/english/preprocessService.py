@@ -2,7 +2,6 @@ import os
 import json
 import re
 import pandas as pd
-import spacy
 from collections import Counter
 from fastapi import HTTPException
 from nltk.util import ngrams
@@ -12,8 +11,8 @@ import nltk
 nltk.download('punkt')
 nltk.download('stopwords')
 
-# ✅ Load SpaCy NLP model
-nlp = spacy.load("en_core_web_sm")
+# ✅ SpaCy NLP model (shared, loaded on first use through the model registry)
+from app.services.model_registry import get_model
 
 # ✅ Define paths
 DATA_DIR = os.path.join("data", "keyword", "english")
@@ -26,6 +25,7 @@ os.makedirs(DATA_DIR, exist_ok=True)
 
 # ✅ Keyword extraction
 def extract_keywords_phrases(text_list, top_k=25):
+    nlp = get_model("spacy_en_core_web_sm")
     all_tokens = []
     for text in text_list:
         doc = nlp(text.lower())
@@ -77,6 +77,7 @@ def preprocess_text(content_list):
         "were", "will", "with", "you","frequently","about","questions", "ear",
         "month","monthly", "privacy","policy"
     ])
+    nlp = get_model("spacy_en_core_web_sm")
 
     for content in content_list:
         try:
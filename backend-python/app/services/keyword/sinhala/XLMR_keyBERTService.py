@@ -8,7 +8,7 @@ import unicodedata
 from difflib import SequenceMatcher
 from typing import List, Dict, Any
 from fastapi import APIRouter, HTTPException
-from transformers import AutoTokenizer, AutoModelForTokenClassification
+from app.services.model_registry import get_model
 
 # ✅ FastAPI Router
 router = APIRouter()
@@ -20,20 +20,8 @@ OUTPUT_JSON_FILE = os.path.join(DATA_DIR, "KeyBERT_keywords.json")
 
 HF_MODEL_NAME = "Azmarah/XLMR-Keyword-Extraction-Sinhala"  # Replace with your model repo
 
-# ✅ Load tokenizer and model
-try:
-    print("🔄 Loading tokenizer and model...")
-
-    # 🛠 Force load from base model to avoid broken tokenizer.json
-    tokenizer = AutoTokenizer.from_pretrained("xlm-roberta-base", use_fast=True)
-
-    # 👇 Model still loads from your custom repo
-    model = AutoModelForTokenClassification.from_pretrained("Azmarah/XLMR-Keyword-Extraction-Sinhala")
-    model.eval()
-
-    print("✅ Model and fallback tokenizer loaded successfully.")
-except Exception as e:
-    raise RuntimeError(f"❌ Failed to load model/tokenizer: {e}")
+# ✅ Tokenizer and model (xlm-roberta-base tokenizer + custom repo model, loaded lazily
+#    through the model registry as "xlmr_keyword_extractor")
 
 
 # ✅ Labels
@@ -77,6 +65,7 @@ def are_similar(a: str, b: str, threshold: float = 0.85) -> bool:
 
 @torch.inference_mode()
 def extract_keywords_token_classification(text: str) -> List[str]:
+    tokenizer, model = get_model("xlmr_keyword_extractor")
     encoded = tokenizer(
         text,
         return_tensors="pt",
@@ -0,0 +1,344 @@
+import os
+import sys
+import glob
+import json
+import argparse
+import numpy as np
+import pandas as pd
+import torch
+from transformers import (
+    BertTokenizer, BertTokenizerFast, BertForSequenceClassification,
+    XLMRobertaTokenizer, XLMRobertaTokenizerFast, XLMRobertaForSequenceClassification
+)
+from app import config
+from app.services.inference_governor import configure_torch_threads
+from app.services.model_store import (
+    cached_commit, is_commit_sha, pretrained_source, resolve_revision, stored_revision, weight_kwargs
+)
+from app.services.precision import apply_precision, resolve_precision
+
+# ✅ Tokenizer / model classes per architecture
+MODEL_FAMILIES = {
+    "bert": (BertTokenizer, BertForSequenceClassification),
+    "xlmr": (XLMRobertaTokenizer, XLMRobertaForSequenceClassification),
+}
+
+# ✅ Rust-backed tokenizers (FAST_TOKENIZERS=false keeps the slow Python ones)
+FAST_TOKENIZER_CLASSES = {
+    "bert": BertTokenizerFast,
+    "xlmr": XLMRobertaTokenizerFast,
+}
+
+# ✅ The six sequence classifiers served by the API
+MODEL_SPECS = {
+    "english_sentiment": {"path": "udeshani/english-sentiment-analysis", "family": "bert", "language": "English", "pair_input": True},
+    "english_garbage": {"path": "Navojith012/english-garbage-classifier", "family": "bert", "language": "English", "pair_input": False},
+    "english_aspect": {"path": "Navojith012/english-aspect-classifier", "family": "bert", "language": "English", "pair_input": False},
+    "sinhala_sentiment": {"path": "udeshani/sinhala-sentiment-analysis", "family": "xlmr", "language": "Sinhala", "pair_input": True},
+    "sinhala_garbage": {"path": "Navojith012/sinhala_garbage_model", "family": "xlmr", "language": "Sinhala", "pair_input": False},
+    "sinhala_aspect": {"path": "Navojith012/sinhala-aspect-classifier-v2", "family": "xlmr", "language": "Sinhala", "pair_input": False},
+}
+
+BACKENDS = ("eager", "torchscript", "onnx")
+EXPORT_FILES = {"torchscript": "model.pt", "onnx": "model.onnx"}
+
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+configure_torch_threads()
+
+# (model key, revision) -> commit sha the weights were loaded from
+_commits = {}
+
+
+# ==============================
+# 🔹 Backends
+# ==============================
+
+class EagerBackend:
+    """Plain PyTorch ``from_pretrained`` model, optionally int8/bf16 (see ``precision``)."""
+    name = "eager"
+
+    def __init__(self, model, device=DEVICE, precision="fp32"):
+        self.device = device
+        self.num_labels = model.config.num_labels
+        model = model.to(device)
+        model.eval()
+        self.model, self.precision = apply_precision(model, precision, device)
+
+    def logits(self, encoded):
+        encoded = {k: v.to(self.device) for k, v in encoded.items()}
+        with torch.no_grad():
+            outputs = self.model(**encoded)
+        logits = outputs[0] if isinstance(outputs, tuple) else outputs.logits
+        return logits.float().cpu().numpy()
+
+
+class TorchScriptBackend:
+    """Traced TorchScript module taking (input_ids, attention_mask)."""
+    name = "torchscript"
+
+    def __init__(self, path, num_labels):
+        self.module = torch.jit.load(path, map_location="cpu")
+        self.module.eval()
+        self.num_labels = num_labels
+
+    def logits(self, encoded):
+        with torch.no_grad():
+            outputs = self.module(encoded["input_ids"], encoded["attention_mask"])
+        logits = outputs[0] if isinstance(outputs, (tuple, list)) else outputs
+        return logits.float().cpu().numpy()
+
+
+class OnnxBackend:
+    """ONNX Runtime CPU session exported by ``export_model``."""
+    name = "onnx"
+
+    def __init__(self, path, num_labels):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("❌ onnxruntime is not installed (pip install -r requirements-optional.txt)")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.num_labels = num_labels
+
+    def logits(self, encoded):
+        feed = {name: encoded[name].cpu().numpy().astype(np.int64) for name in self.input_names}
+        return self.session.run(None, feed)[0].astype(np.float32)
+
+
+# ==============================
+# 🔹 Loading
+# ==============================
+
+def backend_for(model_key):
+    return config.model_setting(model_key, "MODEL_BACKEND", config.MODEL_BACKEND, config.env_str)
+
+def export_path(model_key, backend):
+    return os.path.join(config.EXPORT_DIR, model_key, EXPORT_FILES[backend])
+
+def model_revision(model_key):
+    """Revision to load: a hot-swapped revision (services/model_swap.py) if any, else
+    ENGLISH_ASPECT_MODEL_REVISION=<sha> if set, else the local store's pin, else main."""
+    from app.services.model_swap import active_revision
+    swapped = active_revision(model_key)
+    if swapped:
+        return swapped
+    pinned = stored_revision(MODEL_SPECS[model_key]["path"])
+    return config.model_setting(model_key, "MODEL_REVISION", pinned or "main", config.env_str)
+
+def resolved_revision(model_key):
+    """Commit sha behind ``model_revision``, so a branch that moves on the hub changes every
+    cache / store key: the sha the loaded weights came from, else the one the local hub
+    cache resolved the branch to, else asked from the hub (the branch name if that fails)."""
+    revision = model_revision(model_key)
+    if is_commit_sha(revision):
+        return revision
+    commit = _commits.get((model_key, revision)) or cached_commit(MODEL_SPECS[model_key]["path"], revision)
+    if commit is None:
+        try:
+            commit = resolve_revision(MODEL_SPECS[model_key]["path"], revision)
+        except Exception as e:
+            # Remembered until the load records the real sha: this runs per cache lookup
+            print(f"⚠️ Could not resolve {model_key}@{revision} to a commit: {e}")
+            commit = revision
+    _commits.setdefault((model_key, revision), commit)
+    return commit
+
+def _record_commit(model_key, revision, commit):
+    if commit:
+        _commits[(model_key, revision or model_revision(model_key))] = commit
+
+def load_tokenizer(model_key, fast=None, revision=None):
+    spec = MODEL_SPECS[model_key]
+    fast = config.FAST_TOKENIZERS if fast is None else fast
+    tokenizer_cls = FAST_TOKENIZER_CLASSES[spec["family"]] if fast else MODEL_FAMILIES[spec["family"]][0]
+    source, kwargs = pretrained_source(spec["path"], revision or model_revision(model_key))
+    return tokenizer_cls.from_pretrained(source, **kwargs)
+
+def load_eager_model(model_key, revision=None, **kwargs):
+    from app.services.model_swap import active_revision
+    spec = MODEL_SPECS[model_key]
+    _, model_cls = MODEL_FAMILIES[spec["family"]]
+    revision = revision or model_revision(model_key)
+    source, source_kwargs = pretrained_source(spec["path"], revision)
+    options = {**weight_kwargs(spec["path"], revision), **kwargs}
+    if revision == active_revision(model_key):
+        # Hot-swapped revisions never unpickle weights (no pytorch_model.bin)
+        options["use_safetensors"] = True
+    model = model_cls.from_pretrained(source, **source_kwargs, **options)
+    _record_commit(model_key, revision, getattr(model.config, "_commit_hash", None))
+    return model
+
+def load_backend(model_key, backend=None, strict=False, local=False, revision=None, **model_kwargs):
+    """Loads ``model_key`` on the configured backend.
+
+    With MODEL_SERVER_ADDRESS set (and ``local`` off) no weights are loaded here;
+    batches go to the model server instead. Exported backends fall back to eager
+    (with a warning) when the export is missing or was built from another commit
+    than ``resolved_revision``, unless ``strict`` is set.
+    """
+    if config.MODEL_SERVER_ADDRESS and not local:
+        from app.services.model_server import RemoteBackend
+        print(f"✅ {model_key} served by model server at {config.MODEL_SERVER_ADDRESS}")
+        return RemoteBackend(model_key)
+
+    backend = (backend or backend_for(model_key)).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"❌ Unknown backend '{backend}' for {model_key}; expected one of {BACKENDS}")
+    if backend != "eager" and revision and revision != model_revision(model_key):
+        # Exports are built from the current revision; a different one can only load eagerly
+        print(f"⚠️ {model_key}@{revision}: the {backend} export is for another revision; loading eager PyTorch")
+        backend = "eager"
+
+    if backend != "eager":
+        path = export_path(model_key, backend)
+        meta_path = os.path.join(os.path.dirname(path), "meta.json")
+        if os.path.exists(path) and os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            expected = resolved_revision(model_key)
+            if meta.get("revision") == expected:
+                backend_cls = OnnxBackend if backend == "onnx" else TorchScriptBackend
+                print(f"✅ Loaded {model_key} from {backend} export: {path}")
+                loaded = backend_cls(path, meta["num_labels"])
+                loaded.model_key = model_key
+                return loaded
+            # A stale export (e.g. after a hot swap) would serve old weights under the new sha
+            if strict:
+                raise RuntimeError(f"❌ The {backend} export for {model_key} is for {meta.get('revision')}, not {expected}; re-export it")
+            print(f"⚠️ The {backend} export for {model_key} is for {meta.get('revision')}, not {expected}; loading eager PyTorch")
+        elif strict:
+            raise FileNotFoundError(f"❌ No {backend} export for {model_key} at {path}")
+        else:
+            print(f"⚠️ No {backend} export for {model_key} at {path}; falling back to eager PyTorch")
+
+    precision = resolve_precision(model_key, revision=revision)
+    backend = EagerBackend(load_eager_model(model_key, revision=revision, **model_kwargs), precision=precision)
+    backend.model_key = model_key
+    if backend.precision != "fp32":
+        print(f"✅ Loaded {model_key} in {backend.precision}")
+    return backend
+
+def load_classifier(model_key, revision=None, **model_kwargs):
+    """(tokenizer, backend) pair for one of the MODEL_SPECS classifiers (default: the current revision)."""
+    return load_tokenizer(model_key, revision=revision), load_backend(model_key, revision=revision, **model_kwargs)
+
+
+# ==============================
+# 🔹 Export + parity CLI
+# ==============================
+
+def export_model(model_key, backend):
+    if backend not in EXPORT_FILES:
+        raise ValueError(f"❌ Can only export to {tuple(EXPORT_FILES)}")
+
+    tokenizer = load_tokenizer(model_key)
+    model = load_eager_model(model_key, torchscript=True)
+    model.eval()
+
+    sample = tokenizer(["export sample comment", "a slightly longer export sample comment"],
+                       return_tensors="pt", padding=True)
+    args = (sample["input_ids"], sample["attention_mask"])
+
+    path = export_path(model_key, backend)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with torch.no_grad():
+        if backend == "onnx":
+            torch.onnx.export(
+                model, args, path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=14
+            )
+        else:
+            traced = torch.jit.trace(model, args)
+            traced.save(path)
+
+    with open(os.path.join(os.path.dirname(path), "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"model_key": model_key, "source": MODEL_SPECS[model_key]["path"],
+                   "revision": getattr(model.config, "_commit_hash", None),
+                   "num_labels": model.config.num_labels}, f, indent=2)
+
+    print(f"✅ Exported {model_key} → {path}")
+    return path
+
+def load_stored_comments(model_key, limit=256):
+    """Comment texts (with the aspect suffix for sentiment models) from the stored aspect CSVs."""
+    spec = MODEL_SPECS[model_key]
+    folder = os.path.join(config.DATA_DIR, "aspect_classification", spec["language"])
+    texts = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.csv")), reverse=True):
+        df = pd.read_csv(path)
+        # Legacy exports say Comment/Aspect, the current scraper comment/aspect
+        df.columns = [str(c).strip().lstrip("\ufeff") for c in df.columns]
+        lowered = {c.lower(): c for c in df.columns}
+        if "comment" not in lowered or "aspect" not in lowered:
+            continue
+        for comment, aspect in zip(df[lowered["comment"]], df[lowered["aspect"]]):
+            if pd.isna(comment) or pd.isna(aspect):
+                continue
+            texts.append(f"{comment} [SEP] {aspect}" if spec["pair_input"] else str(comment))
+            if len(texts) >= limit:
+                return texts
+    return texts
+
+def check_parity(model_key, backend, limit=256, atol=1e-3):
+    """Compares ``backend`` logits with the eager model on stored comments."""
+    from app.services.batch_inference import predict_logits
+
+    tokenizer = load_tokenizer(model_key)
+    reference = EagerBackend(load_eager_model(model_key))
+    candidate = load_backend(model_key, backend, strict=True, local=True)
+
+    texts = load_stored_comments(model_key, limit)
+    if not texts:
+        print(f"⚠️ No stored comments found for {model_key}")
+        return False
+
+    expected = predict_logits(tokenizer, reference, texts)
+    actual = predict_logits(tokenizer, candidate, texts)
+
+    max_diff = float(np.abs(expected - actual).max())
+    agreement = float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean())
+    passed = max_diff <= atol and agreement == 1.0
+
+    status = "✅" if passed else "❌"
+    print(f"{status} {model_key} [{backend}] rows={len(texts)} max|Δlogit|={max_diff:.2e} label agreement={agreement:.4f}")
+    return passed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export classifiers and check backend parity")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export")
+    export_cmd.add_argument("--model", default="all", choices=["all", *MODEL_SPECS])
+    export_cmd.add_argument("--backend", required=True, choices=list(EXPORT_FILES))
+
+    parity_cmd = sub.add_parser("parity")
+    parity_cmd.add_argument("--model", default="all", choices=["all", *MODEL_SPECS])
+    parity_cmd.add_argument("--backend", required=True, choices=list(EXPORT_FILES))
+    parity_cmd.add_argument("--limit", type=int, default=256)
+    parity_cmd.add_argument("--atol", type=float, default=1e-3)
+
+    args = parser.parse_args(argv)
+    model_keys = list(MODEL_SPECS) if args.model == "all" else [args.model]
+
+    if args.command == "export":
+        for model_key in model_keys:
+            export_model(model_key, args.backend)
+        return 0
+
+    results = [check_parity(model_key, args.backend, args.limit, args.atol) for model_key in model_keys]
+    return 0 if all(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,475 @@
+import gc
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from app import config
+from app.utils.cache_handler import invalidate_model
+from app.utils.process_memory import memory_usage
+
+# ✅ Model lifecycle states reported by /api/inference/ready
+STATES = ("registered", "loading", "warming", "ready", "evicted", "failed")
+
+
+class ModelRegistry:
+    """Loads each model once, on first ``get`` or via ``preload``, and shares it across modules."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaders = {}
+        self._entries = {}
+        self._events = deque(maxlen=100)
+        self._sweeper = None
+
+    def register(self, name, loader, description="", version=None):
+        with self._lock:
+            self._loaders[name] = loader
+            self._entries[name] = {
+                "state": "registered",
+                "description": description,
+                "version": version,
+                "generation": 0,
+                "load_seconds": None,
+                "loaded_at": None,
+                "loaded_pid": None,
+                "warmup_seconds": None,
+                "warmup_shapes": None,
+                "footprint_mb": None,
+                "last_used": None,
+                "evictions": 0,
+                "error": None,
+                "value": None,
+                "lock": threading.Lock(),
+                "swap_lock": threading.Lock(),
+                "swap": None,
+                "draining": [],
+            }
+
+    def names(self):
+        return list(self._loaders)
+
+    def _entry(self, name):
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Unknown model '{name}'. Registered: {', '.join(self._loaders)}")
+        return entry
+
+    def get(self, name):
+        entry = self._entry(name)
+        entry["last_used"] = time.monotonic()
+        value = entry["value"]
+        if value is not None:
+            # Read once: an eviction right after this still leaves the caller a usable model
+            return value
+        with entry["lock"]:
+            if entry["value"] is None:
+                self._load(name, entry)
+            value = entry["value"]
+        self.enforce_budget(keep=name)
+        return value
+
+    def _load(self, name, entry, new_version=False):
+        reloading_evicted = entry["state"] == "evicted"
+        entry["state"] = "loading"
+        entry["error"] = None
+        print(f"🔄 Loading model '{name}'...")
+        rss_before = memory_usage()
+        start = time.perf_counter()
+        try:
+            value = self._loaders[name]()
+        except Exception as e:
+            entry["state"] = "failed"
+            entry["error"] = str(e)
+            print(f"❌ Failed to load model '{name}': {e}")
+            raise
+        entry["load_seconds"] = round(time.perf_counter() - start, 3)
+        entry["footprint_mb"] = model_footprint_mb(value, rss_before)
+        self._warm(name, entry, value)
+        entry["value"] = value
+        entry["loaded_at"] = time.time()
+        entry["loaded_pid"] = os.getpid()
+        entry["last_used"] = time.monotonic()
+        entry["state"] = "ready"
+        if new_version:
+            entry["generation"] += 1
+            invalidate_model(name)
+        if reloading_evicted:
+            self._log_event("reload", name, entry["load_seconds"], entry["footprint_mb"])
+        print(f"✅ Model '{name}' loaded in {entry['load_seconds']}s (~{entry['footprint_mb']} MB)")
+
+    def _warm(self, name, entry, value):
+        """Synthetic batches at every length bucket before the model serves (or reports) ready."""
+        from app.services.model_warmup import warm_model
+        entry["state"] = "warming"
+        try:
+            warmed = warm_model(name, value)
+        except Exception as e:
+            # A failed warmup only costs first-request latency; the model is still usable
+            print(f"⚠️ Warmup of '{name}' failed: {e}")
+            warmed = None
+        entry["warmup_seconds"], entry["warmup_shapes"] = warmed or (None, None)
+
+    # ==============================
+    # 🔹 Memory-budgeted residency
+    # ==============================
+
+    def _log_event(self, event, name, seconds, footprint_mb):
+        self._events.append({"event": event, "model": name, "seconds": seconds, "footprint_mb": footprint_mb, "at": time.time()})
+        verb = "Evicted" if event == "evict" else "Reloaded evicted"
+        print(f"♻️ {verb} model '{name}' ({footprint_mb} MB) in {seconds}s")
+
+    def resident_mb(self):
+        """Footprint of the models this process loaded itself (inherited ones are shared with the parent)."""
+        return round(sum(
+            e["footprint_mb"] or 0 for name, e in self._entries.items() if e["state"] == "ready" and not self.inherited(name)
+        ), 1)
+
+    def evictable(self, name):
+        return config.model_setting(name, "MODEL_EVICTABLE", name in EVICTABLE_BY_DEFAULT, config.env_bool)
+
+    def inherited(self, name):
+        """Loaded by a parent before fork() (app.prefork): the pages stay shared copy-on-write, so
+        evicting frees nothing here and a reload would only add a private copy per worker."""
+        loaded_pid = self._entry(name)["loaded_pid"]
+        return loaded_pid is not None and loaded_pid != os.getpid()
+
+    def evict(self, name):
+        """Drops the registry's reference; the weights are freed once in-flight callers finish."""
+        entry = self._entry(name)
+        if not entry["lock"].acquire(blocking=False):
+            return False  # loading right now
+        try:
+            if entry["state"] != "ready":
+                return False
+            start = time.perf_counter()
+            entry["value"] = None
+            entry["state"] = "evicted"
+            entry["evictions"] += 1
+            gc.collect()
+            self._log_event("evict", name, round(time.perf_counter() - start, 3), entry["footprint_mb"])
+            return True
+        finally:
+            entry["lock"].release()
+
+    def enforce_budget(self, keep=None):
+        """Evicts idle evictable models, least recently used first, while over MODEL_MEMORY_BUDGET_MB."""
+        budget = config.MODEL_MEMORY_BUDGET_MB
+        if budget <= 0 or self.resident_mb() <= budget:
+            return []
+        idle_before = time.monotonic() - config.MODEL_IDLE_SECONDS
+        candidates = sorted(
+            (entry["last_used"] or 0, name) for name, entry in self._entries.items()
+            if name != keep and entry["state"] == "ready" and self.evictable(name) and not self.inherited(name)
+            and (entry["last_used"] or 0) <= idle_before
+        )
+        evicted = []
+        for _, name in candidates:
+            if self.resident_mb() <= budget:
+                break
+            if self.evict(name):
+                evicted.append(name)
+        if self.resident_mb() > budget:
+            print(f"⚠️ Models use {self.resident_mb()} MB, over the {budget} MB budget, with nothing idle left to evict")
+        return evicted
+
+    def start_residency_sweeper(self):
+        """Background check so models that go idle are evicted without waiting for the next load."""
+        if config.MODEL_MEMORY_BUDGET_MB <= 0 or self._sweeper is not None:
+            return
+        def sweep():
+            while True:
+                time.sleep(max(config.MODEL_RESIDENCY_CHECK_SECONDS, 1.0))
+                self.enforce_budget()
+        self._sweeper = threading.Thread(target=sweep, name="model-residency", daemon=True)
+        self._sweeper.start()
+
+    def residency(self):
+        return {
+            "budget_mb": config.MODEL_MEMORY_BUDGET_MB,
+            "resident_mb": self.resident_mb(),
+            "idle_seconds": config.MODEL_IDLE_SECONDS,
+            "events": list(self._events),
+        }
+
+    def reload(self, name):
+        """Loads ``name`` again; its fingerprint changes and cached predictions are dropped."""
+        entry = self._entry(name)
+        with entry["lock"]:
+            self._load(name, entry, new_version=True)
+        return entry["value"]
+
+    # ==============================
+    # 🔹 Hot swap
+    # ==============================
+
+    def swap(self, name, loader, on_swap=None, target=None):
+        """Loads a replacement for ``name`` beside the serving model, warms it, then swaps it in.
+
+        Requests keep using the old model until the swap; the ones already holding
+        it finish on it, and its weights are freed when the last of them returns.
+        ``on_swap`` runs right after the reference changes (e.g. to publish the new
+        revision, which changes ``version``); the generation bump then changes the
+        fingerprint and drops the cached predictions. One swap per model at a time.
+        """
+        entry = self._entry(name)
+        if not entry["swap_lock"].acquire(blocking=False):
+            raise RuntimeError(f"A swap of '{name}' is already running")
+        swap = entry["swap"] = {"target": target, "state": "loading", "started_at": time.time(), "seconds": None, "error": None}
+        try:
+            print(f"🔀 Swapping model '{name}' to {target or 'a new copy'}...")
+            start = time.perf_counter()
+            rss_before = memory_usage()
+            value = loader()
+            footprint_mb = model_footprint_mb(value, rss_before)
+            swap["state"] = "warming"
+            from app.services.model_warmup import warm_model
+            try:
+                warmed = warm_model(name, value)
+            except Exception as e:
+                print(f"⚠️ Warmup of the new '{name}' failed: {e}")
+                warmed = None
+
+            with entry["lock"]:
+                old = entry["value"]
+                entry["value"] = value
+                if on_swap is not None:
+                    on_swap()
+                entry["generation"] += 1
+                entry["state"] = "ready"
+                entry["error"] = None
+                entry["footprint_mb"] = footprint_mb
+                entry["load_seconds"] = round(time.perf_counter() - start, 3)
+                entry["warmup_seconds"], entry["warmup_shapes"] = warmed or (None, None)
+                entry["loaded_at"] = time.time()
+                entry["loaded_pid"] = os.getpid()
+            invalidate_model(name)
+
+            if old is not None:
+                entry["draining"] = [ref for ref in entry["draining"] if ref[0]() is not None]
+                probe = _weakref_target(old)
+                del old
+                gc.collect()
+                if probe is not None and probe() is not None:
+                    entry["draining"].append((probe, time.time()))
+            swap.update(state="swapped", seconds=round(time.perf_counter() - start, 3))
+            print(f"✅ Swapped model '{name}' to {target or 'a new copy'} in {swap['seconds']}s")
+            return value
+        except Exception as e:
+            swap.update(state="failed", error=str(e))
+            print(f"❌ Swap of '{name}' failed; still serving the old model: {e}")
+            raise
+        finally:
+            entry["swap_lock"].release()
+
+    def draining(self, name):
+        """Old (swapped-out) copies of ``name`` still held by in-flight requests."""
+        entry = self._entry(name)
+        return sum(1 for ref, _ in entry["draining"] if ref() is not None)
+
+    def version(self, name):
+        """Model id + revision (+ backend/precision): stable across processes and restarts."""
+        version = self._entry(name)["version"]
+        return version() if callable(version) else version
+
+    def fingerprint(self, name):
+        """Model version + reload count; part of every prediction cache key."""
+        return f"{name}:{self.version(name)}:{self._entry(name)['generation']}"
+
+    def loaded(self, name):
+        """The model if it is loaded right now, else None (never triggers a load)."""
+        return self._entry(name)["value"]
+
+    def is_loaded(self, name):
+        return self._entry(name)["state"] == "ready"
+
+    def preload(self, names=None):
+        """Loads ``names`` (default: ``config.PRELOAD_MODELS``); failures are recorded, not raised."""
+        for name in self.resolve(names if names is not None else config.PRELOAD_MODELS):
+            try:
+                self.get(name)
+            except Exception:
+                pass
+
+    def resolve(self, names):
+        if "all" in names:
+            return self.names()
+        return [name for name in names if name in self._loaders]
+
+    def status(self, name=None):
+        names = [name] if name else self.names()
+        return {
+            key: {
+                "state": self._entries[key]["state"],
+                "description": self._entries[key]["description"],
+                "load_seconds": self._entries[key]["load_seconds"],
+                "generation": self._entries[key]["generation"],
+                "loaded_at": self._entries[key]["loaded_at"],
+                "warmup_seconds": self._entries[key]["warmup_seconds"],
+                "footprint_mb": self._entries[key]["footprint_mb"],
+                "idle_seconds": round(time.monotonic() - self._entries[key]["last_used"], 1)
+                                if self._entries[key]["last_used"] else None,
+                "evictable": self.evictable(key),
+                "inherited": self.inherited(key),
+                "evictions": self._entries[key]["evictions"],
+                "swap": self._entries[key]["swap"],
+                "draining": self.draining(key),
+                "error": self._entries[key]["error"],
+            }
+            for key in names
+        }
+
+    def is_ready(self, names=None):
+        """True when every preload model is loaded and warmed (models outside the list load on demand)."""
+        wanted = self.resolve(names if names is not None else config.PRELOAD_MODELS)
+        # Evicted models count as ready: they reload transparently on the next request
+        return all(self._entries[name]["state"] in ("ready", "evicted") for name in wanted)
+
+
+def torch_modules(value, depth=0):
+    """``torch.nn.Module``s inside a registry value (tuples, backends with ``.model``)."""
+    import torch
+    if depth > 3 or value is None:
+        return
+    if isinstance(value, torch.nn.Module):
+        yield value
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            yield from torch_modules(item, depth + 1)
+    elif hasattr(value, "model"):
+        yield from torch_modules(value.model, depth + 1)
+
+def _weakref_target(value):
+    """A weak reference to the weights holder of a registry value ((tokenizer, backend) -> the backend)."""
+    for item in (reversed(value) if isinstance(value, tuple) else (value,)):
+        try:
+            return weakref.ref(item)
+        except TypeError:
+            continue
+    return None
+
+
+def model_footprint_mb(value, rss_before=None):
+    """Parameter + buffer bytes for torch models, otherwise the RSS growth during the load."""
+    tensor_bytes = 0
+    try:
+        for module in torch_modules(value):
+            for tensor in list(module.parameters()) + list(module.buffers()):
+                tensor_bytes += tensor.numel() * tensor.element_size()
+    except ImportError:
+        pass
+    if tensor_bytes:
+        return round(tensor_bytes / 1024 ** 2, 1)
+    rss_after = memory_usage()
+    if rss_before and rss_after:
+        return round(max(rss_after["rss_mb"] - rss_before["rss_mb"], 0.0), 1)
+    return 0.0
+
+
+# Only used by the /api/keyword/extract job; the sentiment/aspect classifiers stay pinned
+EVICTABLE_BY_DEFAULT = {"spacy_en_core_web_sm", "spacy_ner", "finbert_keybert", "msmarco_embedder", "xlmr_keyword_extractor"}
+
+registry = ModelRegistry()
+
+
+# ✅ Loaders (imports stay inside so unused models never pull in their libraries)
+def _classifier_loader(model_key):
+    def load():
+        from app.services.model_backends import load_classifier
+        return load_classifier(model_key)
+    return load
+
+
+def _classifier_version(model_key):
+    def version():
+        from app.services.model_backends import MODEL_SPECS, resolved_revision
+        backend = config.model_setting(model_key, "MODEL_BACKEND", config.MODEL_BACKEND, config.env_str)
+        precision = config.model_setting(model_key, "MODEL_PRECISION", config.MODEL_PRECISION, config.env_str)
+        return f"{MODEL_SPECS[model_key]['path']}@{resolved_revision(model_key)}/{backend}/{precision}"
+    return version
+
+
+def _cascade_loader(language):
+    def load():
+        from app.services.garbage_cascade import load_cascade
+        return load_cascade(language)
+    return load
+
+
+def _cascade_version(language):
+    def version():
+        from app.services.garbage_cascade import cascade_version
+        return cascade_version(language)
+    return version
+
+
+def _load_spacy_en_core_web_sm():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+
+def _load_spacy_ner():
+    import subprocess
+    import spacy
+    try:
+        return spacy.load("en_finetuned_spacy_ner")
+    except OSError:
+        print("⚠️ Model not found. Installing...")
+        subprocess.run([
+            "pip", "install",
+            "https://huggingface.co/Azmarah/finetuned-spacy-ner/resolve/main/en_finetuned_spacy_ner-1.0.0-py3-none-any.whl"
+        ], check=True)
+        return spacy.load("en_finetuned_spacy_ner")
+
+
+def _load_finbert_keybert():
+    from keybert import KeyBERT
+    from transformers import AutoModel
+    from app.services.model_store import pretrained_source, weight_kwargs
+    repo_id = "Azmarah/finbert-keyword-extraction"
+    source, kwargs = pretrained_source(repo_id)
+    finbert_model = AutoModel.from_pretrained(source, ignore_mismatched_sizes=True, **kwargs, **weight_kwargs(repo_id))
+    return KeyBERT(model=finbert_model)
+
+
+def _load_msmarco_embedder():
+    from sentence_transformers import SentenceTransformer
+    from app.services.model_store import pretrained_source
+    return SentenceTransformer(pretrained_source("sentence-transformers/msmarco-distilbert-base-v3")[0])
+
+
+def _load_xlmr_keyword_extractor():
+    from transformers import AutoTokenizer, AutoModelForTokenClassification
+    from app.services.model_store import pretrained_source, weight_kwargs
+    # 🛠 Force load from base model to avoid broken tokenizer.json
+    source, kwargs = pretrained_source("xlm-roberta-base")
+    tokenizer = AutoTokenizer.from_pretrained(source, use_fast=True, **kwargs)
+    repo_id = "Azmarah/XLMR-Keyword-Extraction-Sinhala"
+    source, kwargs = pretrained_source(repo_id)
+    model = AutoModelForTokenClassification.from_pretrained(source, **kwargs, **weight_kwargs(repo_id))
+    model.eval()
+    return tokenizer, model
+
+
+for _key in ("english_sentiment", "english_garbage", "english_aspect",
+             "sinhala_sentiment", "sinhala_garbage", "sinhala_aspect"):
+    registry.register(_key, _classifier_loader(_key), "sequence classifier (tokenizer, backend)",
+                      version=_classifier_version(_key))
+
+for _language in ("English", "Sinhala"):
+    registry.register(f"{_language.lower()}_garbage_cascade", _cascade_loader(_language),
+                      "hashed char n-gram garbage pre-classifier", version=_cascade_version(_language))
+
+registry.register("spacy_en_core_web_sm", _load_spacy_en_core_web_sm, "spaCy pipeline shared by keyword preprocessing")
+registry.register("spacy_ner", _load_spacy_ner, "fine-tuned spaCy NER for keyword extraction")
+registry.register("finbert_keybert", _load_finbert_keybert, "KeyBERT over fine-tuned FinBERT")
+registry.register("msmarco_embedder", _load_msmarco_embedder, "SentenceTransformer for EmbedRank")
+registry.register("xlmr_keyword_extractor", _load_xlmr_keyword_extractor, "XLM-R token classifier for Sinhala keywords")
+
+
+def get_model(name):
+    return registry.get(name)
+
+
+def model_fingerprint(*names):
+    return "|".join(registry.fingerprint(name) for name in names)
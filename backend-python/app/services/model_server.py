@@ -0,0 +1,281 @@
+import sys
+import time
+import queue
+import argparse
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+from multiprocessing.connection import Client, Listener
+import numpy as np
+import torch
+from app import config
+
+# ==============================
+# 🔹 Shared-memory batch transport
+# ==============================
+# One segment per request holds every input tensor followed by room for the
+# logits. Only the segment name and the layout travel over the socket.
+
+def parse_address(address):
+    """``host:port`` for TCP, anything containing a slash is a Unix socket path."""
+    if "/" not in address and ":" in address:
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+    return address
+
+def require_authkey():
+    """multiprocessing.connection unpickles every message: never listen or connect without a secret."""
+    if not config.MODEL_SERVER_AUTHKEY:
+        raise RuntimeError("❌ MODEL_SERVER_AUTHKEY is not set; the model server needs a shared secret")
+    return config.MODEL_SERVER_AUTHKEY
+
+def pack_batch(encoded, num_labels):
+    arrays = {name: np.ascontiguousarray(tensor.cpu().numpy(), dtype=np.int64) for name, tensor in encoded.items()}
+    rows = next(iter(arrays.values())).shape[0]
+
+    inputs, offset = [], 0
+    for name, array in arrays.items():
+        inputs.append((name, array.shape, offset))
+        offset += array.nbytes
+    logits_offset = offset
+    offset += rows * num_labels * np.dtype(np.float32).itemsize
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (_, shape, start), array in zip(inputs, arrays.values()):
+        view = np.ndarray(shape, dtype=np.int64, buffer=shm.buf, offset=start)
+        view[...] = array
+        del view
+
+    layout = {"shm": shm.name, "inputs": inputs, "logits": ((rows, num_labels), logits_offset)}
+    return shm, layout
+
+def read_inputs(shm, layout):
+    encoded = {}
+    for name, shape, start in layout["inputs"]:
+        view = np.ndarray(shape, dtype=np.int64, buffer=shm.buf, offset=start)
+        encoded[name] = torch.from_numpy(view.copy())
+        del view
+    return encoded
+
+def write_logits(shm, layout, logits):
+    shape, start = layout["logits"]
+    view = np.ndarray(shape, dtype=np.float32, buffer=shm.buf, offset=start)
+    view[...] = logits
+    del view
+
+def read_logits(shm, layout):
+    shape, start = layout["logits"]
+    view = np.ndarray(shape, dtype=np.float32, buffer=shm.buf, offset=start)
+    logits = view.copy()
+    del view
+    return logits
+
+
+# ==============================
+# 🔹 Model worker processes
+# ==============================
+
+def worker_main(worker_id, conn, model_keys):
+    from app.services.model_backends import load_backend
+
+    backends = {key: load_backend(key, local=True) for key in model_keys}
+    conn.send({"ready": True, "num_labels": {key: backend.num_labels for key, backend in backends.items()}})
+    print(f"✅ Model worker {worker_id} ready: {', '.join(model_keys)}")
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        try:
+            shm = shared_memory.SharedMemory(name=request["shm"])
+            # The web worker created the segment and unlinks it; don't let our tracker do it too
+            resource_tracker.unregister(shm._name, "shared_memory")
+            try:
+                logits = backends[request["model"]].logits(read_inputs(shm, request))
+                write_logits(shm, request, logits)
+            finally:
+                shm.close()
+            conn.send({"ok": True})
+        except Exception as e:
+            conn.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+class ModelWorkerPool:
+    """N dedicated processes that each hold ``model_keys``; requests go to whichever is idle."""
+
+    RESPAWN_DELAY_SECONDS = 5.0
+
+    def __init__(self, workers, model_keys):
+        self._ctx = mp.get_context("spawn")
+        self.model_keys = list(model_keys)
+        self.num_labels = {}
+        self.processes = {}
+        self.respawns = 0
+        self._idle = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.requests = {key: 0 for key in self.model_keys}
+
+        for worker_id in range(workers):
+            self._idle.put(self._spawn(worker_id))
+
+    def _spawn(self, worker_id):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=worker_main, args=(worker_id, child_conn, self.model_keys),
+            name=f"model-worker-{worker_id}", daemon=True
+        )
+        process.start()
+        # Only the child keeps its end open, so a dead worker shows up as EOF here
+        child_conn.close()
+        ready = parent_conn.recv()
+        self.num_labels.update(ready["num_labels"])
+        self.processes[worker_id] = process
+        return worker_id, parent_conn
+
+    def _respawn(self, worker_id, conn):
+        """Replaces a dead worker in the background; its pipe never goes back to the idle queue."""
+        conn.close()
+        process = self.processes.get(worker_id)
+        if process is not None:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.kill()
+
+        def respawn():
+            while True:
+                try:
+                    self._idle.put(self._spawn(worker_id))
+                    break
+                except Exception as e:
+                    print(f"❌ Could not restart model worker {worker_id}: {e}; retrying")
+                    time.sleep(self.RESPAWN_DELAY_SECONDS)
+            with self._stats_lock:
+                self.respawns += 1
+            print(f"🔄 Model worker {worker_id} restarted")
+
+        threading.Thread(target=respawn, name=f"model-worker-{worker_id}-respawn", daemon=True).start()
+
+    def run(self, request):
+        worker_id, conn = self._idle.get()
+        worker_lost = False
+        try:
+            conn.send(request)
+            reply = conn.recv()
+        except (EOFError, OSError) as e:
+            worker_lost = True
+            print(f"❌ Model worker {worker_id} lost while serving {request.get('model')}: {e}")
+            return {"ok": False, "error": "model worker exited"}
+        finally:
+            if worker_lost:
+                self._respawn(worker_id, conn)
+            else:
+                self._idle.put((worker_id, conn))
+        with self._stats_lock:
+            self.requests[request["model"]] = self.requests.get(request["model"], 0) + 1
+        return reply
+
+    def stats(self):
+        with self._stats_lock:
+            requests = dict(self.requests)
+            respawns = self.respawns
+        return {
+            "workers": len(self.processes),
+            "alive": sum(process.is_alive() for process in self.processes.values()),
+            "idle": self._idle.qsize(),
+            "respawns": respawns,
+            "requests": requests,
+        }
+
+
+def handle_client(conn, pool):
+    try:
+        while True:
+            request = conn.recv()
+            op = request.get("op", "logits")
+            if op == "describe":
+                conn.send({"ok": True, "num_labels": pool.num_labels})
+            elif op == "stats":
+                conn.send({"ok": True, "stats": pool.stats()})
+            elif request.get("model") not in pool.num_labels:
+                conn.send({"ok": False, "error": f"model '{request.get('model')}' is not served here"})
+            else:
+                conn.send(pool.run(request))
+    except (EOFError, ConnectionResetError):
+        pass
+    finally:
+        conn.close()
+
+def serve(address, workers, model_keys):
+    authkey = require_authkey()
+    pool = ModelWorkerPool(workers, model_keys)
+    listener = Listener(parse_address(address), authkey=authkey)
+    print(f"🚀 Model server listening on {address} with {workers} worker(s)")
+    while True:
+        conn = listener.accept()
+        threading.Thread(target=handle_client, args=(conn, pool), daemon=True).start()
+
+
+# ==============================
+# 🔹 Web-worker side
+# ==============================
+
+class RemoteBackend:
+    """Backend that ships batches to the model server instead of holding weights locally."""
+    name = "remote"
+
+    def __init__(self, model_key, address=None):
+        self.model_key = model_key
+        self.address = parse_address(address or config.MODEL_SERVER_ADDRESS)
+        self._authkey = require_authkey()
+        self._connections = queue.LifoQueue()
+        self._num_labels = None
+
+    def _call(self, request):
+        try:
+            conn = self._connections.get_nowait()
+        except queue.Empty:
+            conn = Client(self.address, authkey=self._authkey)
+        try:
+            conn.send(request)
+            reply = conn.recv()
+        except Exception:
+            conn.close()
+            raise
+        self._connections.put(conn)
+        return reply
+
+    @property
+    def num_labels(self):
+        if self._num_labels is None:
+            reply = self._call({"op": "describe"})
+            if self.model_key not in reply["num_labels"]:
+                raise RuntimeError(f"❌ Model server at {self.address} does not serve {self.model_key}")
+            self._num_labels = reply["num_labels"][self.model_key]
+        return self._num_labels
+
+    def logits(self, encoded):
+        shm, layout = pack_batch(encoded, self.num_labels)
+        try:
+            reply = self._call({"op": "logits", "model": self.model_key, **layout})
+            if not reply["ok"]:
+                raise RuntimeError(f"❌ Model server failed for {self.model_key}: {reply['error']}")
+            return read_logits(shm, layout)
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def main(argv=None):
+    from app.services.model_backends import MODEL_SPECS
+
+    parser = argparse.ArgumentParser(description="Serve the classifiers from dedicated worker processes")
+    parser.add_argument("--address", default=config.MODEL_SERVER_ADDRESS or "127.0.0.1:6100")
+    parser.add_argument("--workers", type=int, default=config.MODEL_SERVER_WORKERS)
+    parser.add_argument("--models", nargs="+", default=list(MODEL_SPECS), choices=list(MODEL_SPECS))
+    args = parser.parse_args(argv)
+
+    serve(args.address, args.workers, args.models)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
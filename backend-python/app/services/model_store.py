@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from app import config
+
+# Local model store: models/store/<repo--id>/<commit sha>/ holds each hub model
+# pinned to a resolved commit, with the weights converted to safetensors.
+# When a model is in the store (and LOCAL_MODEL_STORE is on) every load reads
+# that folder with local_files_only=True: no hub resolution, no pickle; the
+# safetensors file is memory-mapped by the loader. ``manifest.json`` records
+# repo id -> pinned revision, folder and files.
+#
+#   python -m app.services.model_store pull             # populate / update
+#   python -m app.services.model_store list
+#   python -m app.services.model_store benchmark        # cold start: hub vs store
+
+# ✅ Everything the API loads from the hub (kind decides how it is converted)
+STORE_MODELS = {
+    "udeshani/english-sentiment-analysis": {"kind": "classifier", "model_key": "english_sentiment"},
+    "Navojith012/english-garbage-classifier": {"kind": "classifier", "model_key": "english_garbage"},
+    "Navojith012/english-aspect-classifier": {"kind": "classifier", "model_key": "english_aspect"},
+    "udeshani/sinhala-sentiment-analysis": {"kind": "classifier", "model_key": "sinhala_sentiment"},
+    "Navojith012/sinhala_garbage_model": {"kind": "classifier", "model_key": "sinhala_garbage"},
+    "Navojith012/sinhala-aspect-classifier-v2": {"kind": "classifier", "model_key": "sinhala_aspect"},
+    "Azmarah/finbert-keyword-extraction": {"kind": "auto_model"},
+    "Azmarah/XLMR-Keyword-Extraction-Sinhala": {"kind": "token_classifier"},
+    "xlm-roberta-base": {"kind": "tokenizer"},
+    # sentence-transformers 2.2.2 saves pickled weights; stored as-is (still offline)
+    "sentence-transformers/msmarco-distilbert-base-v3": {"kind": "sentence_transformer"},
+}
+
+_manifest_lock = threading.Lock()
+_manifest = None
+
+def manifest_path():
+    return os.path.join(config.MODEL_STORE_DIR, "manifest.json")
+
+def load_manifest(refresh=False):
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None or refresh:
+            try:
+                with open(manifest_path(), "r", encoding="utf-8") as f:
+                    _manifest = json.load(f)
+            except FileNotFoundError:
+                _manifest = {}
+        return _manifest
+
+def save_manifest(manifest):
+    global _manifest
+    os.makedirs(config.MODEL_STORE_DIR, exist_ok=True)
+    tmp = manifest_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path())
+    with _manifest_lock:
+        _manifest = manifest
+
+def stored(repo_id):
+    """Manifest entry for ``repo_id`` if the store is on and its folder exists."""
+    if not config.LOCAL_MODEL_STORE:
+        return None
+    entry = load_manifest().get(repo_id)
+    if entry and os.path.isdir(os.path.join(config.MODEL_STORE_DIR, entry["path"])):
+        return entry
+    return None
+
+def stored_revision(repo_id):
+    entry = stored(repo_id)
+    return entry["revision"] if entry else None
+
+def pretrained_source(repo_id, revision=None):
+    """(name_or_path, from_pretrained kwargs): the pinned local folder when stored, else the hub."""
+    entry = stored(repo_id)
+    if entry and revision in (None, "main", entry["revision"]):
+        return os.path.join(config.MODEL_STORE_DIR, entry["path"]), {"local_files_only": True}
+    return repo_id, ({"revision": revision} if revision else {})
+
+def weight_kwargs(repo_id, revision=None):
+    """Extra model kwargs: safetensors only when loading from the store."""
+    return {"use_safetensors": True} if pretrained_source(repo_id, revision)[1].get("local_files_only") else {}
+
+
+# ==============================
+# 🔹 Populating the store
+# ==============================
+
+def resolve_revision(repo_id, revision="main"):
+    from huggingface_hub import HfApi
+    return HfApi().model_info(repo_id, revision=revision).sha
+
+def resolve_main_commit(repo_id, revision):
+    """Full sha of ``revision`` when it is ``main`` or a commit (full or abbreviated sha) on the
+    repo's main history, else None. Branches, tags and PR refs (refs/pr/N) are never accepted:
+    anyone can open a PR with their own weights."""
+    from huggingface_hub import HfApi
+    revision = (revision or "").strip().lower()
+    if revision != "main" and (len(revision) < 7 or len(revision) > 40 or any(c not in "0123456789abcdef" for c in revision)):
+        return None
+    for commit in HfApi().list_repo_commits(repo_id, revision="main"):
+        if revision == "main" or commit.commit_id.startswith(revision):
+            return commit.commit_id
+    return None
+
+def is_commit_sha(revision):
+    return bool(revision) and len(revision) == 40 and all(c in "0123456789abcdef" for c in revision)
+
+def cached_commit(repo_id, revision):
+    """Commit the local hub cache last resolved ``revision`` to (no network), else None."""
+    try:
+        from huggingface_hub.constants import HUGGINGFACE_HUB_CACHE
+    except ImportError:
+        return None
+    ref = os.path.join(HUGGINGFACE_HUB_CACHE, f"models--{repo_id.replace('/', '--')}", "refs", revision)
+    try:
+        with open(ref, "r", encoding="utf-8") as f:
+            commit = f.read().strip()
+    except OSError:
+        return None
+    return commit if is_commit_sha(commit) else None
+
+def _save_pretrained(repo_id, kind, revision, folder):
+    from transformers import AutoModel, AutoModelForTokenClassification, AutoTokenizer
+
+    if kind == "sentence_transformer":
+        from huggingface_hub import snapshot_download
+        from sentence_transformers import SentenceTransformer
+        # SentenceTransformer(repo_id) has no revision argument: load the pinned snapshot instead
+        SentenceTransformer(snapshot_download(repo_id, revision=revision)).save(folder)
+        return
+
+    # Slow tokenizer files first, then tokenizer.json from the fast one (both load offline)
+    try:
+        AutoTokenizer.from_pretrained(repo_id, revision=revision, use_fast=False).save_pretrained(folder)
+    except Exception as e:
+        print(f"   ⚠️ No slow tokenizer for {repo_id}: {e}")
+    AutoTokenizer.from_pretrained(repo_id, revision=revision, use_fast=True).save_pretrained(folder)
+    if kind == "tokenizer":
+        return
+
+    if kind == "classifier":
+        from app.services.model_backends import MODEL_FAMILIES, MODEL_SPECS
+        model_cls = MODEL_FAMILIES[MODEL_SPECS[STORE_MODELS[repo_id]["model_key"]]["family"]][1]
+        model = model_cls.from_pretrained(repo_id, revision=revision)
+    elif kind == "token_classifier":
+        model = AutoModelForTokenClassification.from_pretrained(repo_id, revision=revision)
+    else:
+        model = AutoModel.from_pretrained(repo_id, revision=revision, ignore_mismatched_sizes=True)
+    model.save_pretrained(folder, safe_serialization=True)
+
+def requested_revision(repo_id):
+    model_key = STORE_MODELS[repo_id].get("model_key")
+    if model_key:
+        return config.model_setting(model_key, "MODEL_REVISION", "main", config.env_str)
+    return "main"
+
+def pull(repo_ids=None, revisions=None):
+    """Downloads each model at its (resolved) revision and writes it into the store."""
+    manifest = dict(load_manifest(refresh=True))
+    for repo_id in repo_ids or list(STORE_MODELS):
+        kind = STORE_MODELS[repo_id]["kind"]
+        sha = resolve_revision(repo_id, (revisions or {}).get(repo_id) or requested_revision(repo_id))
+        relative = os.path.join(repo_id.replace("/", "--"), sha)
+        folder = os.path.join(config.MODEL_STORE_DIR, relative)
+        if manifest.get(repo_id, {}).get("revision") == sha and os.path.isdir(folder):
+            print(f"✅ {repo_id}@{sha[:10]} already stored")
+            continue
+
+        print(f"⬇️ {repo_id}@{sha[:10]} ({kind})")
+        start = time.perf_counter()
+        os.makedirs(folder, exist_ok=True)
+        _save_pretrained(repo_id, kind, sha, folder)
+        manifest[repo_id] = {
+            "revision": sha,
+            "kind": kind,
+            "path": relative,
+            "files": sorted(os.listdir(folder)),
+            "stored_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        save_manifest(manifest)
+        print(f"   stored in {time.perf_counter() - start:.1f}s → {folder}")
+    return manifest
+
+
+# ==============================
+# 🔹 Cold-start benchmark
+# ==============================
+
+def _load_once(model_key):
+    """Child-process body: load one classifier (tokenizer + eager model) and print the seconds."""
+    start = time.perf_counter()
+    from app.services.model_backends import load_eager_model, load_tokenizer
+    load_tokenizer(model_key)
+    load_eager_model(model_key)
+    print(json.dumps({"seconds": time.perf_counter() - start}))
+
+def cold_start_seconds(model_key, use_store):
+    env = dict(os.environ, LOCAL_MODEL_STORE="true" if use_store else "false", MODEL_BACKEND="eager")
+    output = subprocess.run(
+        [sys.executable, "-m", "app.services.model_store", "load-once", "--model", model_key],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])["seconds"]
+
+def benchmark(model_keys, repeats=3):
+    print(f"{'model':<20} {'hub (s)':>10} {'store (s)':>10} {'speed-up':>9}")
+    for model_key in model_keys:
+        hub = min(cold_start_seconds(model_key, False) for _ in range(repeats))
+        local = min(cold_start_seconds(model_key, True) for _ in range(repeats))
+        print(f"{model_key:<20} {hub:>10.2f} {local:>10.2f} {hub / max(local, 1e-9):>8.1f}x")
+
+def main(argv=None):
+    classifier_keys = [entry["model_key"] for entry in STORE_MODELS.values() if entry.get("model_key")]
+
+    parser = argparse.ArgumentParser(description="Pinned local model store (safetensors, offline loading)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pull_cmd = sub.add_parser("pull", help="download, pin and convert models into the store")
+    pull_cmd.add_argument("--models", nargs="+", choices=list(STORE_MODELS))
+    pull_cmd.add_argument("--revision", action="append", default=[], metavar="REPO=REV",
+                          help="pin a model to a branch/tag/commit (repeatable)")
+    sub.add_parser("list")
+    bench_cmd = sub.add_parser("benchmark", help="cold-start load time: hub path vs local store")
+    bench_cmd.add_argument("--models", nargs="+", default=classifier_keys, choices=classifier_keys)
+    bench_cmd.add_argument("--repeats", type=int, default=3)
+    once_cmd = sub.add_parser("load-once")
+    once_cmd.add_argument("--model", required=True, choices=classifier_keys)
+    args = parser.parse_args(argv)
+
+    if args.command == "pull":
+        revisions = dict(item.split("=", 1) for item in args.revision)
+        pull(args.models, revisions)
+    elif args.command == "list":
+        for repo_id, entry in load_manifest().items():
+            print(f"{repo_id:<50} {entry['revision'][:10]}  {entry['kind']:<20} {', '.join(entry['files'])}")
+    elif args.command == "benchmark":
+        benchmark(args.models, args.repeats)
+    else:
+        _load_once(args.model)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import threading
+from app import config
+
+# Hot model swap: POST /api/inference/models/{name}/swap (ADMIN_TOKEN only)
+# loads and warms a commit from the model's main history in the background and
+# swaps it in. Only once that succeeded is the commit published in
+# models/active_revisions.json; every worker runs a watcher that polls the file,
+# so the other prefork workers follow within MODEL_SWAP_POLL_SECONDS, and
+# restarted workers load the swapped revision directly (safetensors only).
+# ``active_revision`` is the revision this process actually serves;
+# model_backends.model_revision (and so the registry version / cache
+# fingerprints) follows it. Not available with MODEL_SERVER_ADDRESS: the model
+# server processes hold the weights and are not swapped.
+
+_lock = threading.Lock()
+_active = None
+_watcher = None
+
+
+def _read_requested():
+    try:
+        with open(config.MODEL_SWAP_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read {config.MODEL_SWAP_FILE}: {e}")
+        return {}
+
+def requested_revisions():
+    """{model key: {"revision", "requested_at"}} shared by every worker."""
+    return _read_requested()
+
+def active_revision(model_key):
+    """Revision this process serves for ``model_key`` after a swap (None: the configured one)."""
+    global _active
+    with _lock:
+        if _active is None:
+            # First use in this process: serve whatever was swapped in before it started
+            _active = {key: entry["revision"] for key, entry in _read_requested().items()}
+        return _active.get(model_key)
+
+def _set_active(model_key, revision):
+    active_revision(model_key)
+    with _lock:
+        _active[model_key] = revision
+
+def publish_revision(model_key, revision):
+    """Makes every worker (and every restarted one) serve ``revision``: call only after a successful swap."""
+    requested = _read_requested()
+    requested[model_key] = {"revision": revision, "requested_at": time.time()}
+    os.makedirs(os.path.dirname(config.MODEL_SWAP_FILE), exist_ok=True)
+    tmp = f"{config.MODEL_SWAP_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(requested, f, indent=2)
+    os.replace(tmp, config.MODEL_SWAP_FILE)
+
+def resolve_swap_revision(model_key, revision):
+    """Full commit sha for a swap request, or None unless ``revision`` is on the model's main history."""
+    from app.services.model_backends import MODEL_SPECS
+    from app.services.model_store import resolve_main_commit
+    return resolve_main_commit(MODEL_SPECS[model_key]["path"], revision)
+
+def swap_model(model_key, revision, publish=True):
+    """Loads + warms ``model_key`` at ``revision`` (safetensors only) and swaps it in (blocking).
+
+    With ``publish`` the revision is written for the other workers right as it
+    goes live here; a load or warmup failure publishes nothing.
+    """
+    from app.services.model_backends import load_classifier
+    from app.services.model_registry import registry
+
+    if config.MODEL_SERVER_ADDRESS:
+        # Loading here would only build another RemoteBackend: the server keeps its weights
+        raise RuntimeError(f"❌ Can't swap {model_key}: models are served by {config.MODEL_SERVER_ADDRESS}")
+
+    def on_swap():
+        _set_active(model_key, revision)
+        if publish:
+            try:
+                publish_revision(model_key, revision)
+            except OSError as e:
+                print(f"⚠️ Swapped {model_key} to {revision} here, but could not publish it: {e}")
+
+    return registry.swap(
+        model_key,
+        loader=lambda: load_classifier(model_key, revision=revision, use_safetensors=True),
+        on_swap=on_swap,
+        target=revision,
+    )
+
+def swap_in_background(model_key, revision):
+    """Starts this worker's swap; the other workers follow once it succeeded. Returns immediately."""
+    thread = threading.Thread(target=_swap_quietly, args=(model_key, revision), name=f"model-swap-{model_key}", daemon=True)
+    thread.start()
+    return thread
+
+def _swap_quietly(model_key, revision, publish=True):
+    try:
+        swap_model(model_key, revision, publish=publish)
+    except Exception:
+        # Recorded in the registry status; the old model keeps serving
+        pass
+
+def sync_requested():
+    """Swaps every model whose requested revision differs from the one this worker serves."""
+    from app.services.model_backends import model_revision
+    from app.services.model_registry import registry
+
+    for model_key, entry in _read_requested().items():
+        if model_key not in registry.names() or entry["revision"] == model_revision(model_key):
+            continue
+        swap = registry.status(model_key)[model_key]["swap"]
+        if swap and swap["target"] == entry["revision"] and swap["state"] in ("loading", "warming", "failed"):
+            continue  # running here already, or failed (retry with a new request)
+        if not registry.is_loaded(model_key):
+            # Not serving yet: just load the new revision on first use
+            _set_active(model_key, entry["revision"])
+            continue
+        # Already published by the worker that swapped first
+        _swap_quietly(model_key, entry["revision"], publish=False)
+
+def start_swap_watcher():
+    global _watcher
+    if _watcher is not None or config.MODEL_SWAP_POLL_SECONDS <= 0 or config.MODEL_SERVER_ADDRESS:
+        return
+    def watch():
+        while True:
+            time.sleep(config.MODEL_SWAP_POLL_SECONDS)
+            sync_requested()
+    _watcher = threading.Thread(target=watch, name="model-swap-watcher", daemon=True)
+    _watcher.start()
@@ -0,0 +1,87 @@
+import time
+from app import config
+
+# The first forward passes at a new shape pay for allocator growth and kernel
+# selection. Warmup runs every freshly (re)loaded model over synthetic batches
+# at each LENGTH_BUCKET_EDGES length, so real traffic only sees warm shapes.
+# The registry calls ``warm_model`` before marking a model ready.
+
+WARMUP_WORD = "warmup"
+WARMUP_SENTENCE = "The bank app was quick and the customer support team sorted my loan issue."
+
+def warmup_lengths(max_length=128):
+    return sorted({min(edge, max_length) for edge in config.LENGTH_BUCKET_EDGES} | {max_length})
+
+def warmup_enabled(name):
+    return config.model_setting(name, "WARMUP_ENABLED", config.WARMUP_ENABLED, config.env_bool)
+
+def _synthetic_text(tokens):
+    return " ".join([WARMUP_WORD] * max(tokens, 1))
+
+def _warm_classifier(name, value):
+    from app.services.batch_inference import batch_size_for
+    from app.services.inference_governor import forward_slot
+
+    tokenizer, backend = value
+    batch_size = min(batch_size_for(name), config.WARMUP_MAX_BATCH_SIZE)
+    shapes = []
+    for length in warmup_lengths():
+        encoded = tokenizer(
+            [_synthetic_text(length)] * batch_size,
+            padding="max_length", truncation=True, max_length=length, return_tensors="pt"
+        )
+        for _ in range(config.WARMUP_ROUNDS):
+            with forward_slot(name, priority="bulk"):
+                backend.logits(encoded)
+        shapes.append(f"{batch_size}x{length}")
+    return shapes
+
+def _warm_embedder(name, embed_model):
+    shapes = []
+    for length in warmup_lengths():
+        texts = [_synthetic_text(length)] * config.WARMUP_MAX_BATCH_SIZE
+        for _ in range(config.WARMUP_ROUNDS):
+            embed_model.encode(texts, batch_size=len(texts), convert_to_tensor=True)
+        shapes.append(f"{len(texts)}x{length}")
+    return shapes
+
+def _warm_keybert(name, kw_model):
+    kw_model.extract_keywords(WARMUP_SENTENCE, keyphrase_ngram_range=(1, 3), stop_words="english", top_n=5)
+    return ["1 document"]
+
+def _warm_token_classifier(name, value):
+    import torch
+    tokenizer, model = value
+    # extract_keywords_token_classification always pads to 512
+    encoded = tokenizer(WARMUP_SENTENCE, return_tensors="pt", truncation=True, max_length=512, padding="max_length")
+    with torch.inference_mode():
+        for _ in range(config.WARMUP_ROUNDS):
+            model(input_ids=encoded["input_ids"], attention_mask=encoded["attention_mask"])
+    return ["1x512"]
+
+def _warm_spacy(name, nlp):
+    nlp(WARMUP_SENTENCE)
+    return ["1 document"]
+
+def _warmer(name):
+    from app.services.model_backends import MODEL_SPECS
+    if name in MODEL_SPECS:
+        return _warm_classifier
+    return {
+        "msmarco_embedder": _warm_embedder,
+        "finbert_keybert": _warm_keybert,
+        "xlmr_keyword_extractor": _warm_token_classifier,
+        "spacy_en_core_web_sm": _warm_spacy,
+        "spacy_ner": _warm_spacy,
+    }.get(name)
+
+def warm_model(name, value):
+    """Runs the warmup for ``name``; returns (seconds, shapes run) or None when skipped."""
+    warmer = _warmer(name)
+    if warmer is None or not warmup_enabled(name):
+        return None
+    start = time.perf_counter()
+    shapes = warmer(name, value)
+    seconds = round(time.perf_counter() - start, 3)
+    print(f"🔥 Warmed '{name}' in {seconds}s ({', '.join(shapes)})")
+    return seconds, shapes
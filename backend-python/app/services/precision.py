@@ -0,0 +1,219 @@
+import os
+import sys
+import glob
+import json
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import torch
+from app import config
+
+PRECISIONS = ("fp32", "int8", "bf16")
+
+
+# ==============================
+# 🔹 Applying a precision mode
+# ==============================
+
+def bf16_supported(device=None):
+    if device is not None and device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+def precision_for(model_key):
+    return config.model_setting(model_key, "MODEL_PRECISION", config.MODEL_PRECISION, config.env_str).lower()
+
+def load_gate():
+    if not os.path.exists(config.PRECISION_GATE_FILE):
+        return {}
+    with open(config.PRECISION_GATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def is_approved(model_key, mode, revision=None):
+    """Whether the gate approved ``mode`` for the commit being loaded (default: the current one)."""
+    from app.services.model_backends import resolved_revision
+
+    if mode == "fp32" or not config.PRECISION_GATE_ENFORCED:
+        return True
+    entry = load_gate().get(model_key, {}).get(mode, {})
+    # An approval doesn't carry over to a re-pinned or hot-swapped revision
+    return bool(entry.get("approved")) and entry.get("revision") == (revision or resolved_revision(model_key))
+
+def apply_precision(model, mode, device=None):
+    """Returns (model, effective mode); unsupported modes fall back to fp32."""
+    if mode == "fp32":
+        return model, "fp32"
+
+    if mode == "int8":
+        if device is not None and device.type != "cpu":
+            print("⚠️ Dynamic int8 quantization is CPU-only; keeping fp32")
+            return model, "fp32"
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return quantized, "int8"
+
+    if mode == "bf16":
+        if not bf16_supported(device):
+            print("⚠️ bf16 is not supported on this CPU; keeping fp32")
+            return model, "fp32"
+        return model.to(torch.bfloat16), "bf16"
+
+    raise ValueError(f"❌ Unknown precision '{mode}'; expected one of {PRECISIONS}")
+
+def resolve_precision(model_key, mode=None, revision=None):
+    """Configured precision for ``model_key``, downgraded to fp32 unless the gate approved it for ``revision``."""
+    mode = (mode or precision_for(model_key)).lower()
+    if not is_approved(model_key, mode, revision):
+        print(f"⚠️ {mode} for this revision of {model_key} has not passed the precision gate "
+              f"(python -m app.services.precision --model {model_key} --mode {mode}); using fp32")
+        return "fp32"
+    return mode
+
+
+# ==============================
+# 🔹 Accuracy gate
+# ==============================
+
+def read_rows(path):
+    return pd.read_excel(path) if path.endswith(".xlsx") else pd.read_csv(path)
+
+# Both garbage models: class 0 = garbage, 1 = valid
+GARBAGE_CLASS, VALID_CLASS = 0, 1
+
+def label_ids(model_key):
+    """{stored label (lowercase): class id}, or None when no stored rows carry ``model_key``'s labels."""
+    if model_key == "english_aspect":
+        from app.controllers.english_aspect_predict_controller import ASPECT_LABELS as names
+    elif model_key == "sinhala_aspect":
+        from app.controllers.sinhala_aspect_predict_controller import aspect_label_map as names
+    elif model_key == "sinhala_sentiment":
+        from app.services.sentiment_sinhala_service import SENTIMENT_MAP as names
+    else:
+        return None
+    return {name.lower(): label for label, name in names.items()}
+
+def stored_rows(files, label_column=None):
+    """(comment, aspect, label) per stored row; aspect / label are None where missing."""
+    for path in sorted(files, reverse=True):
+        df = read_rows(path)
+        df.columns = [str(c).strip().lstrip("\ufeff").lower() for c in df.columns]
+        if "comment" not in df.columns:
+            continue
+        for _, row in df.iterrows():
+            if pd.isna(row["comment"]):
+                continue
+            aspect = row.get("aspect")
+            label = row.get(label_column) if label_column else None
+            yield (str(row["comment"]),
+                   None if aspect is None or pd.isna(aspect) else str(aspect).strip(),
+                   None if label is None or pd.isna(label) else str(label).strip())
+
+def load_labelled_rows(model_key, limit=500):
+    """Stored rows for ``model_key`` as (model input texts, class ids of their stored labels).
+
+    Aspect models use the stored aspect, sinhala_sentiment the stored
+    sentiment_label; for the garbage models garbage_classification rows are
+    garbage and aspect_classification rows valid (half of ``limit`` each).
+    english_sentiment has no stored labels.
+    """
+    from app.services.model_backends import MODEL_SPECS
+
+    spec = MODEL_SPECS[model_key]
+    aspect_files = glob.glob(os.path.join(config.DATA_DIR, "aspect_classification", spec["language"], "*.csv"))
+    texts, labels = [], []
+
+    def take(rows, label_of, count):
+        taken = 0
+        for comment, aspect, stored in rows:
+            label = label_of(aspect, stored)
+            if label is None or (spec["pair_input"] and aspect is None):
+                continue
+            texts.append(f"{comment} [SEP] {aspect}" if spec["pair_input"] else comment)
+            labels.append(label)
+            taken += 1
+            if taken >= count:
+                return
+
+    if model_key.endswith("_garbage"):
+        garbage_files = glob.glob(os.path.join(config.DATA_DIR, "garbage_classification", spec["language"], "*.csv"))
+        take(stored_rows(garbage_files), lambda aspect, stored: GARBAGE_CLASS, limit // 2)
+        take(stored_rows(aspect_files), lambda aspect, stored: VALID_CLASS, limit - len(texts))
+        return texts, labels
+
+    ids = label_ids(model_key)
+    if ids is None:
+        return texts, labels
+    if model_key == "sinhala_sentiment":
+        files = glob.glob(os.path.join(config.DATA_DIR, "Sentiment", "Sinhala", "*.xlsx"))
+        take(stored_rows(files, "sentiment_label"), lambda aspect, stored: ids.get((stored or "").lower()), limit)
+    else:
+        take(stored_rows(aspect_files), lambda aspect, stored: ids.get((aspect or "").lower()), limit)
+    return texts, labels
+
+def evaluate_precision(model_key, mode, max_drop=None, limit=500):
+    """Accuracy on stored labels in fp32 vs ``mode``; records the verdict (for this revision) in the gate file."""
+    from app.services.batch_inference import predict_logits
+    from app.services.model_backends import EagerBackend, load_eager_model, load_tokenizer, resolved_revision
+
+    max_drop = config.PRECISION_MAX_ACCURACY_DROP if max_drop is None else max_drop
+    texts, labels = load_labelled_rows(model_key, limit)
+    if not texts:
+        print(f"❌ No labelled rows found for {model_key}; {mode} can't be approved")
+        return False
+
+    tokenizer = load_tokenizer(model_key)
+    reference = EagerBackend(load_eager_model(model_key))
+    candidate = EagerBackend(load_eager_model(model_key), device=torch.device("cpu"), precision=mode)
+    if candidate.precision != mode:
+        print(f"❌ {mode} is not available on this host for {model_key}")
+        return False
+
+    labels = np.array(labels)
+    expected = predict_logits(tokenizer, reference, texts).argmax(axis=1)
+    actual = predict_logits(tokenizer, candidate, texts).argmax(axis=1)
+    fp32_accuracy = float(np.mean(expected == labels))
+    accuracy = float(np.mean(actual == labels))
+    agreement = float(np.mean(expected == actual))
+    approved = fp32_accuracy - accuracy <= max_drop
+
+    gate = load_gate()
+    gate.setdefault(model_key, {})[mode] = {
+        "approved": approved,
+        "revision": resolved_revision(model_key),
+        "fp32_accuracy": round(fp32_accuracy, 4),
+        "accuracy": round(accuracy, 4),
+        "agreement": round(agreement, 4),
+        "max_drop": max_drop,
+        "rows": len(texts),
+        "evaluated_at": datetime.utcnow().isoformat(),
+    }
+    os.makedirs(os.path.dirname(config.PRECISION_GATE_FILE), exist_ok=True)
+    with open(config.PRECISION_GATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(gate, f, indent=2)
+
+    status = "✅ approved" if approved else "❌ refused"
+    print(f"{status}: {model_key} [{mode}] accuracy={accuracy:.4f} vs fp32 {fp32_accuracy:.4f} "
+          f"(max drop {max_drop}) agreement={agreement:.4f} rows={len(texts)}")
+    return approved
+
+def main(argv=None):
+    from app.services.model_backends import MODEL_SPECS
+
+    parser = argparse.ArgumentParser(description="Gate reduced-precision modes on their accuracy drop from fp32 on stored labels")
+    parser.add_argument("--model", default="all", choices=["all", *MODEL_SPECS])
+    parser.add_argument("--mode", required=True, choices=[p for p in PRECISIONS if p != "fp32"])
+    parser.add_argument("--max-drop", type=float, default=None)
+    parser.add_argument("--limit", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    model_keys = list(MODEL_SPECS) if args.model == "all" else [args.model]
+    results = [evaluate_precision(key, args.mode, args.max_drop, args.limit) for key in model_keys]
+    return 0 if all(results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,19 @@
-from transformers import BertTokenizer, BertForSequenceClassification
-import torch
 import numpy as np
-
-MODEL_PATH = "udeshani/english-sentiment-analysis"
-
-tokenizer = BertTokenizer.from_pretrained(MODEL_PATH)
-model = BertForSequenceClassification.from_pretrained(MODEL_PATH)
-model.eval()
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model.to(device)
+from app import config
+from app.services.batch_inference import batch_size_for, predict_logits, predict_logits_encoded, softmax
+from app.services.model_backends import MODEL_SPECS
+from app.services.model_registry import get_model, model_fingerprint
+from app.services.inference_store import inference_store, namespace_revision
+from app.services.inference_governor import current_deadline, deadline_expired
+from app.services.batch_autotune import microbatch_size_for
+from app.services.tokenization import encode_with_suffixes
+from app.utils.cache_handler import normalize_text, prediction_cache
+from app.utils.micro_batcher import MicroBatcher
+
+MODEL_PATH = MODEL_SPECS["english_sentiment"]["path"]
+
+# ✅ Eager PyTorch by default; ENGLISH_SENTIMENT_MODEL_BACKEND=onnx|torchscript to switch
+# (loaded lazily through the model registry on first prediction)
 
 SENTIMENT_MAP = {0: "Negative", 1: "Neutral", 2: "Positive"}
 
@@ -30,46 +35,137 @@ def contains_keywords(text, keyword_list):
     return any(phrase in text.lower() for phrase in keyword_list)
 
 def adjust_probabilities(logits, temperature=3.2, cap=0.95):
-    logits = logits / temperature
-    probs = torch.nn.functional.softmax(logits, dim=1).cpu().numpy()[0]
+    """Temperature-scaled softmax over a logits matrix; ``temperature`` may be one value per row."""
+    probs = softmax(logits, temperature=temperature)
     return np.clip(probs, 0.001, cap)
 
-def apply_boost(sentiment, score, text):
-    if sentiment == "Positive" and contains_keywords(text, POSITIVE_KEYWORDS):
-        score = min(round(score + (0.05 if score < 0.85 else 0.02), 3), 0.95)
-    elif sentiment == "Negative" and contains_keywords(text, NEGATIVE_KEYWORDS):
-        score = min(round(score + (0.05 if score < 0.85 else 0.02), 3), 0.95)
-    return score
+def apply_boost(pred_idx, scores, texts):
+    has_positive = np.array([contains_keywords(text, POSITIVE_KEYWORDS) for text in texts], dtype=bool)
+    has_negative = np.array([contains_keywords(text, NEGATIVE_KEYWORDS) for text in texts], dtype=bool)
+    boost = ((pred_idx == 2) & has_positive) | ((pred_idx == 0) & has_negative)
 
-def predict_sentiment(text: str, aspect: str):
-    input_text = f"{text} [SEP] {aspect}"
-
-    encoded = tokenizer.encode_plus(
-        input_text,
-        add_special_tokens=True,
-        max_length=128,
-        truncation=True,
-        padding="max_length",
-        return_tensors="pt"
-    )
-    encoded = {k: v.to(device) for k, v in encoded.items()}
+    boosted = np.minimum(np.round(scores + np.where(scores < 0.85, 0.05, 0.02), 3), 0.95)
+    return np.where(boost, boosted, scores)
 
-    with torch.no_grad():
-        outputs = model(**encoded)
-        logits = outputs.logits
+def sentiment_temperatures(texts):
+    mixed = np.array([detect_mixed_sentiment(text) for text in texts], dtype=bool)
+    return np.where(mixed, 6.0, 3.2)
 
-    temp = 6.0 if detect_mixed_sentiment(text) else 3.2
-    probs = adjust_probabilities(logits, temperature=temp)
+def sentiments_from_logits(texts, logits):
+    if len(texts) == 0:
+        return []
 
-    pred_idx = np.argmax(probs)
-    sentiment = SENTIMENT_MAP[pred_idx]
-    score = round(float(probs[pred_idx]), 3)
+    probs = adjust_probabilities(logits, temperature=sentiment_temperatures(texts))
+
+    pred_idx = np.argmax(probs, axis=1)
+    scores = np.round(probs[np.arange(len(pred_idx)), pred_idx].astype(np.float64), 3)
 
     # Apply smart boosting
-    score = apply_boost(sentiment, score, text)
+    scores = apply_boost(pred_idx, scores, texts)
 
     # Clamp Neutral score to avoid 0.91-type inflation
-    if sentiment == "Neutral":
-        score = min(score, 0.85)
+    scores = np.where(pred_idx == 1, np.minimum(scores, 0.85), scores)
+
+    return [(SENTIMENT_MAP[int(idx)], float(score)) for idx, score in zip(pred_idx, scores)]
+
+# ✅ Repeated (comment, aspect) pairs are answered from the prediction cache
+sentiment_cache = prediction_cache("english_sentiment", models=("english_sentiment",))
+
+def cache_key(text, aspect, fingerprint=None, normalized=None):
+    """``normalized`` is ``normalize_text(text)`` when the caller already has it."""
+    return (normalize_text(text) if normalized is None else normalized, normalize_text(aspect),
+            fingerprint or model_fingerprint("english_sentiment"))
+
+def _predict_sentiment_uncached(items, batch_size=None):
+    items = list(items)
+    input_texts = [f"{text} [SEP] {aspect}" for text, aspect in items]
+    tokenizer, model = get_model("english_sentiment")
+    logits = predict_logits(
+        tokenizer, model, input_texts,
+        batch_size=batch_size or batch_size_for("english_sentiment")
+    )
+    return sentiments_from_logits([text for text, _ in items], logits)
+
+def _predict_sentiment_stored(items, batch_size=None, keys=None):
+    """Persistent inference store first, the model only for pairs never scored before.
+
+    ``keys`` are the pairs' cache keys, whose normalized text + aspect are reused as store inputs.
+    """
+    if keys is None:
+        keys = [cache_key(text, aspect) for text, aspect in items]
+    return inference_store.get_many(
+        "english_sentiment", namespace_revision("english_sentiment"),
+        [[key[0], key[1]] for key in keys], items,
+        lambda missing: _predict_sentiment_uncached(missing, batch_size=batch_size),
+        decode=tuple,
+    )
+
+def predict_sentiment_batch(items, batch_size=None, normalized=None):
+    """Scores a list of (text, aspect) pairs; results are identical to calling ``predict_sentiment`` per item.
+
+    ``normalized`` optionally gives each text's ``normalize_text`` form (computed once upstream).
+    """
+    items = list(items)
+    fingerprint = model_fingerprint("english_sentiment")
+    normalized = list(normalized) if normalized is not None else [None] * len(items)
+    keys = [cache_key(text, aspect, fingerprint, norm) for (text, aspect), norm in zip(items, normalized)]
+    return sentiment_cache.get_many(
+        keys, list(zip(items, keys)),
+        lambda missing: _predict_sentiment_stored(
+            [item for item, _ in missing], batch_size=batch_size, keys=[key for _, key in missing]
+        )
+    )
+
+def predict_sentiment(text: str, aspect: str):
+    return predict_sentiment_batch([(text, aspect)])[0]
+
+# ✅ All-aspect matrix: every comment against every aspect in one batched pass.
+# Each comment is tokenized once; rows are its tokens + [SEP] + the aspect's tokens.
+def predict_sentiment_matrix(texts, aspects, batch_size=None):
+    """Returns (probabilities, sentiments) for ``len(texts) x len(aspects)`` pairs.
+
+    ``probabilities`` is a comments x aspects x classes array (temperature-scaled
+    softmax, classes in SENTIMENT_MAP order); ``sentiments[i][j]`` is the
+    (label, score) ``predict_sentiment(texts[i], aspects[j])`` returns.
+    """
+    texts, aspects = list(texts), list(aspects)
+    if not texts or not aspects:
+        return np.zeros((len(texts), len(aspects), len(SENTIMENT_MAP)), dtype=np.float32), [[] for _ in texts]
+
+    tokenizer, model = get_model("english_sentiment")
+    encoded = encode_with_suffixes(tokenizer, texts, aspects)
+    logits = predict_logits_encoded(
+        tokenizer, model, encoded,
+        batch_size=batch_size or batch_size_for("english_sentiment"), model_key="english_sentiment"
+    )
 
-    return sentiment, score
+    row_texts = [text for text in texts for _ in aspects]
+    probs = softmax(logits, temperature=sentiment_temperatures(row_texts))
+    flat = sentiments_from_logits(row_texts, logits)
+
+    fingerprint = model_fingerprint("english_sentiment")
+    for (text, aspect), result in zip(((t, a) for t in texts for a in aspects), flat):
+        sentiment_cache.put(cache_key(text, aspect, fingerprint), result)
+
+    sentiments = [flat[i * len(aspects):(i + 1) * len(aspects)] for i in range(len(texts))]
+    return probs.reshape(len(texts), len(aspects), -1), sentiments
+
+# ✅ Micro-batching: concurrent single requests share one padded forward pass
+sentiment_batcher = MicroBatcher(
+    "english_sentiment",
+    _predict_sentiment_uncached,
+    max_wait_ms=config.model_setting("english_sentiment", "MICROBATCH_MAX_WAIT_MS", config.MICROBATCH_MAX_WAIT_MS),
+    max_batch_size=lambda: microbatch_size_for("english_sentiment"),
+    enabled=config.MICROBATCH_ENABLED,
+    expired_error=lambda: deadline_expired("english_sentiment"),
+)
+
+def predict_sentiment_queued(text: str, aspect: str):
+    """Same result as ``predict_sentiment``, but batched with concurrent callers."""
+    key = cache_key(text, aspect)
+    hit, result = sentiment_cache.get(key)
+    if hit:
+        return result
+    result = sentiment_batcher.submit((text, aspect), deadline=current_deadline())
+    sentiment_cache.put(key, result)
+    return result
@@ -1,18 +1,21 @@
-from transformers import XLMRobertaTokenizer, XLMRobertaForSequenceClassification
-import torch
 import numpy as np
 import re
 import unicodedata
 import os
+import threading
+from app import config
+from app.services.batch_inference import batch_size_for, predict_logits, softmax
+from app.services.model_backends import MODEL_SPECS
+from app.services.model_registry import get_model, model_fingerprint
+from app.services.inference_store import inference_store, namespace_revision
+from app.services.inference_governor import current_deadline, deadline_expired
+from app.services.batch_autotune import microbatch_size_for
+from app.utils.cache_handler import normalize_text, prediction_cache
+from app.utils.micro_batcher import MicroBatcher
 
 
-# ✅ Load Model & Tokenizer
-MODEL_PATH = "udeshani/sinhala-sentiment-analysis"
-tokenizer = XLMRobertaTokenizer.from_pretrained(MODEL_PATH)
-model = XLMRobertaForSequenceClassification.from_pretrained(MODEL_PATH)
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model.to(device)
-model.eval()
+# ✅ Model & Tokenizer (loaded lazily through the model registry)
+MODEL_PATH = MODEL_SPECS["sinhala_sentiment"]["path"]
 
 # ✅ Load Hardcoded Sentiment Map
 from app.services.sentiment_map import results as embedin_logit
@@ -102,8 +105,8 @@ def override_sentiment_by_phrase(text: str):
 
 # ✅ Softmax with Temperature Scaling
 def adjust_probabilities(logits, temperature=3.0, cap=0.95):
-    logits = logits / temperature
-    probs = torch.nn.functional.softmax(logits, dim=1).cpu().numpy()[0]
+    """Temperature-scaled softmax over a logits matrix; ``temperature`` may be one value per row."""
+    probs = softmax(logits, temperature=temperature)
     return np.clip(probs, 0.001, cap)
 
 # ✅ Check embeding mapping - Only check comment/review
@@ -124,43 +127,175 @@ def check_embed_map(review: str):
     
     return None
 
-    # ✅ Predict Final Sentiment
-
-def predict_sentiment_sinhala(review: str, aspect: str, temperature=3.0):
-    review_input = review.strip()
-    aspect_input = aspect.strip()
-    
-    # print(f"[INPUT] Review: '{review_input}'")
+# ✅ Embed map and lexicon override decide the label without the model
+SENTIMENT_TIERS = ("embed", "lexicon", "model")
+_tier_lock = threading.Lock()
+_tier_totals = {tier: 0 for tier in SENTIMENT_TIERS}
 
+def resolve_sentiment_tier(review_input: str):
+    """Returns (tier, result); result is None when the review has to go to the model."""
     #  Run through the model Check embeding mapping FIRST 
     embed_result = check_embed_map(review_input)
     if embed_result:
-        return embed_result
+        return "embed", embed_result
 
     #  Check override keywords (second priority)
     forced_label = override_sentiment_by_phrase(review_input)
     if forced_label:
         default_score = 0.85 if forced_label == "Neutral" else 0.90
-        return forced_label, default_score
+        return "lexicon", (forced_label, default_score)
 
-    
-    input_text = f"{review_input} [SEP] {aspect_input}"
-    encoded = tokenizer(
-        input_text,
-        return_tensors="pt",
-        padding=True,
-        truncation=True,
-        max_length=128
+    return "model", None
+
+def record_tier_counts(counts):
+    with _tier_lock:
+        for tier, count in counts.items():
+            _tier_totals[tier] += count
+
+def sentiment_tier_stats():
+    with _tier_lock:
+        totals = dict(_tier_totals)
+    total = sum(totals.values())
+    return {
+        "counts": totals,
+        "share": {tier: round(count / total, 4) if total else 0.0 for tier, count in totals.items()},
+    }
+
+def sentiments_from_logits(logits, temperature=3.0):
+    probs = adjust_probabilities(logits, temperature=temperature)
+
+    pred_ids = np.argmax(probs, axis=1)
+    scores = np.round(probs[np.arange(len(pred_ids)), pred_ids].astype(np.float64), 3)
+    return [(SENTIMENT_MAP[int(pred_id)], float(score)) for pred_id, score in zip(pred_ids, scores)]
+
+def predict_sentiment_sinhala_model_batch(items, temperature=3.0, batch_size=None):
+    """Runs (review, aspect) pairs straight through the model; ``temperature`` may be one value per item."""
+    items = list(items)
+    if not items:
+        return []
+
+    input_texts = [f"{review} [SEP] {aspect}" for review, aspect in items]
+    tokenizer, model = get_model("sinhala_sentiment")
+    logits = predict_logits(
+        tokenizer, model, input_texts,
+        batch_size=batch_size or batch_size_for("sinhala_sentiment")
     )
-    encoded = {k: v.to(device) for k, v in encoded.items()}
+    return sentiments_from_logits(logits, temperature=temperature)
 
-    with torch.no_grad():
-        logits = model(**encoded).logits
-        probs = adjust_probabilities(logits, temperature=temperature)
+# ✅ Model-tier results are cached per (review, aspect, temperature, model fingerprint)
+sentiment_sinhala_cache = prediction_cache("sinhala_sentiment", models=("sinhala_sentiment",))
 
-    pred_id = np.argmax(probs)
-    sentiment_label = SENTIMENT_MAP[pred_id]
-    sentiment_score = round(float(probs[pred_id]), 3)
+def cache_key(review, aspect, temperature, fingerprint=None, normalized=None):
+    """``normalized`` is ``normalize_text(review)`` when the caller already has it."""
+    return (normalize_text(review) if normalized is None else normalized, normalize_text(aspect),
+            round(float(temperature), 4), fingerprint or model_fingerprint("sinhala_sentiment"))
+
+def predict_sentiment_sinhala_model_cached(items, temperature=3.0, batch_size=None, normalized=None):
+    """``predict_sentiment_sinhala_model_batch`` behind the prediction cache; one temperature for all items.
+
+    ``normalized`` optionally gives each review's ``normalize_text`` form (computed once upstream).
+    """
+    items = list(items)
+    fingerprint = model_fingerprint("sinhala_sentiment")
+    normalized = list(normalized) if normalized is not None else [None] * len(items)
+    keys = [cache_key(review, aspect, temperature, fingerprint, norm) for (review, aspect), norm in zip(items, normalized)]
+    return sentiment_sinhala_cache.get_many(
+        keys, list(zip(items, keys)),
+        lambda missing: inference_store.get_many(
+            "sinhala_sentiment", namespace_revision("sinhala_sentiment"),
+            [list(key[:3]) for _, key in missing],
+            [item for item, _ in missing],
+            lambda rest: predict_sentiment_sinhala_model_batch(rest, temperature=temperature, batch_size=batch_size),
+            decode=tuple,
+        )
+    )
+
+def predict_sentiment_sinhala_bulk(items, temperature=3.0, batch_size=None, normalized=None):
+    """Resolves what the embed map / lexicon can decide, sends the rest to the model.
+
+    Model-bound pairs are deduplicated and run in padded mini-batches. Returns
+    (results in input order, number of items resolved by each tier).
+    ``normalized`` optionally gives each review's ``normalize_text`` form.
+    """
+    results = []
+    tier_counts = {tier: 0 for tier in SENTIMENT_TIERS}
+    pending = {}
+    pending_normalized = {}
+    for i, (review, aspect) in enumerate(items):
+        review_input = review.strip()
+        tier, resolved = resolve_sentiment_tier(review_input)
+        tier_counts[tier] += 1
+        results.append(resolved)
+        if resolved is None:
+            pair = (review_input, aspect.strip())
+            pending.setdefault(pair, []).append(i)
+            if normalized is not None:
+                pending_normalized.setdefault(pair, normalized[i])
+
+    pairs = list(pending)
+    predictions = predict_sentiment_sinhala_model_cached(
+        pairs, temperature=temperature, batch_size=batch_size,
+        normalized=[pending_normalized[pair] for pair in pairs] if normalized is not None else None,
+    )
+    for pair, prediction in zip(pairs, predictions):
+        for i in pending[pair]:
+            results[i] = prediction
+
+    record_tier_counts(tier_counts)
+    return results, tier_counts
+
+def predict_sentiment_sinhala_batch(items, temperature=3.0, batch_size=None):
+    """Batch version of ``predict_sentiment_sinhala`` over (review, aspect) pairs, in input order."""
+    return predict_sentiment_sinhala_bulk(items, temperature=temperature, batch_size=batch_size)[0]
+
+# ✅ Predict Final Sentiment
+def predict_sentiment_sinhala(review: str, aspect: str, temperature=3.0):
+    review_input = review.strip()
+    aspect_input = aspect.strip()
+    
+    # print(f"[INPUT] Review: '{review_input}'")
+
+    tier, prefiltered = resolve_sentiment_tier(review_input)
+    record_tier_counts({tier: 1})
+    if prefiltered:
+        return prefiltered
+
+    sentiment_label, sentiment_score = predict_sentiment_sinhala_model_cached(
+        [(review_input, aspect_input)], temperature=temperature
+    )[0]
 
     print(f"[MODEL] Prediction: {sentiment_label} | Score: {sentiment_score} | Text: {review_input}")
     return sentiment_label, sentiment_score
+
+# ✅ Micro-batching: concurrent model-bound requests share one padded forward pass
+def _predict_sentiment_sinhala_microbatch(items):
+    return predict_sentiment_sinhala_model_batch(
+        [(review, aspect) for review, aspect, _ in items],
+        temperature=np.array([temperature for _, _, temperature in items], dtype=np.float32)
+    )
+
+sentiment_sinhala_batcher = MicroBatcher(
+    "sinhala_sentiment",
+    _predict_sentiment_sinhala_microbatch,
+    max_wait_ms=config.model_setting("sinhala_sentiment", "MICROBATCH_MAX_WAIT_MS", config.MICROBATCH_MAX_WAIT_MS),
+    max_batch_size=lambda: microbatch_size_for("sinhala_sentiment"),
+    enabled=config.MICROBATCH_ENABLED,
+    expired_error=lambda: deadline_expired("sinhala_sentiment"),
+)
+
+def predict_sentiment_sinhala_queued(review: str, aspect: str, temperature=3.0):
+    """Same result as ``predict_sentiment_sinhala``; only model-bound reviews wait in the batch queue."""
+    review_input = review.strip()
+
+    tier, prefiltered = resolve_sentiment_tier(review_input)
+    record_tier_counts({tier: 1})
+    if prefiltered:
+        return prefiltered
+
+    key = cache_key(review_input, aspect, temperature)
+    hit, result = sentiment_sinhala_cache.get(key)
+    if hit:
+        return result
+    result = sentiment_sinhala_batcher.submit((review_input, aspect.strip(), temperature), deadline=current_deadline())
+    sentiment_sinhala_cache.put(key, result)
+    return result
@@ -0,0 +1,157 @@
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import weakref
+from app import config
+from app.utils.cache_handler import PredictionCache
+
+# Shared tokenization layer: whole batches go through one (Rust) fast-tokenizer
+# call, and encodings are cached by (tokenizer fingerprint, max_length, text).
+# The fingerprint hashes the full tokenizer definition (normalizer, vocab,
+# post-processor), so models with identical vocabularies (e.g. the Sinhala
+# garbage and aspect classifiers) reuse each other's encodings.
+
+encoding_cache = PredictionCache(
+    "tokenizer_encodings", models=(),
+    max_entries=config.TOKENIZER_CACHE_MAX_ENTRIES, ttl_seconds=0,
+    enabled=config.TOKENIZER_CACHE_ENABLED,
+)
+
+_fingerprint_lock = threading.Lock()
+# Weak keys: a hot-swapped model's old tokenizer is freed with it
+_fingerprints = weakref.WeakKeyDictionary()
+
+def tokenizer_fingerprint(tokenizer):
+    with _fingerprint_lock:
+        if tokenizer in _fingerprints:
+            return _fingerprints[tokenizer]
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        definition = backend.to_str()
+    else:
+        definition = json.dumps([type(tokenizer).__name__, sorted(tokenizer.get_vocab().items()),
+                                 getattr(tokenizer, "do_lower_case", None)], ensure_ascii=False)
+    fingerprint = hashlib.sha1(definition.encode("utf-8")).hexdigest()[:16]
+    with _fingerprint_lock:
+        _fingerprints[tokenizer] = fingerprint
+    return fingerprint
+
+def _encode(tokenizer, texts, max_length):
+    encoded = tokenizer(list(texts), truncation=True, max_length=max_length)
+    keys = list(encoded.keys())
+    return [{key: encoded[key][i] for key in keys} for i in range(len(texts))]
+
+def encode_batch(tokenizer, texts, max_length=128):
+    """Unpadded encodings (dicts of token lists), one per text; only uncached texts are tokenized."""
+    texts = list(texts)
+    fingerprint = tokenizer_fingerprint(tokenizer)
+    return encoding_cache.get_many(
+        [(fingerprint, max_length, text) for text in texts], texts,
+        lambda missing: _encode(tokenizer, missing, max_length)
+    )
+
+def encode_with_suffixes(tokenizer, texts, suffixes, max_length=128):
+    """Encodings of ``f"{text} {sep} {suffix}"`` for every text x suffix (row-major), built
+    from one cached encoding per text plus one encoding per suffix.
+
+    Same ids as tokenizing the joined string for single-sequence [CLS] ... [SEP]
+    tokenizers (BERT): the content is truncated from the right to max_length - 2.
+    """
+    texts, suffixes = list(texts), list(suffixes)
+    cls_id, sep_id = tokenizer.cls_token_id, tokenizer.sep_token_id
+    text_rows = encode_batch(tokenizer, texts, max_length)
+    suffix_ids = [tokenizer(suffix, add_special_tokens=False)["input_ids"] for suffix in suffixes]
+
+    rows = []
+    for row in text_rows:
+        content = list(row["input_ids"][1:-1]) + [sep_id]
+        for ids in suffix_ids:
+            input_ids = [cls_id] + (content + ids)[:max_length - 2] + [sep_id]
+            encoded = {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)}
+            if "token_type_ids" in row:
+                encoded["token_type_ids"] = [0] * len(input_ids)
+            rows.append(encoded)
+    return rows
+
+def tokenizer_stats():
+    with _fingerprint_lock:
+        tokenizers = [
+            {"class": type(tokenizer).__name__, "fast": bool(getattr(tokenizer, "is_fast", False)), "fingerprint": fingerprint}
+            for tokenizer, fingerprint in list(_fingerprints.items())
+        ]
+    return {"tokenizers": tokenizers, "encoding_cache": encoding_cache.stats()}
+
+
+# ==============================
+# 🔹 Parity CLI: fast vs slow tokenizers on stored comments
+# ==============================
+
+def check_tokenizer_parity(model_key, limit=512, max_length=128):
+    from app.services.model_backends import load_stored_comments, load_tokenizer
+
+    slow = load_tokenizer(model_key, fast=False)
+    fast = load_tokenizer(model_key, fast=True)
+    texts = load_stored_comments(model_key, limit)
+    if not texts:
+        print(f"⚠️ No stored comments found for {model_key}")
+    slow_ids = slow(texts, truncation=True, max_length=max_length)["input_ids"]
+    fast_ids = encode_batch(fast, texts, max_length)
+
+    mismatches = [
+        (text, a, b["input_ids"]) for text, a, b in zip(texts, slow_ids, fast_ids) if list(a) != list(b["input_ids"])
+    ]
+    print(f"{model_key}: {len(texts)} comments, {len(mismatches)} mismatches, "
+          f"fast fingerprint {tokenizer_fingerprint(fast)}")
+    for text, a, b in mismatches[:5]:
+        print(f"   ❌ {text[:80]!r}\n      slow: {slow.convert_ids_to_tokens(a)}\n      fast: {fast.convert_ids_to_tokens(b)}")
+    return {"texts": len(texts), "mismatches": len(mismatches), "fingerprint": tokenizer_fingerprint(fast)}
+
+def check_suffix_parity(model_key="english_sentiment", limit=512, max_length=128):
+    """encode_with_suffixes vs tokenizing f"{text} [SEP] {aspect}" directly (sentiment matrix mode).
+
+    Returns {"rows", "mismatches"}; no rows means nothing was checked.
+    """
+    from app.controllers.english_aspect_predict_controller import ASPECT_LABELS
+    from app.services.model_backends import load_stored_comments, load_tokenizer
+
+    tokenizer = load_tokenizer(model_key, fast=True)
+    texts = load_stored_comments(model_key, limit)
+    aspects = list(ASPECT_LABELS.values())
+    composed = encode_with_suffixes(tokenizer, texts, aspects, max_length)
+    direct = tokenizer([f"{text} [SEP] {aspect}" for text in texts for aspect in aspects],
+                       truncation=True, max_length=max_length)["input_ids"]
+    mismatches = sum(list(a) != row["input_ids"] for a, row in zip(direct, composed))
+    print(f"{model_key} (text + aspect suffix): {len(direct)} rows, {mismatches} mismatches")
+    return {"rows": len(direct), "mismatches": mismatches}
+
+def main(argv=None):
+    from app.services.model_backends import MODEL_SPECS
+
+    parser = argparse.ArgumentParser(description="Check the fast tokenizers against the slow ones on stored comments")
+    parser.add_argument("--model", nargs="+", default=list(MODEL_SPECS), choices=list(MODEL_SPECS))
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--max-length", type=int, default=128)
+    args = parser.parse_args(argv)
+
+    results = {key: check_tokenizer_parity(key, args.limit, args.max_length) for key in args.model}
+
+    shared = {}
+    for key, result in results.items():
+        shared.setdefault(result["fingerprint"], []).append(key)
+    for fingerprint, keys in shared.items():
+        if len(keys) > 1:
+            print(f"🔗 Shared encodings ({fingerprint}): {', '.join(keys)}")
+
+    # Nothing compared is a failure too: the gate must not pass on an empty sample
+    failed = [key for key, result in results.items() if result["mismatches"] or not result["texts"]]
+    if "english_sentiment" in args.model:
+        suffix = check_suffix_parity("english_sentiment", args.limit, args.max_length)
+        if suffix["mismatches"] or not suffix["rows"]:
+            failed.append("english_sentiment (suffix)")
+    print("✅ All tokenizers match" if not failed else f"❌ Mismatches or no stored comments in: {', '.join(failed)}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from app import config
+
+
+def normalize_text(text):
+    """NFC, trimmed, single-spaced: the models and rule checks treat these variants the same."""
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+
+class PredictionCache:
+    """Size-bounded LRU with a per-entry TTL for model predictions.
+
+    Keys are built by the callers from normalized text, the aspect (if any) and
+    the fingerprint of every model involved, so a new model version never reads
+    an old entry. ``models`` lists those models; reloading any of them clears
+    the cache (see ``invalidate_model``).
+    """
+
+    def __init__(self, name, models, max_entries=10000, ttl_seconds=3600.0, enabled=True):
+        self.name = name
+        self.models = tuple(models)
+        self.max_entries = max(int(max_entries), 1)
+        self.ttl = float(ttl_seconds)
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        """Returns (hit, value)."""
+        if not self.enabled:
+            return False, None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self.ttl <= 0 or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return True, value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return False, None
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_many(self, keys, items, compute_fn):
+        """Values for ``keys`` in order; ``compute_fn`` gets the items of the unique missing keys."""
+        results = [None] * len(keys)
+        pending = OrderedDict()
+        for i, key in enumerate(keys):
+            hit, value = self.get(key)
+            if hit:
+                results[i] = value
+            else:
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            missing = [items[indices[0]] for indices in pending.values()]
+            for key, value in zip(pending, compute_fn(missing)):
+                self.put(key, value)
+                for i in pending[key]:
+                    results[i] = value
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "name": self.name,
+                "models": list(self.models),
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def prediction_cache(name, models):
+    """One shared cache per name; PREDICTION_CACHE_* settings (per-cache override e.g. ENGLISH_SENTIMENT_PREDICTION_CACHE_MAX_ENTRIES)."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = PredictionCache(
+                name, models,
+                max_entries=config.model_setting(name, "PREDICTION_CACHE_MAX_ENTRIES", config.PREDICTION_CACHE_MAX_ENTRIES, config.env_int),
+                ttl_seconds=config.model_setting(name, "PREDICTION_CACHE_TTL_SECONDS", config.PREDICTION_CACHE_TTL_SECONDS, config.env_float),
+                enabled=config.PREDICTION_CACHE_ENABLED,
+            )
+        return _caches[name]
+
+def invalidate_model(model_name):
+    """Clears every cache holding predictions of ``model_name``."""
+    with _caches_lock:
+        caches = [cache for cache in _caches.values() if model_name in cache.models]
+    for cache in caches:
+        cache.clear()
+
+def cache_stats():
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in caches]
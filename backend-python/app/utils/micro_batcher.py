@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Gathers concurrent single-item calls and runs them through ``batch_fn`` together.
+
+    The worker thread takes the first queued item, then keeps collecting until
+    ``max_wait_ms`` has passed or ``max_batch_size`` items are queued. Each caller
+    blocks in ``submit`` and gets back only its own result (or exception).
+    Items whose ``deadline`` (time.monotonic()) has passed are dropped before the
+    batch runs; their callers get ``expired_error()``.
+    """
+
+    def __init__(self, name, batch_fn, max_wait_ms=5.0, max_batch_size=32, enabled=True, expired_error=None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        # An int, or a callable re-read for every batch (e.g. an autotuned size)
+        self._max_batch_size = max_batch_size
+        self.enabled = enabled
+        self.expired_error = expired_error or (lambda: TimeoutError(f"deadline passed in the '{name}' queue"))
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._expired = 0
+
+    def submit(self, item, deadline=None):
+        if not self.enabled:
+            return self.batch_fn([item])[0]
+
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, deadline))
+        return future.result()
+
+    @property
+    def max_batch_size(self):
+        size = self._max_batch_size() if callable(self._max_batch_size) else self._max_batch_size
+        return max(int(size), 1)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "name": self.name,
+                "enabled": self.enabled,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "expired": self._expired,
+                "queued": self._queue.qsize(),
+            }
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name=f"microbatch-{self.name}", daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _drop_expired(self, batch):
+        now = time.monotonic()
+        live = []
+        for item, future, deadline in batch:
+            if deadline is not None and now >= deadline:
+                future.set_exception(self.expired_error())
+                with self._stats_lock:
+                    self._expired += 1
+            else:
+                live.append((item, future))
+        return live
+
+    def _run(self):
+        while True:
+            batch = self._drop_expired(self._collect())
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                print(f"❌ Micro-batch '{self.name}' failed for {len(items)} items: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(items)
+                self._largest_batch = max(self._largest_batch, len(items))
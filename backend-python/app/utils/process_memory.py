@@ -0,0 +1,39 @@
+import os
+
+# Fields of /proc/<pid>/smaps_rollup (Linux), all in kB
+_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+def memory_usage(pid=None):
+    """RSS / PSS / private memory of a process in MB; ``None`` where smaps_rollup is unavailable."""
+    pid = pid or os.getpid()
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    values = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in _FIELDS:
+            values[parts[0].rstrip(":")] = int(parts[1])
+
+    mb = lambda kb: round(kb / 1024, 1)
+    return {
+        "pid": pid,
+        "rss_mb": mb(values.get("Rss", 0)),
+        "pss_mb": mb(values.get("Pss", 0)),
+        "shared_mb": mb(values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)),
+        # Pages only this process holds: what it actually adds on top of the parent
+        "private_mb": mb(values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)),
+    }
+
+def memory_report(parent_pid, worker_pids):
+    parent = memory_usage(parent_pid)
+    workers = [usage for usage in (memory_usage(pid) for pid in worker_pids) if usage]
+    return {
+        "parent": parent,
+        "workers": workers,
+        "total_pss_mb": round(sum(w["pss_mb"] for w in workers) + (parent["pss_mb"] if parent else 0), 1),
+        "total_rss_mb": round(sum(w["rss_mb"] for w in workers) + (parent["rss_mb"] if parent else 0), 1),
+    }